@@ -0,0 +1,120 @@
+# BackEnd/app/analisis.py
+# Auditoría del horario guardado (horarios_generados), pensada para correr después de cada
+# edición manual.
+#
+# Una sola pasada sobre una consulta proyectada de todas las asignaciones arma, por curso,
+# profesor y aula, la máscara de bits de la semana (un bit por slot, ver app.grilla). Con las
+# máscaras, disponibilidad y almuerzo son un AND por entidad y las métricas salen de contar
+# bits. Solo se agrupan ids por slot para poder decir QUÉ módulos chocan.
+#
+# El resultado queda en memoria hasta que cambia el horario (revisión de app.cambios) o la
+# configuración (franjas de almuerzo).
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import app.cambios as cambios
+import app.configuracion as configuracion
+from app.database import AsignacionDB, AulaDB, CursoDB, ProfesorDB
+from app.grilla import N_DIAS, N_HORAS, clave_de, huecos, iterar_slots, mascara_de_horas, mascara_del_dia, mascara_desde_bytes
+
+ENTIDADES = ("curso", "profesor", "aula")
+
+def _conflictos(ocupantes: Dict[Tuple[str, int], List[str]], nombres: Dict[str, str]) -> List[dict]:
+    return [
+        {"id": eid, "nombre": nombres.get(eid, eid), "slot": clave_de(slot), "asignaciones": ids}
+        for (eid, slot), ids in sorted(ocupantes.items(), key=lambda x: (x[0][1], x[0][0])) if len(ids) > 1
+    ]
+
+def analizar(db: Session) -> dict:
+    filas = db.query(
+        AsignacionDB.id, AsignacionDB.curso_id, AsignacionDB.profesor_id, AsignacionDB.aula_id,
+        AsignacionDB.dia_idx, AsignacionDB.hora_idx
+    ).all()
+    profesores = {p.id: p for p in db.query(ProfesorDB.id, ProfesorDB.nombre, ProfesorDB.disponibilidad_bits).all()}
+    cursos = {c.id: f"{c.anio} {c.division}" for c in db.query(CursoDB.id, CursoDB.anio, CursoDB.division).all()}
+    aulas = dict(db.query(AulaDB.id, AulaDB.nombre).all())
+    nombres = {"curso": cursos, "profesor": {pid: p.nombre for pid, p in profesores.items()}, "aula": aulas}
+    almuerzo = mascara_de_horas(configuracion.obtener(db).almuerzo_slots)
+
+    # --- Pasada única ---
+    mascaras: Dict[str, Dict[str, int]] = {e: {} for e in ENTIDADES}
+    ocupantes: Dict[str, Dict[Tuple[str, int], List[str]]] = {e: {} for e in ENTIDADES}
+    sin_horario: List[str] = []
+    en_almuerzo: List[dict] = []
+    for f in filas:
+        if f.dia_idx is None or f.hora_idx is None:
+            sin_horario.append(f.id)
+            continue
+        slot = f.dia_idx * N_HORAS + f.hora_idx
+        bit = 1 << slot
+        for entidad, eid in (("curso", f.curso_id), ("profesor", f.profesor_id), ("aula", f.aula_id)):
+            if not eid: continue
+            mascaras[entidad][eid] = mascaras[entidad].get(eid, 0) | bit
+            ocupantes[entidad].setdefault((eid, slot), []).append(f.id)
+        if almuerzo & bit:
+            en_almuerzo.append({"asignacion_id": f.id, "curso_id": f.curso_id,
+                                "curso": cursos.get(f.curso_id, "?"), "slot": clave_de(slot)})
+
+    # --- Disponibilidad: lo ocupado fuera de lo que el profe declaró ---
+    fuera_de_disponibilidad = []
+    for pid, ocupado in mascaras["profesor"].items():
+        p = profesores.get(pid)
+        disponible = mascara_desde_bytes(p.disponibilidad_bits) if p else 0
+        if not disponible: continue  # sin disponibilidad cargada = sin restricciones
+        for slot in iterar_slots(ocupado & ~disponible):
+            fuera_de_disponibilidad.append({
+                "profesor_id": pid, "nombre": p.nombre, "slot": clave_de(slot),
+                "asignaciones": ocupantes["profesor"][(pid, slot)],
+            })
+
+    # --- Métricas ---
+    metricas_profes = []
+    for pid, ocupado in mascaras["profesor"].items():
+        metricas_profes.append({
+            "id": pid, "nombre": nombres["profesor"].get(pid, pid),
+            "horas": ocupado.bit_count(),
+            "dias": sum(1 for d in range(N_DIAS) if mascara_del_dia(ocupado, d)),
+            "huecos": huecos(ocupado),
+        })
+    metricas_profes.sort(key=lambda m: (-m["huecos"], m["nombre"] or ""))
+
+    metricas_cursos = []
+    for cid, ocupado in mascaras["curso"].items():
+        por_dia = [mascara_del_dia(ocupado, d).bit_count() for d in range(N_DIAS)]
+        metricas_cursos.append({
+            "id": cid, "nombre": cursos.get(cid, "?"), "por_dia": por_dia,
+            "maximo": max(por_dia), "minimo": min(por_dia), "huecos": huecos(ocupado),
+        })
+    metricas_cursos.sort(key=lambda m: m["nombre"])
+
+    conflictos = {e: _conflictos(ocupantes[e], nombres[e]) for e in ENTIDADES}
+    return {
+        "modulos": len(filas),
+        "resumen": {
+            **{f"choques_{e}": len(conflictos[e]) for e in ENTIDADES},
+            "fuera_de_disponibilidad": len(fuera_de_disponibilidad),
+            "en_almuerzo": len(en_almuerzo),
+            "sin_horario": len(sin_horario),
+            "huecos_profesores": sum(m["huecos"] for m in metricas_profes),
+        },
+        "conflictos": conflictos,
+        "fuera_de_disponibilidad": fuera_de_disponibilidad,
+        "en_almuerzo": en_almuerzo,
+        "sin_horario": sin_horario,
+        "metricas": {"profesores": metricas_profes, "cursos": metricas_cursos},
+    }
+
+# (revisión del horario, versión de la configuración, resultado). Se reemplaza entera.
+_cache: Tuple[Optional[str], Optional[int], Optional[dict]] = (None, None, None)
+
+def obtener(db: Session) -> dict:
+    """El análisis vigente; se rehace solo si cambió el horario o la configuración."""
+    global _cache
+    revision, version = cambios.revision_actual(db), configuracion.obtener(db).version
+    rev_cache, ver_cache, resultado = _cache
+    if resultado is None or rev_cache != revision or ver_cache != version:
+        resultado = {"revision": revision, **analizar(db)}
+        _cache = (revision, version, resultado)
+    return resultado
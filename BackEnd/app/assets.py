@@ -0,0 +1,79 @@
+# BackEnd/app/assets.py
+# Archivos binarios (por ahora solo el logo de la institución) fuera de ConfiguracionDB.
+#
+# Cada archivo se guarda una sola vez en la tabla `assets` bajo el sha256 de su contenido y
+# nunca cambia: si el admin sube otro logo, es otro hash y otra URL. Por eso
+# GET /api/assets/{hash} se puede cachear "para siempre" en el navegador, y la configuración
+# solo guarda (y devuelve) el hash.
+
+import base64
+import binascii
+import hashlib
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import AssetDB
+
+TAMANIO_MAXIMO = 2 * 1024 * 1024  # mismo límite que el frontend para el logo
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Solo imágenes de mapa de bits: nada que el navegador pueda ejecutar (HTML, SVG con scripts).
+# Para cada tipo, cómo empiezan sus bytes.
+FORMATOS_PERMITIDOS: Dict[str, Callable[[bytes], bool]] = {
+    "image/png": lambda d: d.startswith(b"\x89PNG\r\n\x1a\n"),
+    "image/jpeg": lambda d: d.startswith(b"\xff\xd8\xff"),
+    "image/gif": lambda d: d.startswith((b"GIF87a", b"GIF89a")),
+    "image/webp": lambda d: d[:4] == b"RIFF" and d[8:12] == b"WEBP",
+}
+
+_DATA_URL = re.compile(r"^data:(?P<tipo>[\w.+-]+/[\w.+-]+)?(?:;[\w-]+=[^;,]*)*;base64,(?P<datos>.*)$", re.S)
+_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+def desde_data_url(data_url: str) -> Tuple[bytes, str]:
+    """'data:image/png;base64,....' -> (bytes, media_type). ValueError si no es válido."""
+    m = _DATA_URL.match(data_url.strip())
+    if not m: raise ValueError("El logo debe ser una imagen en formato data URL (base64)")
+    media_type = (m.group("tipo") or "").lower()
+    if media_type not in FORMATOS_PERMITIDOS:
+        raise ValueError("El logo tiene que ser PNG, JPEG, GIF o WEBP")
+    try:
+        datos = base64.b64decode(m.group("datos"), validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError("El logo no es base64 válido")
+    if not datos: raise ValueError("El logo está vacío")
+    if len(datos) > TAMANIO_MAXIMO: raise ValueError("El logo es muy pesado (máximo 2MB)")
+    if not FORMATOS_PERMITIDOS[media_type](datos):
+        raise ValueError(f"El contenido del logo no es un {media_type} válido")
+    return datos, media_type
+
+def hash_de(datos: bytes) -> str:
+    return hashlib.sha256(datos).hexdigest()
+
+def url_de(hash_: Optional[str]) -> Optional[str]:
+    return f"/api/assets/{hash_}" if hash_ else None
+
+def guardar(db: Session, datos: bytes, media_type: str) -> str:
+    """Agrega el asset a la sesión (sin commit) si no existía y devuelve su hash."""
+    h = hash_de(datos)
+    if db.query(AssetDB.hash).filter(AssetDB.hash == h).first() is None:
+        db.add(AssetDB(hash=h, media_type=media_type, tamanio=len(datos), contenido=datos))
+    return h
+
+def existe(db: Session, hash_: str) -> bool:
+    """Sin leer el contenido (para contestar 304). Solo cuenta lo que se puede servir."""
+    if not _HASH.match(hash_): return False
+    media_type = db.query(AssetDB.media_type).filter(AssetDB.hash == hash_).scalar()
+    return media_type in FORMATOS_PERMITIDOS
+
+def leer(db: Session, hash_: str) -> Optional[Tuple[bytes, str]]:
+    """(contenido, media_type) o None si el hash no existe (o ni siquiera parece un hash).
+    Un asset guardado con un tipo no permitido (anterior a la validación) no se sirve."""
+    if not _HASH.match(hash_): return None
+    fila = db.query(AssetDB.contenido, AssetDB.media_type).filter(AssetDB.hash == hash_).first()
+    if fila is None or fila.media_type not in FORMATOS_PERMITIDOS: return None
+    return fila.contenido, fila.media_type
+
+def etag_de(hash_: str) -> str:
+    return f'"{hash_}"'
@@ -0,0 +1,124 @@
+# BackEnd/app/cache_respuestas.py
+# Caché de respuestas de los catálogos (profesores, materias, cursos, aulas, requisitos,
+# preferencias). Se guarda el JSON ya serializado y su ETag.
+#
+# Cada entidad tiene un número de generación; las respuestas se guardan bajo
+# "entidad:generación" e invalidar es solo incrementar ese número. Así una respuesta armada
+# con datos viejos en paralelo a una escritura nunca queda como vigente.
+#
+# Backend: en memoria (por proceso) o Redis si HORARIOS_CACHE_URL=redis://... (compartido
+# entre workers). Sin Redis, con varios workers, HORARIOS_CACHE_TTL acota cuánto puede
+# tardar un worker en ver el cambio hecho en otro.
+#
+# El cliente de Redis es bloqueante: desde endpoints async se usa obtener_async / en_hilo,
+# que mandan las llamadas al threadpool (en memoria se llaman directo).
+
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+CACHE_URL = os.getenv("HORARIOS_CACHE_URL", "memoria://")
+CACHE_TTL = int(os.getenv("HORARIOS_CACHE_TTL", "300"))
+PREFIJO = "horarios:resp:"
+
+# Respuestas que además dependen de otras entidades (requisitos muestra nombres de todo)
+DEPENDENCIAS = {
+    "requisitos": {"cursos", "materias", "profesores", "aulas"},
+}
+
+class BackendCache(Protocol):
+    def leer(self, clave: str) -> Optional[bytes]: ...
+    def escribir(self, clave: str, valor: bytes, ttl: int) -> None: ...
+    def incrementar(self, clave: str) -> int: ...
+
+class BackendMemoria:
+    MAX_CLAVES = 256
+
+    def __init__(self):
+        self._datos: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def leer(self, clave: str) -> Optional[bytes]:
+        entrada = self._datos.get(clave)
+        if entrada is None or entrada[1] < time.monotonic(): return None
+        return entrada[0]
+
+    def escribir(self, clave: str, valor: bytes, ttl: int):
+        with self._lock:
+            if len(self._datos) >= self.MAX_CLAVES:
+                ahora = time.monotonic()
+                self._datos = {k: v for k, v in self._datos.items() if v[1] >= ahora}
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+
+    def incrementar(self, clave: str) -> int:
+        # Las generaciones no vencen
+        with self._lock:
+            nuevo = int(self._datos.get(clave, (b"0", 0))[0]) + 1
+            self._datos[clave] = (str(nuevo).encode(), float("inf"))
+            return nuevo
+
+class BackendRedis:
+    def __init__(self, url: str):
+        import redis  # dependencia opcional, solo si se configura
+        self._r = redis.Redis.from_url(url)
+
+    def leer(self, clave: str) -> Optional[bytes]:
+        return self._r.get(clave)
+
+    def escribir(self, clave: str, valor: bytes, ttl: int):
+        self._r.set(clave, valor, ex=ttl)
+
+    def incrementar(self, clave: str) -> int:
+        return self._r.incr(clave)
+
+def crear_backend(url: str = CACHE_URL) -> BackendCache:
+    if url.startswith(("redis://", "rediss://")):
+        return BackendRedis(url)
+    return BackendMemoria()
+
+backend: BackendCache = crear_backend()
+
+def _generacion(entidad: str) -> bytes:
+    return backend.leer(f"{PREFIJO}gen:{entidad}") or b"0"
+
+def _clave(entidad: str) -> str:
+    # Incluye la generación propia y la de las entidades de las que depende
+    gens = [_generacion(entidad)] + [_generacion(e) for e in sorted(DEPENDENCIAS.get(entidad, ()))]
+    return f"{PREFIJO}{entidad}:" + ".".join(g.decode() for g in gens)
+
+def _leer(entidad: str) -> Tuple[str, Optional[bytes]]:
+    clave = _clave(entidad)
+    return clave, backend.leer(clave)
+
+def obtener(entidad: str, armar: Callable[[], bytes]) -> Tuple[bytes, str]:
+    """(cuerpo JSON, etag) de la entidad; si no está cacheado, lo arma con `armar`."""
+    clave, cuerpo = _leer(entidad)
+    if cuerpo is None:
+        cuerpo = armar()
+        backend.escribir(clave, cuerpo, CACHE_TTL)
+    return cuerpo, etag_de(cuerpo)
+
+async def en_hilo(fn: Callable[..., Any], *args) -> Any:
+    """Llama a algo que usa el backend sin bloquear el event loop (solo Redis lo necesita)."""
+    if isinstance(backend, BackendMemoria): return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+async def obtener_async(entidad: str, armar: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, str]:
+    """Como obtener(), para endpoints async: `armar` es una corrutina."""
+    clave, cuerpo = await en_hilo(_leer, entidad)
+    if cuerpo is None:
+        cuerpo = await armar()
+        await en_hilo(backend.escribir, clave, cuerpo, CACHE_TTL)
+    return cuerpo, etag_de(cuerpo)
+
+def etag_de(cuerpo: bytes) -> str:
+    # Depende solo del contenido: igual en todos los workers
+    return '"' + hashlib.sha1(cuerpo).hexdigest() + '"'
+
+def invalidar(*entidades: str):
+    for entidad in entidades:
+        backend.incrementar(f"{PREFIJO}gen:{entidad}")
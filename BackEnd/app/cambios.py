@@ -0,0 +1,89 @@
+# BackEnd/app/cambios.py
+# Detección de cambios en el horario.
+#
+# Cualquier escritura (ORM, insert masivo, query.delete()) sobre las tablas que se ven en
+# un horario cambia la "revisión" guardada en ConfiguracionDB, dentro de la misma
+# transacción. Después del commit se avisa a los suscriptores (caché de exportes, etc.).
+
+import json
+import logging
+import uuid
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.database import AsignacionDB, AulaDB, ConfiguracionDB, CursoDB, MateriaDB, ProfesorDB
+
+logger = logging.getLogger(__name__)
+
+CLAVE_REVISION = "horarios_revision"
+
+# Tablas cuyo contenido aparece en un horario (un cambio de nombre también lo cambia)
+TABLAS_HORARIO = {t.__tablename__ for t in (AsignacionDB, CursoDB, MateriaDB, ProfesorDB, AulaDB)}
+
+# Suscriptor: fn(revision_nueva, tablas_cambiadas). Corre después del commit.
+Suscriptor = Callable[[str, Set[str]], None]
+_suscriptores: List[Suscriptor] = []
+
+def al_cambiar_horarios(fn: Suscriptor) -> Suscriptor:
+    """Decorador/registro de funciones a llamar cuando cambia el horario."""
+    _suscriptores.append(fn)
+    return fn
+
+def revision_actual(db: Session) -> str:
+    conf = db.execute(
+        select(ConfiguracionDB.value_json).where(ConfiguracionDB.key == CLAVE_REVISION)
+    ).scalar()
+    if not conf: return "0"
+    try: return json.loads(conf)
+    except ValueError: return "0"
+
+# --- GANCHOS DE SQLALCHEMY ---
+
+def _marcar(session: Session, tablas: Set[str]):
+    """Registra que la transacción tocó el horario y, la primera vez, cambia la revisión."""
+    tablas = tablas & TABLAS_HORARIO
+    if not tablas: return
+    session.info.setdefault("tablas_cambiadas", set()).update(tablas)
+    if "revision_nueva" in session.info: return
+
+    revision = uuid.uuid4().hex
+    session.info["revision_nueva"] = revision
+    # Core (no ORM) para no disparar de nuevo estos mismos eventos
+    conn = session.connection()
+    valor = json.dumps(revision)
+    tabla = ConfiguracionDB.__table__
+    res = conn.execute(update(tabla).where(tabla.c.key == CLAVE_REVISION).values(value_json=valor))
+    if res.rowcount == 0:
+        conn.execute(insert(tabla).values(key=CLAVE_REVISION, value_json=valor))
+
+@event.listens_for(Session, "after_flush")
+def _despues_de_flush(session, contexto):
+    tablas = {
+        obj.__table__.name for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    if tablas: _marcar(session, tablas)
+
+@event.listens_for(Session, "do_orm_execute")
+def _al_ejecutar(estado):
+    # insert(AsignacionDB) masivo, query(...).delete(), query(...).update()
+    if not (estado.is_insert or estado.is_update or estado.is_delete): return
+    tabla = getattr(estado.statement, "table", None)
+    nombre: Optional[str] = getattr(tabla, "name", None)
+    if nombre: _marcar(estado.session, {nombre})
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_commit(session):
+    revision = session.info.pop("revision_nueva", None)
+    tablas = session.info.pop("tablas_cambiadas", set())
+    if revision is None: return
+    for fn in list(_suscriptores):
+        try: fn(revision, tablas)
+        except Exception: logger.exception("Falló un suscriptor de cambios de horario")
+
+@event.listens_for(Session, "after_rollback")
+def _despues_de_rollback(session):
+    session.info.pop("revision_nueva", None)
+    session.info.pop("tablas_cambiadas", None)
@@ -0,0 +1,137 @@
+# BackEnd/app/configuracion.py
+# Configuración general (publicación, preferencias, datos de la institución) en memoria.
+#
+# Todas las claves de ConfiguracionDB se leen juntas (una consulta) en un objeto
+# `Configuracion` inmutable; las lecturas después no tocan la base.
+#
+# Escrituras: `escribir(db, campo=valor)` actualiza las filas y el sello "config_version"
+# en la transacción del llamador. Recién después del commit se reemplaza el objeto en
+# memoria y se incrementa la generación "config" en el backend de app.cache_respuestas:
+# con Redis los demás workers lo ven en la próxima lectura; en memoria (un proceso por
+# worker) cada worker recarga como mucho cada HORARIOS_CACHE_TTL segundos.
+#
+# Cada lectura consulta la generación en el backend. Los endpoints async la leen antes con
+# `await precargar(db)` (fuera del event loop) y obtener() usa esa en vez de ir a Redis.
+
+import json
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+import app.cache_respuestas as cache_respuestas
+from app.database import ConfiguracionDB
+
+logger = logging.getLogger(__name__)
+
+CLAVE_VERSION = "config_version"
+_GENERACION = f"{cache_respuestas.PREFIJO}gen:config"
+_INFO_GENERACION = "config_generacion"  # en session.info, la dejó precargar()
+
+@dataclass(frozen=True)
+class Configuracion:
+    horarios_publicados: bool = False
+    almuerzo_slots: Tuple[str, ...] = ()
+    institucion_nombre: str = ""
+    institucion_direccion: str = ""
+    institucion_logo_hash: Optional[str] = None
+    version: int = 0
+
+class Campo(NamedTuple):
+    clave: str                       # key en ConfiguracionDB
+    desde_json: Callable[[Any], Any]
+    a_json: Callable[[Any], Any]
+
+def _texto(valor) -> str:
+    return valor if isinstance(valor, str) else ""
+
+# Formato guardado igual que antes (las bases existentes se leen sin migrar)
+CAMPOS: Dict[str, Campo] = {
+    "horarios_publicados": Campo("horarios_publicados", lambda v: v is True, bool),
+    "almuerzo_slots": Campo(
+        "preferencias_horarios",
+        lambda v: tuple(v.get("almuerzo_slots", [])) if isinstance(v, dict) else (),
+        lambda slots: {"almuerzo_slots": list(slots)},
+    ),
+    "institucion_nombre": Campo("institucion_nombre", _texto, lambda v: v or ""),
+    "institucion_direccion": Campo("institucion_direccion", _texto, lambda v: v or ""),
+    "institucion_logo_hash": Campo("institucion_logo_hash", lambda v: v or None, lambda v: v),
+}
+
+# --- LECTURA ---
+
+def leer_de_la_base(db: Session) -> Configuracion:
+    """Arma la configuración con una sola consulta."""
+    claves = [c.clave for c in CAMPOS.values()] + [CLAVE_VERSION]
+    crudos = dict(db.execute(
+        select(ConfiguracionDB.key, ConfiguracionDB.value_json).where(ConfiguracionDB.key.in_(claves))
+    ).all())
+    valores = {}
+    for nombre, campo in CAMPOS.items():
+        if crudos.get(campo.clave) is None: continue
+        try: valores[nombre] = campo.desde_json(json.loads(crudos[campo.clave]))
+        except (ValueError, TypeError, AttributeError):
+            logger.warning("Configuración '%s' ilegible; se usa el valor por defecto", campo.clave)
+    try: valores["version"] = int(json.loads(crudos.get(CLAVE_VERSION) or "0"))
+    except (ValueError, TypeError): pass
+    return Configuracion(**valores)
+
+# (configuración, generación con la que se cargó, momento de carga). Se reemplaza entera.
+_estado: Tuple[Optional[Configuracion], Optional[bytes], float] = (None, None, 0.0)
+
+def _generacion() -> Optional[bytes]:
+    return cache_respuestas.backend.leer(_GENERACION)
+
+async def precargar(db) -> None:
+    """Para endpoints async (`db`: AsyncSession): lee la generación en el threadpool y la deja
+    en la sesión, así obtener() dentro de run_sync no hace I/O bloqueante en el event loop."""
+    db.info[_INFO_GENERACION] = await cache_respuestas.en_hilo(_generacion)
+
+def obtener(db: Session) -> Configuracion:
+    """La configuración vigente; solo va a la base si otro worker la cambió o venció el TTL."""
+    global _estado
+    actual, generacion, cargada = _estado
+    vigente = db.info[_INFO_GENERACION] if _INFO_GENERACION in db.info else _generacion()
+    if actual is None or generacion != vigente or time.monotonic() - cargada > cache_respuestas.CACHE_TTL:
+        actual = leer_de_la_base(db)
+        _estado = (actual, vigente, time.monotonic())
+    return actual
+
+# --- ESCRITURA ---
+
+def escribir(db: Session, **valores) -> Configuracion:
+    """Guarda los campos dados en la transacción de `db` (el commit lo hace el llamador)."""
+    desconocidos = set(valores) - set(CAMPOS)
+    if desconocidos: raise ValueError(f"Campos de configuración desconocidos: {', '.join(sorted(desconocidos))}")
+
+    # Se parte de lo que hay en la base (no de la memoria) para no pisar cambios de otro
+    # worker; la versión sube una vez por transacción
+    pendiente = db.info.get("config_pendiente")
+    base = pendiente or leer_de_la_base(db)
+    nueva = replace(base, **valores, version=base.version + (0 if pendiente else 1))
+    tabla = ConfiguracionDB.__table__
+    filas = {CAMPOS[n].clave: CAMPOS[n].a_json(v) for n, v in valores.items()}
+    filas[CLAVE_VERSION] = nueva.version
+    for clave, valor in filas.items():
+        res = db.execute(update(tabla).where(tabla.c.key == clave).values(value_json=json.dumps(valor)))
+        if res.rowcount == 0:
+            db.execute(insert(tabla).values(key=clave, value_json=json.dumps(valor)))
+    db.info["config_pendiente"] = nueva
+    return nueva
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_commit(session):
+    global _estado
+    nueva = session.info.pop("config_pendiente", None)
+    if nueva is None: return
+    generacion = None  # si no se pudo avisar, la próxima lectura recarga de la base
+    try: generacion = str(cache_respuestas.backend.incrementar(_GENERACION)).encode()
+    except Exception: logger.exception("No se pudo avisar el cambio de configuración")
+    _estado = (nueva, generacion, time.monotonic())
+
+@event.listens_for(Session, "after_rollback")
+def _despues_de_rollback(session):
+    session.info.pop("config_pendiente", None)
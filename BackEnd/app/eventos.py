@@ -0,0 +1,291 @@
+# BackEnd/app/eventos.py
+# Aviso en vivo de cambios en el horario (WebSocket / SSE) en lugar de recargar la grilla.
+#
+# Cada worker tiene una foto de horarios_generados (id -> curso, profe, aula, materia, slot).
+# Los mismos ganchos de sesión que usa app.cambios anotan QUÉ asignaciones tocó la
+# transacción (objetos nuevos/modificados/borrados del flush, ids de los insert/update
+# masivos, y para update/delete con WHERE los ids que cumplen el WHERE). Después del commit
+# el worker que lo hizo relee solo esas filas, las compara con su foto y publica las diferencias:
+#   {"tipo": "movido",  "id", "curso_id", "profesor_id", "aula_id", "materia_id", "desde", "hasta"}
+#   {"tipo": "agregado" / "quitado", "id", "curso_id", "profesor_id", "aula_id", "materia_id", "slot"}
+# (slots en formato "Lunes-07:40"). Un cambio de profe o aula va como quitado + agregado.
+#
+# El lote se publica en el bus: en memoria (un solo proceso) o Redis pub/sub si
+# HORARIOS_EVENTOS_URL=redis://... (varios workers). Cada worker lo recibe, actualiza su foto
+# y se lo reparte a sus clientes según lo que siguen (curso, profesor y/o aula). Si a un
+# cliente le tocan demasiados eventos juntos recibe {"tipo": "recargar"}; si la transacción
+# tocó la tabla entera (ej: se regeneró todo) se relee la foto completa y todos reciben "recargar".
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Protocol, Set
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.database import AsignacionDB, SessionLocal
+from app.grilla import N_HORAS, clave_de
+
+logger = logging.getLogger(__name__)
+
+EVENTOS_URL = os.getenv("HORARIOS_EVENTOS_URL", "memoria://")
+CANAL_REDIS = "horarios:eventos"
+MAX_EVENTOS_POR_CLIENTE = 50  # más que esto en un lote -> "recargar"
+TAMANIO_COLA = 100
+RECARGAR = {"tipo": "recargar"}
+LOTE_IDS = 500  # ids por consulta al releer filas puntuales
+
+ORIGEN = uuid.uuid4().hex  # identifica a este worker en el bus
+
+# --- FOTO DEL HORARIO ---
+
+class Modulo(NamedTuple):
+    curso_id: Optional[str]
+    profesor_id: Optional[str]
+    aula_id: Optional[str]
+    materia_id: Optional[str]
+    slot: Optional[str]
+
+Foto = Dict[str, Modulo]
+
+def _consulta_foto(db: Session):
+    return db.query(AsignacionDB.id, AsignacionDB.curso_id, AsignacionDB.profesor_id, AsignacionDB.aula_id,
+                    AsignacionDB.materia_id, AsignacionDB.dia_idx, AsignacionDB.hora_idx)
+
+def _a_foto(foto: Foto, filas):
+    for f in filas:
+        slot = clave_de(f.dia_idx * N_HORAS + f.hora_idx) if f.dia_idx is not None and f.hora_idx is not None else None
+        foto[f.id] = Modulo(f.curso_id, f.profesor_id, f.aula_id, f.materia_id, slot)
+
+def leer_foto(db: Session) -> Foto:
+    foto = {}
+    _a_foto(foto, _consulta_foto(db).all())
+    return foto
+
+def leer_filas(db: Session, ids: Iterable[str]) -> Foto:
+    """Foto parcial: solo las asignaciones dadas que todavía existen."""
+    ids, foto = list(ids), {}
+    for i in range(0, len(ids), LOTE_IDS):
+        _a_foto(foto, _consulta_foto(db).filter(AsignacionDB.id.in_(ids[i:i + LOTE_IDS])).all())
+    return foto
+
+def _evento(tipo: str, aid: str, m: Modulo, **extra) -> dict:
+    return {"tipo": tipo, "id": aid, "curso_id": m.curso_id, "profesor_id": m.profesor_id,
+            "aula_id": m.aula_id, "materia_id": m.materia_id, **extra}
+
+def diferencias(antes: Foto, despues: Foto) -> List[dict]:
+    eventos = []
+    for aid, viejo in antes.items():
+        nuevo = despues.get(aid)
+        if nuevo is None:
+            eventos.append(_evento("quitado", aid, viejo, slot=viejo.slot))
+        elif nuevo[:4] != viejo[:4]:
+            eventos.append(_evento("quitado", aid, viejo, slot=viejo.slot))
+            eventos.append(_evento("agregado", aid, nuevo, slot=nuevo.slot))
+        elif nuevo.slot != viejo.slot:
+            eventos.append(_evento("movido", aid, nuevo, desde=viejo.slot, hasta=nuevo.slot))
+    eventos.extend(_evento("agregado", aid, m, slot=m.slot) for aid, m in despues.items() if aid not in antes)
+    return eventos
+
+def aplicar(foto: Foto, eventos: List[dict]):
+    """Actualiza la foto con eventos que publicó otro worker."""
+    for e in eventos:
+        if e["tipo"] == "recargar": continue
+        if e["tipo"] == "quitado":
+            foto.pop(e["id"], None)
+        else:
+            slot = e.get("hasta") if e["tipo"] == "movido" else e.get("slot")
+            foto[e["id"]] = Modulo(e["curso_id"], e["profesor_id"], e["aula_id"], e["materia_id"], slot)
+
+# --- BUS ENTRE WORKERS ---
+
+class BusEventos(Protocol):
+    def publicar(self, mensaje: bytes) -> None: ...
+    def escuchar(self, entregar: Callable[[bytes], None]) -> None: ...
+    def cerrar(self) -> None: ...
+
+class BusMemoria:
+    def __init__(self):
+        self._entregar: Optional[Callable[[bytes], None]] = None
+
+    def publicar(self, mensaje: bytes):
+        if self._entregar: self._entregar(mensaje)
+
+    def escuchar(self, entregar: Callable[[bytes], None]):
+        self._entregar = entregar
+
+    def cerrar(self):
+        self._entregar = None
+
+class BusRedis:
+    def __init__(self, url: str):
+        import redis  # dependencia opcional, solo si se configura
+        self._r = redis.Redis.from_url(url)
+        self._pubsub = None
+
+    def publicar(self, mensaje: bytes):
+        self._r.publish(CANAL_REDIS, mensaje)
+
+    def escuchar(self, entregar: Callable[[bytes], None]):
+        self._pubsub = self._r.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{CANAL_REDIS: lambda m: entregar(m["data"])})
+        self._hilo = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def cerrar(self):
+        if self._pubsub is not None:
+            self._hilo.stop()
+            self._pubsub.close()
+
+def crear_bus(url: str = EVENTOS_URL) -> BusEventos:
+    if url.startswith(("redis://", "rediss://")):
+        return BusRedis(url)
+    return BusMemoria()
+
+# --- CLIENTES CONECTADOS (en el event loop) ---
+
+class Suscripcion:
+    def __init__(self, canales: Set[str]):
+        self.canales = canales
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=TAMANIO_COLA)
+
+    def entregar(self, eventos: List[dict]):
+        if len(eventos) > MAX_EVENTOS_POR_CLIENTE:
+            eventos = [RECARGAR]
+        for e in eventos:
+            try: self.cola.put_nowait(e)
+            except asyncio.QueueFull:
+                # Se quedó atrás: que recargue la grilla entera
+                while not self.cola.empty(): self.cola.get_nowait()
+                self.cola.put_nowait(RECARGAR)
+                return
+
+def canales_de(evento: dict) -> Set[str]:
+    return {f"{tipo}:{evento[f'{tipo}_id']}" for tipo in ("curso", "profesor", "aula") if evento.get(f"{tipo}_id")}
+
+_suscripciones: Set[Suscripcion] = set()
+
+def _repartir(eventos: List[dict]):
+    for s in list(_suscripciones):
+        propios = [e for e in eventos if e["tipo"] == "recargar" or s.canales & canales_de(e)]
+        if propios: s.entregar(propios)
+
+@contextmanager
+def suscribir(curso: Optional[str] = None, profesor: Optional[str] = None, aula: Optional[str] = None) -> Iterator[Suscripcion]:
+    canales = {f"{t}:{v}" for t, v in (("curso", curso), ("profesor", profesor), ("aula", aula)) if v}
+    s = Suscripcion(canales)
+    _suscripciones.add(s)
+    try: yield s
+    finally: _suscripciones.discard(s)
+
+# --- CICLO DE VIDA ---
+
+# Todo lo que toca la foto corre en este hilo, en orden
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eventos")
+_foto: Optional[Foto] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_bus: BusEventos = BusMemoria()
+
+def _al_recibir(mensaje: bytes):
+    # Corre en el hilo del bus (o en el que publicó, con el bus en memoria)
+    datos = json.loads(mensaje)
+    if datos["origen"] != ORIGEN:
+        _pool.submit(_aplicar_remotos, datos["eventos"])
+    if _loop is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_repartir, datos["eventos"])
+
+def _aplicar_remotos(eventos: List[dict]):
+    if _foto is not None: aplicar(_foto, eventos)
+
+def _cargar_foto():
+    global _foto
+    db = SessionLocal()
+    try: _foto = leer_foto(db)
+    finally: db.close()
+
+def _publicar(eventos: List[dict]):
+    if eventos:
+        _bus.publicar(json.dumps({"origen": ORIGEN, "eventos": eventos}, separators=(",", ":")).encode())
+
+def _publicar_cambios(ids: Optional[Set[str]]):
+    """`ids`: asignaciones que tocó la transacción; None = la tabla entera."""
+    if _foto is None or ids is None:
+        # Sin foto previa no hay con qué comparar; con la tabla entera, mejor que recarguen
+        _cargar_foto()
+        return _publicar([RECARGAR])
+    db = SessionLocal()
+    try: despues = leer_filas(db, ids)
+    finally: db.close()
+    antes = {aid: _foto[aid] for aid in ids if aid in _foto}
+    for aid in antes.keys() - despues.keys(): del _foto[aid]
+    _foto.update(despues)
+    _publicar(diferencias(antes, despues))
+
+def _seguro(fn: Callable[..., None]) -> Callable[..., None]:
+    def envuelta(*args):
+        try: fn(*args)
+        except Exception: logger.exception("Falló la actualización de eventos del horario")
+    return envuelta
+
+# --- GANCHOS DE SQLALCHEMY: qué asignaciones tocó la transacción ---
+# session.info["asignaciones_tocadas"]: set de ids, o None si fue la tabla entera
+
+TODAS = None
+
+def _anotar(session: Session, ids: Optional[Iterable[str]]):
+    if _loop is None: return
+    if ids is TODAS:
+        session.info["asignaciones_tocadas"] = TODAS
+        return
+    tocadas = session.info.setdefault("asignaciones_tocadas", set())
+    if tocadas is not TODAS: tocadas.update(ids)
+
+@event.listens_for(Session, "after_flush")
+def _despues_de_flush(session, contexto):
+    ids = [obj.id for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, AsignacionDB)]
+    if ids: _anotar(session, ids)
+
+def _ids_de_parametros(parametros) -> Optional[List[str]]:
+    filas = parametros if isinstance(parametros, (list, tuple)) else [parametros] if parametros else []
+    ids = [f.get("id") for f in filas]
+    return ids if ids and all(ids) else None
+
+@event.listens_for(Session, "do_orm_execute")
+def _al_ejecutar(estado):
+    # insert/update masivos (ids en los parámetros) y update/delete con WHERE
+    if _loop is None or not (estado.is_insert or estado.is_update or estado.is_delete): return
+    if getattr(getattr(estado.statement, "table", None), "name", None) != AsignacionDB.__tablename__: return
+    ids = _ids_de_parametros(estado.parameters)
+    if ids is None and not estado.is_insert and estado.statement.whereclause is not None:
+        # Antes de que corra: qué filas va a tocar
+        ids = estado.session.execute(select(AsignacionDB.id).where(estado.statement.whereclause)).scalars().all()
+    _anotar(estado.session, ids)
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_commit(session):
+    if "asignaciones_tocadas" not in session.info: return
+    ids = session.info.pop("asignaciones_tocadas")
+    if _loop is not None and (ids is TODAS or ids):
+        _pool.submit(_seguro(_publicar_cambios), ids)
+
+@event.listens_for(Session, "after_rollback")
+def _despues_de_rollback(session):
+    session.info.pop("asignaciones_tocadas", None)
+
+def iniciar(loop: asyncio.AbstractEventLoop, url: str = EVENTOS_URL):
+    """Se llama al arrancar la app (lifespan): carga la foto y empieza a escuchar el bus."""
+    global _loop, _bus
+    _loop = loop
+    _bus = crear_bus(url)
+    _bus.escuchar(_al_recibir)
+    _pool.submit(_seguro(_cargar_foto))
+
+def detener():
+    global _loop, _foto
+    _bus.cerrar()
+    _loop = None
+    _foto = None
@@ -0,0 +1,254 @@
+# BackEnd/app/exportar.py
+# Exportación de horarios a Excel (todos los cursos o una sola entidad) y CSV.
+# Se arma en modo write-only (fila por fila, sin tener todo el libro en memoria),
+# sobre un archivo temporal que se manda al cliente en pedazos.
+#
+# Los exportes completos se guardan en disco por revisión del horario (ver app.cambios):
+# mientras no se escriba nada, se sirve el mismo archivo (y el mismo ETag). Después de
+# cada cambio se vuelven a armar en segundo plano.
+
+import csv
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from sqlalchemy.orm import Session
+
+import app.cambios as cambios
+from app.database import AsignacionDB, AulaDB, CursoDB, MateriaDB, ProfesorDB, SessionLocal
+from app.grilla import DIAS_SEMANA, HORARIOS_ORDENADOS
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MEDIA_TYPE_CSV = "text/csv; charset=utf-8"
+TAMANIO_CHUNK = 64 * 1024
+MAX_EN_MEMORIA = 8 * 1024 * 1024  # hasta 8 MB el temporal vive en RAM, después va a disco
+DIR_CACHE = os.getenv("HORARIOS_EXPORT_CACHE_DIR", "./cache_exportes")
+
+# Estilos compartidos: se crean una sola vez, no por celda
+FUENTE_ENCABEZADO = Font(bold=True, color="FFFFFF")
+RELLENO_ENCABEZADO = PatternFill("solid", fgColor="1D72B8")
+
+# Vista de una hoja: (hora, dia) -> texto de la celda
+Vista = Dict[Tuple[str, str], str]
+
+def vistas_por_curso(db: Session) -> Iterator[Tuple[str, Vista]]:
+    """Una sola consulta (con los nombres ya resueltos) y una sola pasada para agrupar por curso."""
+    filas = db.query(
+        AsignacionDB.curso_id, AsignacionDB.dia, AsignacionDB.hora_rango,
+        MateriaDB.nombre, ProfesorDB.nombre, AulaDB.nombre
+    ).outerjoin(MateriaDB, MateriaDB.id == AsignacionDB.materia_id)\
+     .outerjoin(ProfesorDB, ProfesorDB.id == AsignacionDB.profesor_id)\
+     .outerjoin(AulaDB, AulaDB.id == AsignacionDB.aula_id).all()
+
+    por_curso: Dict[str, Vista] = {}
+    for curso_id, dia, hora, mat, prof, aula in filas:
+        aula_txt = f" [{aula}]" if aula else ""
+        por_curso.setdefault(curso_id, {})[(hora, dia)] = f"{mat or '??'}\n({prof or '??'}){aula_txt}"
+
+    for c in db.query(CursoDB.id, CursoDB.anio, CursoDB.division).all():
+        yield f"{c.anio} '{c.division}'", por_curso.get(c.id, {})
+
+# --- EXPORTE DE UNA SOLA ENTIDAD ---
+
+class Entidad(NamedTuple):
+    columna: object                       # columna de AsignacionDB por la que se filtra (indexada)
+    titulo: Callable[[Session, str], Optional[str]]
+    celda: Callable[..., str]             # (materia, curso, profesor, aula) -> texto
+
+def _titulo_curso(db: Session, cid: str) -> Optional[str]:
+    c = db.query(CursoDB.anio, CursoDB.division).filter(CursoDB.id == cid).first()
+    return f"{c.anio} '{c.division}'" if c else None
+
+def _titulo_nombre(modelo):
+    return lambda db, eid: db.query(modelo.nombre).filter(modelo.id == eid).scalar()
+
+# Mismo texto que las grillas de pantalla (get_horario_curso / get_horario_profesor_admin)
+ENTIDADES: Dict[str, Entidad] = {
+    "curso": Entidad(
+        AsignacionDB.curso_id, _titulo_curso,
+        lambda mat, cur, prof, aula: f"{mat or '??'}\n({prof or '??'})" + (f" [{aula}]" if aula else "")),
+    "profesor": Entidad(
+        AsignacionDB.profesor_id, _titulo_nombre(ProfesorDB),
+        lambda mat, cur, prof, aula: f"{mat or '?'}\n({cur or '?'})" + (f" [{aula}]" if aula else "")),
+    "aula": Entidad(
+        AsignacionDB.aula_id, _titulo_nombre(AulaDB),
+        lambda mat, cur, prof, aula: f"{mat or '?'}\n({cur or '?'}) {prof or ''}".rstrip()),
+}
+
+def vista_de_entidad(db: Session, tipo: str, entidad_id: str) -> Optional[Tuple[str, Vista]]:
+    """(título, vista) de un curso, profesor o aula; None si no existe.
+    Solo lee las filas de esa entidad (filtro por columna indexada)."""
+    entidad = ENTIDADES[tipo]
+    titulo = entidad.titulo(db, entidad_id)
+    if titulo is None: return None
+
+    filas = db.query(
+        AsignacionDB.dia, AsignacionDB.hora_rango, MateriaDB.nombre,
+        CursoDB.anio, CursoDB.division, ProfesorDB.nombre, AulaDB.nombre
+    ).outerjoin(MateriaDB, MateriaDB.id == AsignacionDB.materia_id)\
+     .outerjoin(CursoDB, CursoDB.id == AsignacionDB.curso_id)\
+     .outerjoin(ProfesorDB, ProfesorDB.id == AsignacionDB.profesor_id)\
+     .outerjoin(AulaDB, AulaDB.id == AsignacionDB.aula_id)\
+     .filter(entidad.columna == entidad_id).all()
+
+    vista: Vista = {}
+    for dia, hora, mat, anio, division, prof, aula in filas:
+        curso = f"{anio} {division}" if anio is not None else None
+        vista[(hora, dia)] = entidad.celda(mat, curso, prof, aula)
+    return titulo, vista
+
+def nombre_archivo(titulo: str, extension: str) -> str:
+    # Solo ASCII en el header: "2° Año 'A'" -> "Horario_2_Ano_A.xlsx"
+    ascii_ = unicodedata.normalize("NFKD", titulo).encode("ascii", "ignore").decode()
+    return f"Horario_{re.sub(r'[^0-9A-Za-z]+', '_', ascii_).strip('_') or 'export'}.{extension}"
+
+# --- ESCRITURA ---
+
+ENCABEZADO = ['Hora'] + DIAS_SEMANA
+
+def filas_grilla(vista: Vista) -> Iterator[List[str]]:
+    for h in HORARIOS_ORDENADOS:
+        yield [h] + [vista.get((h, d), "") for d in DIAS_SEMANA]
+
+def iterar_csv(vista: Vista) -> Iterator[str]:
+    """CSV de una grilla, fila por fila. Empieza con BOM para que Excel respete los acentos."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("\ufeff")
+    for fila in (ENCABEZADO, *filas_grilla(vista)):
+        escritor.writerow(fila)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+MAX_TITULO_HOJA = 31  # límite de Excel
+_INVALIDOS_HOJA = re.compile(r"[\\/?*:\[\]]")
+
+def titulo_de_hoja(titulo: str, usados: Set[str]) -> str:
+    """Nombre válido y único (sin distinguir mayúsculas, como Excel) para una hoja:
+    sin / \\ ? * : [ ], hasta 31 caracteres y con sufijo " (2)", " (3)"... si se repite."""
+    base = _INVALIDOS_HOJA.sub("-", titulo).strip().strip("'")[:MAX_TITULO_HOJA] or "Hoja"
+    candidato, n = base, 1
+    while candidato.lower() in usados:
+        n += 1
+        sufijo = f" ({n})"
+        candidato = base[:MAX_TITULO_HOJA - len(sufijo)] + sufijo
+    usados.add(candidato.lower())
+    return candidato
+
+def escribir_excel(hojas: Iterable[Tuple[str, Vista]]):
+    """Escribe un libro (una hoja por vista) y devuelve el archivo temporal, ya rebobinado."""
+    wb = openpyxl.Workbook(write_only=True)
+    usados: Set[str] = set()
+    for titulo, vista in hojas:
+        ws = wb.create_sheet(titulo_de_hoja(titulo, usados))
+        # En write-only los anchos se definen antes de escribir filas
+        ws.column_dimensions['A'].width = 15
+        for col in ['B', 'C', 'D', 'E', 'F']:
+            ws.column_dimensions[col].width = 25
+
+        ws.append([_celda_encabezado(ws, v) for v in ENCABEZADO])
+        for fila in filas_grilla(vista):
+            ws.append(fila)
+
+    archivo = tempfile.SpooledTemporaryFile(max_size=MAX_EN_MEMORIA)
+    wb.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+def _celda_encabezado(ws, valor):
+    celda = WriteOnlyCell(ws, value=valor)
+    celda.font = FUENTE_ENCABEZADO
+    celda.fill = RELLENO_ENCABEZADO
+    return celda
+
+def iterar_archivo(archivo) -> Iterator[bytes]:
+    """Generador para StreamingResponse; cierra (y borra) el temporal al terminar."""
+    try:
+        while True:
+            chunk = archivo.read(TAMANIO_CHUNK)
+            if not chunk: break
+            yield chunk
+    finally:
+        archivo.close()
+
+# --- CACHÉ EN DISCO ---
+
+class Formato(NamedTuple):
+    extension: str
+    media_type: str
+    armar: Callable[[Session], object]  # devuelve un archivo rebobinado
+
+# Exportes completos que se cachean (un formato nuevo se registra acá)
+FORMATOS: Dict[str, Formato] = {
+    "xlsx": Formato("xlsx", MEDIA_TYPE_XLSX, lambda db: escribir_excel(vistas_por_curso(db))),
+}
+
+_lock_armado = threading.Lock()
+_pool_previo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exportes")
+
+def etag_de(formato: str, revision: str) -> str:
+    return f'"{formato}-{revision}"'
+
+def _ruta(formato: str, revision: str) -> str:
+    return os.path.join(DIR_CACHE, f"horarios-{revision}.{FORMATOS[formato].extension}")
+
+def exporte_cacheado(db: Session, formato: str, revision: str):
+    """Devuelve el archivo abierto del exporte de `revision` (la actual); lo arma si falta."""
+    try:
+        return open(_ruta(formato, revision), "rb")
+    except FileNotFoundError:
+        pass
+    return _armar(db, formato, revision)
+
+def _armar(db: Session, formato: str, revision: str):
+    """Arma el exporte y lo deja en la caché si la revisión no cambió mientras tanto."""
+    ruta = _ruta(formato, revision)
+    with _lock_armado:
+        if os.path.exists(ruta): return open(ruta, "rb")
+        archivo = FORMATOS[formato].armar(db)
+        if cambios.revision_actual(db) != revision:
+            return archivo  # hubo escrituras en el medio: se sirve, pero no se guarda
+
+        os.makedirs(DIR_CACHE, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=DIR_CACHE, suffix=".tmp", delete=False) as tmp:
+            shutil.copyfileobj(archivo, tmp)
+        archivo.close()
+        os.replace(tmp.name, ruta)  # atómico: nadie lee un archivo a medio escribir
+        _limpiar(formato, ruta)
+    return open(ruta, "rb")
+
+def _limpiar(formato: str, vigente: str):
+    sufijo = "." + FORMATOS[formato].extension
+    for nombre in os.listdir(DIR_CACHE):
+        ruta = os.path.join(DIR_CACHE, nombre)
+        if nombre.startswith("horarios-") and nombre.endswith(sufijo) and ruta != vigente:
+            try: os.remove(ruta)
+            except OSError: pass  # alguien lo está descargando (Windows); se borra la próxima
+
+def _armar_en_segundo_plano(revision: str):
+    db = SessionLocal()
+    try:
+        if cambios.revision_actual(db) != revision: return  # ya hay otra más nueva en la cola
+        for formato in FORMATOS:
+            _armar(db, formato, revision).close()
+    except Exception:
+        logger.exception("No se pudo armar el exporte de la revisión %s", revision)
+    finally:
+        db.close()
+
+@cambios.al_cambiar_horarios
+def _al_cambiar(revision: str, tablas: Set[str]):
+    _pool_previo.submit(_armar_en_segundo_plano, revision)
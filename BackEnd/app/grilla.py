@@ -0,0 +1,106 @@
+# BackEnd/app/grilla.py
+
+from typing import Iterable, List, Optional, Tuple
+
+# --- CONSTANTES DE LA GRILLA SEMANAL ---
+HORARIOS_ORDENADOS = [
+  "07:40", "08:20", "09:00", "09:40", "10:20", "11:00", "11:40", "12:20",
+  "13:00", "13:40", "14:20", "15:00", "15:40", "16:20", "17:00",
+  "17:40", "18:20", "19:00", "19:40", "20:20", "21:00", "21:40", "22:20"
+]
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
+
+N_HORAS = len(HORARIOS_ORDENADOS)
+N_DIAS = len(DIAS_SEMANA)
+N_SLOTS = N_DIAS * N_HORAS  # 5 x 23 = 115 módulos por semana
+
+# Máscara con los 115 bits encendidos (toda la semana libre)
+MASCARA_SEMANA = (1 << N_SLOTS) - 1
+BYTES_MASCARA = (N_SLOTS + 7) // 8  # 15 bytes para guardarla en la base
+
+_INDICE_DIA = {d: i for i, d in enumerate(DIAS_SEMANA)}
+_INDICE_HORA = {h: i for i, h in enumerate(HORARIOS_ORDENADOS)}
+
+# --- CONVERSIÓN DÍA/HORA <-> SLOT ---
+# Un "slot" es un entero 0..114. El orden es día-mayor (todo el Lunes, luego el Martes...)
+# que es el mismo orden en el que el generador recorre la semana.
+
+def indice_dia(dia: str) -> Optional[int]:
+    return _INDICE_DIA.get(dia)
+
+def indice_hora(hora: str) -> Optional[int]:
+    """Acepta 'HH:MM' o el formato largo 'HH:MM a HH:MM'."""
+    if hora is None: return None
+    return _INDICE_HORA.get(hora[:5])
+
+def slot_index(dia: str, hora: str) -> Optional[int]:
+    d = indice_dia(dia)
+    h = indice_hora(hora)
+    if d is None or h is None: return None
+    return d * N_HORAS + h
+
+def slot_de(slot: int) -> Tuple[str, str]:
+    """Devuelve (dia, hora) a partir del índice de slot."""
+    d, h = divmod(slot, N_HORAS)
+    return DIAS_SEMANA[d], HORARIOS_ORDENADOS[h]
+
+def slot_desde_clave(clave: str) -> Optional[int]:
+    """Convierte 'Lunes-07:40' (formato de disponibilidad del frontend) en slot."""
+    if not clave or "-" not in clave: return None
+    dia, hora = clave.split("-", 1)
+    return slot_index(dia, hora)
+
+def clave_de(slot: int) -> str:
+    dia, hora = slot_de(slot)
+    return f"{dia}-{hora}"
+
+# --- MÁSCARAS DE BITS ---
+
+def mascara_desde_claves(claves: Iterable[str]) -> int:
+    """['Lunes-07:40', ...] -> entero con un bit por slot. Ignora claves desconocidas."""
+    m = 0
+    for c in claves:
+        s = slot_desde_clave(c)
+        if s is not None: m |= 1 << s
+    return m
+
+def claves_desde_mascara(mascara: int) -> List[str]:
+    return [clave_de(s) for s in iterar_slots(mascara)]
+
+def mascara_de_horas(horas: Iterable[str]) -> int:
+    """Máscara con las horas dadas encendidas en los 5 días (ej: franjas de almuerzo)."""
+    m = 0
+    for hora in horas:
+        h = indice_hora(hora)
+        if h is None: continue
+        for d in range(N_DIAS):
+            m |= 1 << (d * N_HORAS + h)
+    return m
+
+def mascara_a_bytes(mascara: int) -> bytes:
+    return (mascara & MASCARA_SEMANA).to_bytes(BYTES_MASCARA, "little")
+
+def mascara_desde_bytes(datos: Optional[bytes]) -> int:
+    return int.from_bytes(datos, "little") & MASCARA_SEMANA if datos else 0
+
+MASCARA_DIA = (1 << N_HORAS) - 1
+
+def mascara_del_dia(mascara: int, dia_idx: int) -> int:
+    """Los 23 bits de un día (bit 0 = primera hora)."""
+    return (mascara >> (dia_idx * N_HORAS)) & MASCARA_DIA
+
+def huecos(mascara: int) -> int:
+    """Horas libres entre el primer y el último módulo de cada día, sumadas en la semana."""
+    total = 0
+    for d in range(N_DIAS):
+        dia = mascara_del_dia(mascara, d)
+        if dia:
+            total += dia.bit_length() - (dia & -dia).bit_length() + 1 - dia.bit_count()
+    return total
+
+def iterar_slots(mascara: int):
+    """Recorre los slots encendidos de menor a mayor."""
+    while mascara:
+        bajo = mascara & -mascara
+        yield bajo.bit_length() - 1
+        mascara ^= bajo
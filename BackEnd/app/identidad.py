@@ -0,0 +1,32 @@
+# BackEnd/app/identidad.py
+# Usuario -> profesor. Los tokens nuevos ya traen el id del profesor ("pid");
+# para los viejos se busca por nombre una vez y queda en memoria hasta que cambie
+# la tabla de profesores.
+
+import threading
+from typing import Dict, Optional, Set
+
+from sqlalchemy.orm import Session
+
+import app.cambios as cambios
+from app.database import ProfesorDB
+
+_profesor_por_usuario: Dict[str, Optional[str]] = {}
+_lock = threading.Lock()
+
+def profesor_id_de(db: Session, usuario: dict) -> Optional[str]:
+    """Id del profesor del usuario logueado (dict de get_current_user)."""
+    if usuario.get("profesor_id"): return usuario["profesor_id"]
+    username = usuario["username"]
+    if username in _profesor_por_usuario: return _profesor_por_usuario[username]
+    # En esta base los profes usan su nombre como usuario
+    pid = db.query(ProfesorDB.id).filter(ProfesorDB.nombre == username).scalar()
+    with _lock:
+        _profesor_por_usuario[username] = pid
+    return pid
+
+@cambios.al_cambiar_horarios
+def _al_cambiar(revision: str, tablas: Set[str]):
+    if ProfesorDB.__tablename__ in tablas:
+        with _lock:
+            _profesor_por_usuario.clear()
@@ -0,0 +1,217 @@
+# BackEnd/app/importar.py
+# Importación masiva de catálogos desde un Excel (una hoja por entidad) o un CSV (una entidad).
+#
+# - El Excel se lee en modo read-only (fila por fila, sin cargar el libro entero).
+# - Los nombres se resuelven a ids con mapas en memoria, armados con UNA consulta por tabla;
+#   las filas nuevas se agregan al mapa, así los requisitos pueden usar cursos del mismo archivo.
+# - Todo se inserta en lotes y en una sola transacción. Si alguna fila tiene errores no se
+#   guarda nada y se devuelve el detalle por fila.
+#
+# Hojas/entidades (en este orden) y sus columnas (* = obligatoria):
+#   cursos:      anio*, division*, cantidad_alumnos, turno
+#   materias:    nombre*, color_hex
+#   aulas:       nombre*, tipo, capacidad
+#   profesores:  nombre*, dni, color, disponibilidad ("Lunes-07:40;Martes-08:20")
+#   requisitos:  curso_anio*, curso_division*, materia*, horas_semanales*, profesor, aula
+
+import codecs
+import csv
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import openpyxl
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import app.seguridad as seguridad
+from app.database import (
+    AulaDB, CursoDB, MateriaDB, ProfesorDB, RequisitoDB, UsuarioDB, columnas_disponibilidad
+)
+from app.grilla import slot_desde_clave
+
+ENTIDADES = ("cursos", "materias", "aulas", "profesores", "requisitos")
+TAMANIO_LOTE = 500
+
+Fila = Dict[str, str]
+
+# Enteros: "3", o "3.0" como los guarda Excel en una celda numérica. Nada de "2.7", "1e3", "inf"
+_ENTERO = re.compile(r"^[+-]?(\d+)(?:\.0*)?$")
+
+class ErrorDeFila(ValueError):
+    pass
+
+@dataclass
+class Importacion:
+    """Estado de una importación: mapas nombre -> id y filas listas para insertar."""
+    cursos: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    materias: Dict[str, str] = field(default_factory=dict)
+    aulas: Dict[str, str] = field(default_factory=dict)
+    profesores: Dict[str, str] = field(default_factory=dict)
+    usuarios: set = field(default_factory=set)
+    filas: Dict[str, List[dict]] = field(default_factory=lambda: {e: [] for e in ENTIDADES})
+    nuevos_usuarios: List[str] = field(default_factory=list)
+    errores: List[dict] = field(default_factory=list)
+
+def _clave(texto: str) -> str:
+    return (texto or "").strip().casefold()
+
+def cargar_mapas(db: Session) -> Importacion:
+    imp = Importacion()
+    imp.cursos = {(_clave(a), _clave(d)): i for i, a, d in db.query(CursoDB.id, CursoDB.anio, CursoDB.division).all()}
+    imp.materias = {_clave(n): i for i, n in db.query(MateriaDB.id, MateriaDB.nombre).all()}
+    imp.aulas = {_clave(n): i for i, n in db.query(AulaDB.id, AulaDB.nombre).all()}
+    imp.profesores = {_clave(n): i for i, n in db.query(ProfesorDB.id, ProfesorDB.nombre).all()}
+    imp.usuarios = {u for (u,) in db.query(UsuarioDB.username).all()}
+    return imp
+
+# --- VALIDACIÓN POR ENTIDAD ---
+
+def _obligatorio(fila: Fila, columna: str) -> str:
+    valor = (fila.get(columna) or "").strip()
+    if not valor: raise ErrorDeFila(f"Falta '{columna}'")
+    return valor
+
+def _entero(fila: Fila, columna: str, defecto: Optional[int] = None) -> Optional[int]:
+    valor = (fila.get(columna) or "").strip()
+    if not valor: return defecto
+    m = _ENTERO.match(valor)
+    if not m: raise ErrorDeFila(f"'{columna}' debe ser un número entero: {valor}")
+    if valor.startswith("-") and int(m.group(1)): raise ErrorDeFila(f"'{columna}' no puede ser negativo")
+    return int(m.group(1))
+
+def _opcional(fila: Fila, columna: str, defecto: Optional[str] = None) -> Optional[str]:
+    return (fila.get(columna) or "").strip() or defecto
+
+def _referencia(mapa: Dict, clave, descripcion: str) -> str:
+    if clave not in mapa: raise ErrorDeFila(f"No existe {descripcion}")
+    return mapa[clave]
+
+def _curso(imp: Importacion, fila: Fila):
+    anio, division = _obligatorio(fila, "anio"), _obligatorio(fila, "division")
+    clave = (_clave(anio), _clave(division))
+    if clave in imp.cursos: raise ErrorDeFila(f"El curso {anio} {division} ya existe")
+    datos = {
+        "id": f"c-{uuid.uuid4()}", "anio": anio, "division": division,
+        "cantidad_alumnos": _entero(fila, "cantidad_alumnos", 30), "turno": _opcional(fila, "turno", "Mañana"),
+    }
+    imp.cursos[clave] = datos["id"]
+    imp.filas["cursos"].append(datos)
+
+def _con_nombre(mapa_attr: str, prefijo: str, extra: Callable[[Fila], dict]):
+    def procesar(imp: Importacion, fila: Fila):
+        nombre = _obligatorio(fila, "nombre")
+        mapa = getattr(imp, mapa_attr)
+        if _clave(nombre) in mapa: raise ErrorDeFila(f"'{nombre}' ya existe")
+        nuevo_id = f"{prefijo}-{uuid.uuid4()}"
+        datos = {"id": nuevo_id, "nombre": nombre, **extra(fila)}
+        mapa[_clave(nombre)] = nuevo_id
+        imp.filas[mapa_attr].append(datos)
+        return datos
+    return procesar
+
+def _disponibilidad(fila: Fila) -> List[str]:
+    claves = [c.strip() for c in (fila.get("disponibilidad") or "").replace(",", ";").split(";") if c.strip()]
+    invalidas = [c for c in claves if slot_desde_clave(c) is None]
+    if invalidas: raise ErrorDeFila(f"Disponibilidad inválida: {', '.join(invalidas[:5])}")
+    return claves
+
+_materia = _con_nombre("materias", "m", lambda f: {"color_hex": _opcional(f, "color_hex", "#0d9488")})
+_aula = _con_nombre("aulas", "a", lambda f: {"tipo": _opcional(f, "tipo", "Normal"), "capacidad": _entero(f, "capacidad", 30)})
+_profesor_base = _con_nombre("profesores", "p", lambda f: {
+    "dni": _opcional(f, "dni"), "color": _opcional(f, "color", "#0d9488"),
+    **columnas_disponibilidad(_disponibilidad(f)),
+})
+
+def _profesor(imp: Importacion, fila: Fila):
+    datos = _profesor_base(imp, fila)
+    # Igual que el alta individual: usuario de login con clave inicial
+    if datos["nombre"] not in imp.usuarios:
+        imp.usuarios.add(datos["nombre"])
+        imp.nuevos_usuarios.append(datos["nombre"])
+
+def _requisito(imp: Importacion, fila: Fila):
+    anio, division = _obligatorio(fila, "curso_anio"), _obligatorio(fila, "curso_division")
+    materia = _obligatorio(fila, "materia")
+    horas = _entero(fila, "horas_semanales")
+    if not horas: raise ErrorDeFila("'horas_semanales' debe ser mayor a 0")
+    profesor, aula = _opcional(fila, "profesor"), _opcional(fila, "aula")
+    imp.filas["requisitos"].append({
+        "id": f"req-{uuid.uuid4()}",
+        "curso_id": _referencia(imp.cursos, (_clave(anio), _clave(division)), f"el curso {anio} {division}"),
+        "materia_id": _referencia(imp.materias, _clave(materia), f"la materia '{materia}'"),
+        "profesor_id": _referencia(imp.profesores, _clave(profesor), f"el profesor '{profesor}'") if profesor else None,
+        "aula_preferida_id": _referencia(imp.aulas, _clave(aula), f"el aula '{aula}'") if aula else None,
+        "horas_semanales": horas,
+    })
+
+VALIDADORES: Dict[str, Callable[[Importacion, Fila], None]] = {
+    "cursos": _curso, "materias": _materia, "aulas": _aula, "profesores": _profesor, "requisitos": _requisito,
+}
+MODELOS = {"cursos": CursoDB, "materias": MateriaDB, "aulas": AulaDB, "profesores": ProfesorDB, "requisitos": RequisitoDB}
+
+# --- LECTURA DE ARCHIVOS ---
+
+def _normalizar_encabezado(valores) -> List[str]:
+    return [_clave(str(v)).replace(" ", "_") if v is not None else "" for v in valores]
+
+def hojas_xlsx(archivo) -> Iterator[Tuple[str, Iterator[Tuple[int, Fila]]]]:
+    """(entidad, filas) por cada hoja reconocida, en el orden de ENTIDADES."""
+    wb = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        por_nombre = {_clave(n): n for n in wb.sheetnames}
+        for entidad in ENTIDADES:
+            if entidad in por_nombre:
+                yield entidad, _filas_hoja(wb[por_nombre[entidad]])
+    finally:
+        wb.close()
+
+def _filas_hoja(ws) -> Iterator[Tuple[int, Fila]]:
+    filas = ws.iter_rows(values_only=True)
+    encabezado = _normalizar_encabezado(next(filas, ()))
+    for nro, valores in enumerate(filas, start=2):
+        if not any(v not in (None, "") for v in valores): continue
+        yield nro, {c: ("" if v is None else str(v)) for c, v in zip(encabezado, valores) if c}
+
+def filas_csv(archivo) -> Iterator[Tuple[int, Fila]]:
+    texto = codecs.getreader("utf-8-sig")(archivo)
+    lector = csv.reader(texto)
+    encabezado = _normalizar_encabezado(next(lector, []))
+    for nro, valores in enumerate(lector, start=2):
+        if not any(v.strip() for v in valores): continue
+        yield nro, {c: v for c, v in zip(encabezado, valores) if c}
+
+# --- IMPORTACIÓN ---
+
+def importar(db: Session, hojas) -> dict:
+    """Valida e inserta todas las hojas. Devuelve {"creados", "errores"}; con errores no guarda nada."""
+    imp = cargar_mapas(db)
+    for entidad, filas in hojas:
+        validar = VALIDADORES[entidad]
+        for nro, fila in filas:
+            try: validar(imp, fila)
+            except ErrorDeFila as e:
+                imp.errores.append({"hoja": entidad, "fila": nro, "error": str(e)})
+
+    creados = {e: len(imp.filas[e]) for e in ENTIDADES if imp.filas[e]}
+    if imp.errores:
+        return {"creados": {}, "errores": imp.errores}
+
+    hashes = seguridad.hashear_passwords(["1234"] * len(imp.nuevos_usuarios))
+    try:
+        for entidad in ENTIDADES:  # en orden, por las claves foráneas
+            filas = imp.filas[entidad]
+            for i in range(0, len(filas), TAMANIO_LOTE):
+                db.execute(insert(MODELOS[entidad]), filas[i:i + TAMANIO_LOTE])
+        usuarios = [
+            {"username": n, "hashed_password": h, "rol": "profesor", "force_change_password": True}
+            for n, h in zip(imp.nuevos_usuarios, hashes)
+        ]
+        for i in range(0, len(usuarios), TAMANIO_LOTE):
+            db.execute(insert(UsuarioDB), usuarios[i:i + TAMANIO_LOTE])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"creados": creados, "errores": []}
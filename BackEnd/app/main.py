@@ -1,26 +1,54 @@
 # BackEnd/app/main.py
 
+import os
+import asyncio
+import csv
 import json
+import zipfile
 import uuid
 import logging
-from typing import List, Dict, Optional, Set
-from io import BytesIO
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Optional
 
-from fastapi import FastAPI, Response, Depends, HTTPException, status
+from fastapi import FastAPI, File, Request, Response, Depends, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-import openpyxl
-import openpyxl.styles
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 
 # Importaciones locales
 import app.seguridad as seguridad
+import app.motor as motor
+import app.trabajos as trabajos
+import app.versiones as versiones
+import app.migraciones as migraciones
+import app.exportar as exportar
+import app.suplencias as suplencias
+import app.cambios as cambios
+import app.cache_respuestas as cache_respuestas
+import app.vistas as vistas
+import app.identidad as identidad
+import app.importar as importar
+import app.assets as assets
+import app.configuracion as configuracion
+import app.movimientos as movimientos
+import app.eventos as eventos
+import app.analisis as analisis
+from app.grilla import (
+    N_HORAS, claves_desde_mascara, indice_dia, indice_hora,
+    mascara_desde_bytes, slot_index
+)
 from app.database import (
-    engine, get_db, crear_tablas,
+    engine_async, get_db, get_db_async,
     ProfesorDB, MateriaDB, CursoDB, AulaDB, RequisitoDB, AsignacionDB, UsuarioDB,
-    ConfiguracionDB
+    VersionHorarioDB, columnas_disponibilidad
 )
 
 # --- Configuración de Logs ---
@@ -28,8 +56,29 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- Configuración Inicial ---
-crear_tablas() # Esto creará 'horarios.db' según tu código
-app = FastAPI()
+# El esquema se maneja con migraciones versionadas (python -m app.migraciones aplicar).
+# Al arrancar solo se consulta la versión; con HORARIOS_AUTO_MIGRAR=0 (producción con
+# varios workers) no se aplica nada automáticamente, solo se avisa.
+AUTO_MIGRAR = os.getenv("HORARIOS_AUTO_MIGRAR", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    faltan = migraciones.pendientes()
+    if faltan and AUTO_MIGRAR:
+        migraciones.aplicar_migraciones()
+    elif faltan:
+        logger.warning("Hay %d migraciones pendientes. Ejecutá: python -m app.migraciones aplicar", len(faltan))
+    sin_unicos = migraciones.indices_de_respaldo()
+    if sin_unicos:
+        # Sin estos índices la base no impide que un curso/profe/aula quede dos veces en un slot
+        logger.warning("Faltan índices únicos (%s) por choques en horarios_generados. "
+                       "Resolvelos y ejecutá: python -m app.migraciones indices", ", ".join(sin_unicos))
+    eventos.iniciar(asyncio.get_running_loop())
+    yield
+    eventos.detener()
+    await engine_async.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 # ==========================================
 # 1. CORS
@@ -50,12 +99,7 @@ app.add_middleware(
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 # --- CONSTANTES ---
-HORARIOS_ORDENADOS = [
-  "07:40", "08:20", "09:00", "09:40", "10:20", "11:00", "11:40", "12:20",
-  "13:00", "13:40", "14:20", "15:00", "15:40", "16:20", "17:00",
-  "17:40", "18:20", "19:00", "19:40", "20:20", "21:00", "21:40", "22:20"
-]
-DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
+# (Viven en app/grilla.py para que el motor y los endpoints usen la misma grilla)
 
 # ==========================================
 # 2. MODELOS PYDANTIC
@@ -117,6 +161,10 @@ class BusquedaSuplente(BaseModel):
     dia: str
     hora_inicio: str
 
+class AusenciasDia(BaseModel):
+    dia: str
+    profesor_ids: List[str]
+
 class ReporteCargaHoraria(BaseModel):
     nombre_profesor: str
     horas_asignadas: int
@@ -127,11 +175,37 @@ class MovimientoHorario(BaseModel):
     nuevo_dia: str
     nueva_hora: str
 
+class MovimientoLote(BaseModel):
+    asignacion_id: str
+    # Destino (arrastre; si hay un módulo del curso ahí se enroca) o enroque con otra asignación
+    nuevo_dia: Optional[str] = None
+    nueva_hora: Optional[str] = None
+    intercambiar_con: Optional[str] = None
+
+class VersionCreate(BaseModel):
+    nombre: str
+    estado: str = "borrador"
+
+class ClaveRequisito(BaseModel):
+    curso_id: str
+    materia_id: str
+    profesor_id: Optional[str] = None
+
+class ReparacionIncremental(BaseModel):
+    # Indicar qué cambió (al menos uno)
+    requisito_id: Optional[str] = None
+    profesor_id: Optional[str] = None
+    aula_id: Optional[str] = None
+    tiempo_limite: float = 1.0
+    # Si el requisito se borró: la clave que tenía (la devuelve DELETE /api/requisitos/{id})
+    clave_borrada: Optional[ClaveRequisito] = None
+
 # ==========================================
 # 3. SEGURIDAD Y DEPENDENCIAS
 # ==========================================
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    # async: sin DB y con los tokens cacheados, no vale la pena pasar por el threadpool
     payload = seguridad.verificar_token(token)
     if not payload:
         raise HTTPException(
@@ -139,33 +213,42 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
             detail="Token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return _usuario_desde_payload(payload)
+
+def _usuario_desde_payload(payload: dict) -> dict:
     return {
         "username": payload.get("sub"),
         # Tu DB usa 'rol', pero el token puede tener 'role'. Normalizamos.
         "rol": payload.get("role", "admin"), 
-        "force_change_password": payload.get("force_change_password", False)
+        "force_change_password": payload.get("force_change_password", False),
+        "profesor_id": payload.get("pid"),
     }
 
-def get_current_admin_user(current_user: dict = Depends(get_current_user)):
+async def get_current_admin_user(current_user: dict = Depends(get_current_user)):
     # Verificamos 'rol' (tu nombre de columna)
     if current_user["rol"] != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Requiere rol admin")
     return current_user
 
-def calcular_hora_rango(hora_inicio: str) -> Optional[str]:
-    try:
-        minutos = int(hora_inicio[3:])
-        hora = int(hora_inicio[:2])
-        hora_fin_min = (minutos + 40) % 60
-        hora_fin_hr = hora + (minutos + 40) // 60
-        return f"{hora_inicio} a {hora_fin_hr:02d}:{hora_fin_min:02d}"
-    except Exception:
-        return None
+async def respuesta_cacheada(request: Request, db: AsyncSession, entidad: str,
+                             armar: Callable[[Session], Any]) -> Response:
+    """Respuesta JSON desde app.cache_respuestas, con ETag (304 si el cliente ya la tiene).
+    `armar` recibe una Session sincrónica (corre dentro de AsyncSession.run_sync)."""
+    async def armar_json() -> bytes:
+        await configuracion.precargar(db)  # por si `armar` lee la configuración
+        return await db.run_sync(lambda s: json.dumps(
+            jsonable_encoder(armar(s)), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8"))
+
+    # Las llamadas al backend (Redis bloquea) van al threadpool, no al event loop
+    cuerpo, etag = await cache_respuestas.obtener_async(entidad, armar_json)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cuerpo, media_type="application/json", headers=headers)
 
 def estan_horarios_publicados(db: Session) -> bool:
-    config = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "horarios_publicados").first()
-    if not config: return False
-    return config.value_json == "true"
+    return configuracion.obtener(db).horarios_publicados
 
 
 # ==========================================
@@ -173,37 +256,44 @@ def estan_horarios_publicados(db: Session) -> bool:
 # ==========================================
 
 @app.post("/api/register", response_model=Usuario, status_code=201)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    # async como login: las consultas van al threadpool y bcrypt a su propio pool
+    def existe():
+        return db.query(UsuarioDB.username).filter(UsuarioDB.username == user.username).first() is not None
+
     # Verificar si existe
-    db_user = db.query(UsuarioDB).filter(UsuarioDB.username == user.username).first()
-    if db_user:
+    if await run_in_threadpool(existe):
         raise HTTPException(status_code=400, detail="El usuario ya existe")
     
-    hashed_pwd = seguridad.hashear_password(user.password)
+    hashed_pwd = await seguridad.hashear_password_async(user.password)
     
-    # ADAPTADO A TU DATABASE.PY: Usamos 'rol' en lugar de 'role'
-    nuevo_usuario = UsuarioDB(
-        username=user.username,
-        hashed_password=hashed_pwd,
-        rol=user.role,   # <--- AQUÍ ESTABA EL ERROR ANTES
-        force_change_password=False
-    )
-    db.add(nuevo_usuario)
-    db.commit()
-    db.refresh(nuevo_usuario)
+    def crear():
+        # ADAPTADO A TU DATABASE.PY: Usamos 'rol' en lugar de 'role'
+        db.add(UsuarioDB(
+            username=user.username,
+            hashed_password=hashed_pwd,
+            rol=user.role,   # <--- AQUÍ ESTABA EL ERROR ANTES
+            force_change_password=False
+        ))
+        db.commit()
+    await run_in_threadpool(crear)
     return Usuario(username=user.username)
 
 @app.post("/api/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(UsuarioDB).filter(UsuarioDB.username == form_data.username).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # async: mientras bcrypt verifica (en su propio pool) no se ocupa ningún hilo del servidor
+    user = await run_in_threadpool(_buscar_login, db, form_data.username)
     if not user:
         raise HTTPException(status_code=400, detail="Usuario o contraseña incorrectos")
     
-    if not seguridad.verificar_password(form_data.password, user.hashed_password):
+    if not await seguridad.verificar_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Usuario o contraseña incorrectos")
     
     # Generar token (En el token usamos 'role' estándar, pero lo sacamos de user.rol)
-    access_token = seguridad.crear_token_acceso(data={"sub": user.username, "role": user.rol})
+    # "pid": el profesor del usuario, para no buscarlo por nombre en cada pedido
+    claims = {"sub": user.username, "role": user.rol}
+    if user.profesor_id: claims["pid"] = user.profesor_id
+    access_token = seguridad.crear_token_acceso(data=claims)
     
     return {
         "access_token": access_token, 
@@ -212,10 +302,16 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         "username": user.username 
     }
 
+def _buscar_login(db: Session, username: str):
+    return db.query(
+        UsuarioDB.username, UsuarioDB.hashed_password, UsuarioDB.rol, ProfesorDB.id.label("profesor_id")
+    ).outerjoin(ProfesorDB, ProfesorDB.nombre == UsuarioDB.username)\
+     .filter(UsuarioDB.username == username).first()
+
 # --- REEMPLAZA TODA LA FUNCIÓN cambiar_password CON ESTO ---
 
 @app.post("/api/auth/change-password")
-def cambiar_password(datos: PasswordChange, db: Session = Depends(get_db), u=Depends(get_current_user)):
+async def cambiar_password(datos: PasswordChange, db: Session = Depends(get_db), u=Depends(get_current_user)):
     # 1. Obtenemos el nombre de usuario (sea dict u objeto)
     username = None
     if isinstance(u, dict):
@@ -224,146 +320,87 @@ def cambiar_password(datos: PasswordChange, db: Session = Depends(get_db), u=Dep
         username = u.username
 
     # 2. Buscamos al usuario REAL en la Base de Datos
-    user_db = db.query(UsuarioDB).filter(UsuarioDB.username == username).first()
+    user_db = await run_in_threadpool(lambda: db.query(UsuarioDB).filter(UsuarioDB.username == username).first())
     
     if not user_db:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
     # 3. Verificamos la contraseña usando el usuario de la DB (user_db), NO el token (u)
-    if not seguridad.verificar_password(datos.current_password, user_db.hashed_password):
+    if not await seguridad.verificar_password_async(datos.current_password, user_db.hashed_password):
         raise HTTPException(status_code=400, detail="La contraseña actual es incorrecta")
     
     # 4. Actualizamos
-    user_db.hashed_password = seguridad.hashear_password(datos.new_password)
+    user_db.hashed_password = await seguridad.hashear_password_async(datos.new_password)
     user_db.force_change_password = False 
-    db.commit()
+    await run_in_threadpool(db.commit)
     
     return {"mensaje": "Contraseña actualizada correctamente"}
 # ==========================================
 # 5. ENDPOINTS DEL SISTEMA
 # ==========================================
 
+def validar_parametros_generacion(modo: str, tiempo_limite: float, reinicios: int):
+    if modo not in motor.MODOS:
+        raise HTTPException(400, f"Modo inválido. Opciones: {', '.join(motor.MODOS)}")
+    if tiempo_limite <= 0:
+        raise HTTPException(400, "El tiempo límite debe ser positivo")
+    if reinicios < 1:
+        raise HTTPException(400, "Se necesita al menos un reinicio")
+
 @app.post("/api/generar_horario")
-def generar_horario_automatico(db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    # 1. Limpiar asignaciones anteriores
-    db.query(AsignacionDB).delete()
-    db.commit()
-    
-    # 2. Obtener configuraciones globales (ej: Almuerzos bloqueados)
-    config_db = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "preferencias_horarios").first()
-    almuerzo_slots = set()
-    if config_db:
-        try: almuerzo_slots = set(json.loads(config_db.value_json).get("almuerzo_slots", []))
-        except: pass
-
-    # 3. Obtener todos los REQUISITOS (Qué materias hay que dar)
-    # Ordenamos: Primero los que tienen Aula Fija (más difícil), luego por cantidad de horas (de mayor a menor)
-    requisitos = db.query(RequisitoDB).all()
-    requisitos.sort(key=lambda r: (1 if r.aula_preferida_id else 0, r.horas_semanales), reverse=True)
-    
-    # --- CACHÉ DE DISPONIBILIDAD DE PROFESORES ---
-    # Convertimos la lista JSON ["Lunes-07:40", ...] en un Set de Python para búsqueda rápida
-    profesores_cache = {}
-    todos_profes = db.query(ProfesorDB).all()
-    for p in todos_profes:
-        try:
-            # Si tiene disponibilidad cargada, la usamos.
-            # Si es NULL o vacía, asumimos que NO cargó nada (¿Lo tratamos como Libre o como No Disponible?)
-            # En este caso: Si no cargó nada, asumimos que está LIBRE (dispo_list vacía = no restricciones)
-            # PERO: Tu frontend manda una lista con lo que SÍ puede.
-            # Ajuste: Si la lista tiene elementos, SOLO puede en esos elementos.
-            # Si la lista está vacía, asumimos que puede siempre (o nunca, según tu política).
-            # Vamos a asumir: Si tiene datos, respetamos. Si no, libre.
-            
-            dispo_list = json.loads(p.disponibilidad_json) if p.disponibilidad_json else []
-            profesores_cache[p.id] = set(dispo_list)
-        except:
-            profesores_cache[p.id] = set()
-
-    asignaciones_creadas = 0
-    conflictos_log = []
-
-    # 4. EL ALGORITMO PRINCIPAL
-    for req in requisitos:
-        horas_pendientes = req.horas_semanales
-        
-        # Intentamos ubicar cada hora
-        for dia in DIAS_SEMANA:
-            if horas_pendientes <= 0: break
-            
-            for hora in HORARIOS_ORDENADOS:
-                if horas_pendientes <= 0: break
-                
-                clave_tiempo = f"{dia}-{hora}"
-                
-                # A. REGLA: NO ALMUERZOS
-                if hora in almuerzo_slots: continue
-                
-                # B. REGLA: DISPONIBILIDAD DEL DOCENTE (NUEVO) 🧠
-                if req.profesor_id:
-                    dispo_del_profe = profesores_cache.get(req.profesor_id)
-                    # Si el set tiene datos, significa que el profe marcó sus horas permitidas.
-                    # Si la hora actual NO está en ese set, saltamos.
-                    if dispo_del_profe and len(dispo_del_profe) > 0:
-                        if clave_tiempo not in dispo_del_profe:
-                            continue # El profe dijo que no.
-
-                # C. REGLA: CURSO LIBRE
-                ocupado_curso = db.query(AsignacionDB).filter(
-                    AsignacionDB.curso_id == req.curso_id, 
-                    AsignacionDB.dia == dia, 
-                    AsignacionDB.hora_rango == hora
-                ).first()
-                if ocupado_curso: continue
-
-                # D. REGLA: PROFESOR LIBRE (UBICUIDAD)
-                if req.profesor_id:
-                    ocupado_profe = db.query(AsignacionDB).filter(
-                        AsignacionDB.profesor_id == req.profesor_id,
-                        AsignacionDB.dia == dia,
-                        AsignacionDB.hora_rango == hora
-                    ).first()
-                    if ocupado_profe: continue
-                
-                # E. REGLA: AULA
-                aula_asignada_id = None
-                
-                # Si pide aula específica
-                if req.aula_preferida_id:
-                    ocupado_aula = db.query(AsignacionDB).filter(
-                        AsignacionDB.aula_id == req.aula_preferida_id,
-                        AsignacionDB.dia == dia,
-                        AsignacionDB.hora_rango == hora
-                    ).first()
-                    if ocupado_aula: continue
-                    aula_asignada_id = req.aula_preferida_id
-                
-                # --- SI PASÓ TODOS LOS FILTROS: ASIGNAMOS ---
-                nueva_asignacion = AsignacionDB(
-                    id=f"asig-{uuid.uuid4()}",
-                    dia=dia, hora_rango=hora,
-                    curso_id=req.curso_id, materia_id=req.materia_id,
-                    profesor_id=req.profesor_id, aula_id=aula_asignada_id 
-                )
-                db.add(nueva_asignacion)
-                # Guardamos para que la siguiente iteración sepa que esto ya se ocupó
-                db.commit() 
-                
-                horas_pendientes -= 1
-                asignaciones_creadas += 1
-
-        if horas_pendientes > 0:
-            conflictos_log.append(f"Materia {req.materia_id} (Curso {req.curso_id}): Faltaron asignar {horas_pendientes} hs.")
-
-    mensaje_final = f"¡Proceso finalizado! 🚀\nSe generaron {asignaciones_creadas} módulos."
-    if conflictos_log:
-        mensaje_final += f"\n\n⚠️ Conflictos:\n" + "\n".join(conflictos_log)
-
-    return {"mensaje": mensaje_final}
+def generar_horario_automatico(
+    modo: str = "greedy",          # "greedy" (rápido), "csp" (backtracking + reparación) o "multiarranque"
+    tiempo_limite: float = 10.0,   # segundos máximos para los modos csp y multiarranque
+    reinicios: int = 64,           # corridas aleatorias del modo multiarranque
+    db: Session = Depends(get_db), u=Depends(get_current_admin_user)
+):
+    validar_parametros_generacion(modo, tiempo_limite, reinicios)
+
+    # 1. Cargamos TODO una sola vez (requisitos, disponibilidad, almuerzos) en memoria
+    datos = motor.cargar_datos(db)
+
+    # 2. Resolvemos con máscaras de bits, sin tocar la base
+    resultado = motor.MODOS[modo](datos, tiempo_limite, reinicios)
+
+    # 3. Respaldamos el horario anterior y lo reemplazamos en una única transacción
+    #    (de a uno con los trabajos en segundo plano)
+    with trabajos.reemplazo_horario:
+        versiones.guardar_version(db, f"Respaldo antes de generar ({modo})", "historico", solo_si_cambio=True)
+        motor.guardar_resultado(db, resultado)
+
+    return motor.resumen(datos, resultado)
+
+# --- GENERACIÓN EN SEGUNDO PLANO ---
+# Igual que /api/generar_horario pero devuelve un job_id al instante.
+# El horario publicado sigue visible mientras corre y se reemplaza solo si termina bien.
+# Los trabajos viven en memoria: requiere un solo worker (ver app/trabajos.py).
+
+@app.post("/api/jobs/generar_horario", status_code=202)
+def encolar_generacion(
+    modo: str = "greedy", tiempo_limite: float = 10.0, reinicios: int = 64,
+    u=Depends(get_current_admin_user)
+):
+    validar_parametros_generacion(modo, tiempo_limite, reinicios)
+    return trabajos.enviar(modo, tiempo_limite, reinicios).a_dict()
+
+@app.get("/api/jobs/{job_id}")
+async def estado_trabajo(job_id: str, u=Depends(get_current_admin_user)):
+    trabajo = trabajos.obtener(job_id)
+    if not trabajo: raise HTTPException(404, "Trabajo no encontrado")
+    return trabajo.a_dict()
+
+@app.delete("/api/jobs/{job_id}")
+def cancelar_trabajo(job_id: str, u=Depends(get_current_admin_user)):
+    trabajo = trabajos.cancelar(job_id)
+    if not trabajo: raise HTTPException(404, "Trabajo no encontrado")
+    return trabajo.a_dict()
 
 # --- REQUISITOS ---
 @app.get("/api/requisitos")
-def list_all_requisitos(db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+async def list_all_requisitos(request: Request, db: AsyncSession = Depends(get_db_async), u=Depends(get_current_admin_user)):
+    return await respuesta_cacheada(request, db, "requisitos", _listar_requisitos)
+
+def _listar_requisitos(db: Session) -> List[dict]:
     resultados = db.query(RequisitoDB).options(
         joinedload(RequisitoDB.curso), joinedload(RequisitoDB.materia),
         joinedload(RequisitoDB.profesor), joinedload(RequisitoDB.aula_preferida)
@@ -388,49 +425,92 @@ def add_req(r: RequisitoCreate, db: Session = Depends(get_db), u=Depends(get_cur
         profesor_id=r.profesor_id, aula_preferida_id=r.aula_preferida_id, horas_semanales=r.horas_semanales
     )
     db.add(nuevo_req)
-    try: db.commit(); db.refresh(nuevo_req); return {"mensaje": "Creado", "id": nuevo_req.id}
+    try: db.commit(); db.refresh(nuevo_req)
     except Exception as e: db.rollback(); raise HTTPException(400, str(e))
+    cache_respuestas.invalidar("requisitos")
+    return {"mensaje": "Creado", "id": nuevo_req.id}
 
 @app.delete("/api/requisitos/{id}")
 def delete_req(id: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     req = db.query(RequisitoDB).filter(RequisitoDB.id == id).first()
     if not req: raise HTTPException(404)
+    clave = {"curso_id": req.curso_id, "materia_id": req.materia_id, "profesor_id": req.profesor_id}
     db.delete(req); db.commit()
-    return {"mensaje": "Eliminado"}
+    cache_respuestas.invalidar("requisitos")
+    # La clave sirve para quitar sus módulos con /api/horarios/reparar
+    return {"mensaje": "Eliminado", "clave": clave}
 
 @app.get("/api/profesores", response_model=List[Profesor])
-def obtener_profesores(db: Session = Depends(get_db), u=Depends(get_current_user)):
+async def obtener_profesores(request: Request, db: AsyncSession = Depends(get_db_async), u=Depends(get_current_user)):
     # DEVOLVEMOS EL COLOR
-    return [
+    return await respuesta_cacheada(request, db, "profesores", lambda s: [
         Profesor(
             id=p.id, 
             nombre=p.nombre, 
-            disponibilidad=json.loads(p.disponibilidad_json or '[]'),
+            disponibilidad=claves_desde_mascara(mascara_desde_bytes(p.disponibilidad_bits)),
             color=p.color or "#0d9488" # <--- NUEVO
-        ) for p in db.query(ProfesorDB).all()
-    ]
+        ) for p in s.query(ProfesorDB).all()
+    ])
 
 # Busca el endpoint @app.post("/api/profesores") y actualízalo:
 @app.post("/api/profesores", response_model=Profesor, status_code=201)
-def agregar_profesor(p: Profesor, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    if db.query(ProfesorDB).filter(ProfesorDB.nombre == p.nombre).first(): raise HTTPException(409, "Existe")
-    pid = f"p-{uuid.uuid4()}"
-    
-    db.add(ProfesorDB(
-        id=pid, 
-        nombre=p.nombre, 
-        dni=p.dni, # <--- GUARDAMOS EL DNI
-        disponibilidad_json=json.dumps(p.disponibilidad),
-        color=p.color
-    ))
-    
-    # Creamos usuario para login
-    if not db.query(UsuarioDB).filter(UsuarioDB.username == p.nombre).first():
-        db.add(UsuarioDB(username=p.nombre, hashed_password=seguridad.hashear_password("1234"), rol="profesor", force_change_password=True))
-    
-    db.commit()
+async def agregar_profesor(p: Profesor, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    def existentes():
+        return (db.query(ProfesorDB.id).filter(ProfesorDB.nombre == p.nombre).first() is not None,
+                db.query(UsuarioDB.username).filter(UsuarioDB.username == p.nombre).first() is not None)
+
+    existe_profe, existe_usuario = await run_in_threadpool(existentes)
+    if existe_profe: raise HTTPException(409, "Existe")
+    # Usuario para login: el hash se hace en el pool de bcrypt, sin ocupar un hilo del servidor
+    hashed_pwd = None if existe_usuario else await seguridad.hashear_password_async("1234")
+
+    def crear():
+        db.add(ProfesorDB(
+            id=f"p-{uuid.uuid4()}", 
+            nombre=p.nombre, 
+            dni=p.dni, # <--- GUARDAMOS EL DNI
+            disponibilidad_json=json.dumps(p.disponibilidad),
+            color=p.color
+        ))
+        if hashed_pwd:
+            db.add(UsuarioDB(username=p.nombre, hashed_password=hashed_pwd, rol="profesor", force_change_password=True))
+        db.commit()
+        cache_respuestas.invalidar("profesores")
+    await run_in_threadpool(crear)
     return p
 
+@app.post("/api/profesores/bulk", status_code=201)
+def agregar_profesores_bulk(profes: List[Profesor], db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # Alta masiva (inicio de año): validación de una vez, hashes en paralelo, una sola transacción
+    nombres = [p.nombre for p in profes]
+    repetidos = sorted(n for n, veces in Counter(nombres).items() if veces > 1)
+    if repetidos: raise HTTPException(400, f"Nombres repetidos en el pedido: {', '.join(repetidos)}")
+    existentes = {n for (n,) in db.query(ProfesorDB.nombre).filter(ProfesorDB.nombre.in_(nombres)).all()}
+    if existentes: raise HTTPException(409, f"Ya existen: {', '.join(sorted(existentes))}")
+
+    con_usuario = {n for (n,) in db.query(UsuarioDB.username).filter(UsuarioDB.username.in_(nombres)).all()}
+    sin_usuario = [n for n in nombres if n not in con_usuario]
+    hashes = seguridad.hashear_passwords(["1234"] * len(sin_usuario))
+
+    filas_profes = [
+        {"id": f"p-{uuid.uuid4()}", "nombre": p.nombre, "dni": p.dni, "color": p.color,
+         **columnas_disponibilidad(p.disponibilidad)}
+        for p in profes
+    ]
+    try:
+        if filas_profes: db.execute(insert(ProfesorDB), filas_profes)
+        if sin_usuario:
+            db.execute(insert(UsuarioDB), [
+                {"username": n, "hashed_password": h, "rol": "profesor", "force_change_password": True}
+                for n, h in zip(sin_usuario, hashes)
+            ])
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(409, f"No se pudo crear el lote: {e.orig}")
+    cache_respuestas.invalidar("profesores")
+    return {"creados": len(filas_profes), "profesores": [{"id": f["id"], "nombre": f["nombre"]} for f in filas_profes]}
+
 @app.delete("/api/profesores/{pid}", status_code=204)
 def borrar_profesor(pid: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     p = db.query(ProfesorDB).filter(ProfesorDB.id == pid).first()
@@ -438,138 +518,205 @@ def borrar_profesor(pid: str, db: Session = Depends(get_db), u=Depends(get_curre
     u_db = db.query(UsuarioDB).filter(UsuarioDB.username == p.nombre).first()
     if u_db: db.delete(u_db)
     db.delete(p); db.commit()
+    cache_respuestas.invalidar("profesores")
     return Response(status_code=204)
 
 # --- MATERIAS ---
 @app.get("/api/materias", response_model=List[Materia])
-def get_materias(db: Session = Depends(get_db), u=Depends(get_current_user)):
-    return [Materia(id=m.id, nombre=m.nombre, color_hex=m.color_hex) for m in db.query(MateriaDB).all()]
+async def get_materias(request: Request, db: AsyncSession = Depends(get_db_async), u=Depends(get_current_user)):
+    return await respuesta_cacheada(request, db, "materias", lambda s: [
+        Materia(id=m.id, nombre=m.nombre, color_hex=m.color_hex) for m in s.query(MateriaDB).all()
+    ])
 
 @app.post("/api/materias", response_model=Materia)
 def add_materia(m: Materia, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     if db.query(MateriaDB).filter(MateriaDB.nombre == m.nombre).first(): raise HTTPException(409)
     nm = MateriaDB(id=f"m-{uuid.uuid4()}", nombre=m.nombre, color_hex=m.color_hex)
     db.add(nm); db.commit(); db.refresh(nm)
+    cache_respuestas.invalidar("materias")
     return Materia(id=nm.id, nombre=nm.nombre, color_hex=nm.color_hex)
 
 @app.delete("/api/materias/{mid}", status_code=204)
 def del_materia(mid: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     db.query(MateriaDB).filter(MateriaDB.id == mid).delete(); db.commit()
+    cache_respuestas.invalidar("materias")
     return Response(status_code=204)
 
 # --- CURSOS ---
 @app.get("/api/cursos", response_model=List[Curso])
-def get_cursos(db: Session = Depends(get_db), u=Depends(get_current_user)):
-    return [Curso(id=c.id, anio=c.anio, division=c.division, cantidad_alumnos=c.cantidad_alumnos, nombre_display=c.nombre_completo) for c in db.query(CursoDB).all()]
+async def get_cursos(request: Request, db: AsyncSession = Depends(get_db_async), u=Depends(get_current_user)):
+    return await respuesta_cacheada(request, db, "cursos", lambda s: [
+        Curso(id=c.id, anio=c.anio, division=c.division, cantidad_alumnos=c.cantidad_alumnos, nombre_display=c.nombre_completo)
+        for c in s.query(CursoDB).all()
+    ])
 
 @app.post("/api/cursos", response_model=Curso)
 def add_curso(c: Curso, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     if db.query(CursoDB).filter(CursoDB.anio == c.anio, CursoDB.division == c.division).first(): raise HTTPException(409)
     nc = CursoDB(id=f"c-{uuid.uuid4()}", anio=c.anio, division=c.division, cantidad_alumnos=c.cantidad_alumnos)
     db.add(nc); db.commit(); db.refresh(nc)
+    cache_respuestas.invalidar("cursos")
     return Curso(id=nc.id, anio=nc.anio, division=nc.division, cantidad_alumnos=nc.cantidad_alumnos, nombre_display=nc.nombre_completo)
 
 @app.delete("/api/cursos/{cid}", status_code=204)
 def del_curso(cid: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     db.query(CursoDB).filter(CursoDB.id == cid).delete(); db.commit()
+    cache_respuestas.invalidar("cursos")
     return Response(status_code=204)
 
 # --- AULAS ---
 @app.get("/api/aulas", response_model=List[Aula])
-def get_aulas(db: Session = Depends(get_db), u=Depends(get_current_user)):
-    return [Aula(id=a.id, nombre=a.nombre, tipo=a.tipo, capacidad=a.capacidad) for a in db.query(AulaDB).all()]
+async def get_aulas(request: Request, db: AsyncSession = Depends(get_db_async), u=Depends(get_current_user)):
+    return await respuesta_cacheada(request, db, "aulas", lambda s: [
+        Aula(id=a.id, nombre=a.nombre, tipo=a.tipo, capacidad=a.capacidad) for a in s.query(AulaDB).all()
+    ])
 
 @app.post("/api/aulas", response_model=Aula)
 def add_aula(a: Aula, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     if db.query(AulaDB).filter(AulaDB.nombre == a.nombre).first(): raise HTTPException(409)
     na = AulaDB(id=f"a-{uuid.uuid4()}", nombre=a.nombre, tipo=a.tipo, capacidad=a.capacidad)
     db.add(na); db.commit(); db.refresh(na)
+    cache_respuestas.invalidar("aulas")
     return Aula(id=na.id, nombre=na.nombre, tipo=na.tipo, capacidad=na.capacidad)
 
 @app.delete("/api/aulas/{aid}", status_code=204)
 def del_aula(aid: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
     db.query(AulaDB).filter(AulaDB.id == aid).delete(); db.commit()
+    cache_respuestas.invalidar("aulas")
     return Response(status_code=204)
 
+# --- IMPORTACIÓN MASIVA ---
+@app.post("/api/importar")
+def importar_catalogos(archivo: UploadFile = File(...), entidad: Optional[str] = None,
+                       db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # Excel: una hoja por entidad (cursos, materias, aulas, profesores, requisitos).
+    # CSV: una sola entidad, indicada con ?entidad=...
+    nombre = (archivo.filename or "").lower()
+    if nombre.endswith(".csv"):
+        if entidad not in importar.ENTIDADES:
+            raise HTTPException(400, f"Indicá la entidad del CSV: {', '.join(importar.ENTIDADES)}")
+        hojas = [(entidad, importar.filas_csv(archivo.file))]
+    elif nombre.endswith(".xlsx"):
+        hojas = importar.hojas_xlsx(archivo.file)
+    else:
+        raise HTTPException(400, "Formato no soportado (se acepta .xlsx o .csv)")
+
+    try:
+        resultado = importar.importar(db, hojas)
+    except (zipfile.BadZipFile, UnicodeDecodeError, csv.Error, OSError) as e:
+        raise HTTPException(400, f"No se pudo leer el archivo: {e}")
+    if resultado["errores"]:
+        # No se guardó nada: se devuelve el detalle fila por fila
+        return JSONResponse(status_code=422, content=resultado)
+    cache_respuestas.invalidar(*resultado["creados"])
+    return resultado
+
 # --- HORARIOS & EXPORT ---
+# --- VERSIONES DEL HORARIO ---
+# (Van antes de /api/horarios/{cid} para que "versiones" y "diff" no se tomen como id de curso)
+
+@app.get("/api/horarios/versiones")
+def listar_versiones(db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    return [versiones.version_a_dict(v) for v in db.query(VersionHorarioDB).order_by(VersionHorarioDB.creado.desc()).all()]
+
+@app.post("/api/horarios/versiones", status_code=201)
+def crear_version(v: VersionCreate, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    if v.estado not in versiones.ESTADOS:
+        raise HTTPException(400, f"Estado inválido. Opciones: {', '.join(versiones.ESTADOS)}")
+    version = versiones.guardar_version(db, v.nombre, v.estado)
+    db.commit()
+    return versiones.version_a_dict(version)
+
+@app.post("/api/horarios/versiones/{vid}/restaurar")
+def restaurar_version(vid: str, publicar: bool = False, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    if not db.query(VersionHorarioDB).filter(VersionHorarioDB.id == vid).first():
+        raise HTTPException(404, "Versión no encontrada")
+    # Por las dudas, lo que está ahora también queda guardado (misma transacción que la restauración)
+    with trabajos.reemplazo_horario:
+        versiones.guardar_version(db, "Respaldo antes de restaurar", "historico", solo_si_cambio=True)
+        return versiones.version_a_dict(versiones.restaurar_version(db, vid, publicar))
+
+@app.post("/api/horarios/versiones/{vid}/publicar")
+def publicar_version(vid: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    return restaurar_version(vid, True, db, u)
+
+@app.get("/api/horarios/diff")
+def diff_versiones(desde: str = Query(..., alias="from"), hasta: str = Query("actual", alias="to"),
+                   db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # from/to: id de versión o "actual" (el horario vigente)
+    try:
+        return versiones.diferencias(versiones.modulos_de(db, desde), versiones.modulos_de(db, hasta))
+    except versiones.VersionNoEncontrada as e:
+        raise HTTPException(404, f"Versión no encontrada: {e}")
+
+@app.get("/api/horarios/analisis")
+async def analisis_horario(db: AsyncSession = Depends(get_db_async), u=Depends(get_current_admin_user)):
+    # Choques, disponibilidad, almuerzo y métricas; cacheado hasta el próximo cambio
+    await configuracion.precargar(db)
+    return await db.run_sync(analisis.obtener)
+
 @app.get("/api/horarios/{cid}")
-def get_horario_curso(cid: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    asigs = db.query(AsignacionDB).options(
-        joinedload(AsignacionDB.profesor), joinedload(AsignacionDB.materia), joinedload(AsignacionDB.aula)
-    ).filter(AsignacionDB.curso_id == cid).all()
-    vista = {}
-    for a in asigs:
-        vista.setdefault(a.hora_rango, {})[a.dia] = {
-            "text": f"{a.materia.nombre if a.materia else '??'}",
-            "profesor_nombre": a.profesor.nombre if a.profesor else "Sin Profe",
-            "materia_nombre": a.materia.nombre if a.materia else "??",
-            "color_materia": a.materia.color_hex if a.materia else "#0d9488",
-            "id": a.id, "aula_nombre": a.aula.nombre if a.aula else "Sin Aula"
-        }
-    return vista
+async def get_horario_curso(cid: str, db: AsyncSession = Depends(get_db_async), u=Depends(get_current_admin_user)):
+    # Una sola consulta proyectada (sin cargar relaciones por fila)
+    return await db.run_sync(vistas.grilla_curso, cid)
 
 @app.get("/api/export/excel")
-def export_excel(db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    wb = openpyxl.Workbook(); 
-    if "Sheet" in wb.sheetnames: wb.remove(wb["Sheet"])
-    cursos = db.query(CursoDB).all()
-    asigs = db.query(AsignacionDB).options(joinedload(AsignacionDB.profesor), joinedload(AsignacionDB.materia), joinedload(AsignacionDB.aula)).all()
-    
-    for c in cursos:
-        ws = wb.create_sheet(f"{c.nombre_completo}"[:30])
-        ws.append(['Hora'] + DIAS_SEMANA)
-        for cell in ws[1]: 
-            cell.font = openpyxl.styles.Font(bold=True, color="FFFFFF")
-            cell.fill = openpyxl.styles.PatternFill("solid", fgColor="1D72B8")
-        
-        vista = {}
-        for a in asigs:
-            if a.curso_id == c.id:
-                prof = a.profesor.nombre if a.profesor else "??"
-                mat = a.materia.nombre if a.materia else "??"
-                aula = f" [{a.aula.nombre}]" if a.aula else ""
-                vista.setdefault(a.hora_rango, {})[a.dia] = f"{mat}\n({prof}){aula}"
-        
-        for h in HORARIOS_ORDENADOS:
-            row = [h] + [vista.get(h, {}).get(d, "") for d in DIAS_SEMANA]
-            ws.append(row)
-            
-        ws.column_dimensions['A'].width = 15
-        for col in ['B','C','D','E','F']: 
-            ws.column_dimensions[col].width = 25
-            
-    buf = BytesIO(); wb.save(buf); buf.seek(0)
-    return Response(content=buf.getvalue(), media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=Horarios.xlsx"})
+def export_excel(request: Request, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # Cacheado en disco por revisión del horario: si el cliente ya lo tiene, 304 sin abrir nada
+    revision = cambios.revision_actual(db)
+    etag = exportar.etag_de("xlsx", revision)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    archivo = exportar.exporte_cacheado(db, "xlsx", revision)
+    headers["Content-Disposition"] = "attachment; filename=Horarios.xlsx"
+    return StreamingResponse(exportar.iterar_archivo(archivo), media_type=exportar.MEDIA_TYPE_XLSX, headers=headers)
+
+@app.get("/api/export/{tipo}/{entidad_id}")
+def export_entidad(tipo: str, entidad_id: str, formato: str = "xlsx",
+                   db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # Horario de un solo curso, profesor o aula (solo se leen sus filas)
+    if tipo not in exportar.ENTIDADES:
+        raise HTTPException(status_code=404, detail=f"Tipo desconocido: {tipo}")
+    if formato not in ("xlsx", "csv"):
+        raise HTTPException(status_code=400, detail="Formato inválido (xlsx o csv)")
+    encontrado = exportar.vista_de_entidad(db, tipo, entidad_id)
+    if not encontrado:
+        raise HTTPException(status_code=404, detail=f"{tipo.capitalize()} no encontrado")
+
+    titulo, vista = encontrado
+    headers = {"Content-Disposition": f"attachment; filename={exportar.nombre_archivo(titulo, formato)}"}
+    if formato == "csv":
+        return StreamingResponse(exportar.iterar_csv(vista), media_type=exportar.MEDIA_TYPE_CSV, headers=headers)
+    archivo = exportar.escribir_excel([(titulo, vista)])
+    return StreamingResponse(exportar.iterar_archivo(archivo), media_type=exportar.MEDIA_TYPE_XLSX, headers=headers)
 
 
 # --- CONFIG Y HERRAMIENTAS ---
 @app.get("/api/config/preferencias")
-def obtener_preferencias(db: Session = Depends(get_db)):
-    conf = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "preferencias_horarios").first()
-    if not conf: return {"almuerzo_slots": []}
-    try: return json.loads(conf.value_json)
-    except: return {"almuerzo_slots": []}
+async def obtener_preferencias(request: Request, db: AsyncSession = Depends(get_db_async)):
+    return await respuesta_cacheada(request, db, "preferencias", _leer_preferencias)
+
+def _leer_preferencias(db: Session) -> dict:
+    return {"almuerzo_slots": list(configuracion.obtener(db).almuerzo_slots)}
 
 @app.post("/api/config/preferencias")
 def guardar_preferencias(prefs: Preferencias, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    conf = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "preferencias_horarios").first()
-    if not conf:
-        conf = ConfiguracionDB(key="preferencias_horarios")
-        db.add(conf)
-    conf.value_json = json.dumps({"almuerzo_slots": prefs.almuerzo_slots})
+    configuracion.escribir(db, almuerzo_slots=prefs.almuerzo_slots)
     db.commit()
+    cache_respuestas.invalidar("preferencias")
     return {"mensaje": "Guardado"}
 
 @app.get("/api/reportes/carga-horaria-profesor", response_model=List[ReporteCargaHoraria])
-def reporte_carga(db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+async def reporte_carga(db: AsyncSession = Depends(get_db_async), u=Depends(get_current_admin_user)):
     # Consultamos Nombre, Color y Cantidad
-    res = db.query(
+    res = (await db.execute(select(
         ProfesorDB.nombre, 
         ProfesorDB.color, 
         func.count(AsignacionDB.id).label("cnt")
-    ).join(AsignacionDB, ProfesorDB.id == AsignacionDB.profesor_id, isouter=True)\
-     .group_by(ProfesorDB.id)\
-     .order_by(func.count(AsignacionDB.id).desc()).all()
+    ).join(AsignacionDB, ProfesorDB.id == AsignacionDB.profesor_id, isouter=True)
+     .group_by(ProfesorDB.id)
+     .order_by(func.count(AsignacionDB.id).desc()))).all()
     
     return [
         ReporteCargaHoraria(
@@ -581,33 +728,32 @@ def reporte_carga(db: Session = Depends(get_db), u=Depends(get_current_admin_use
 
 @app.delete("/api/admin/reset-horarios", status_code=200)
 def reset_assignments(db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    db.query(AsignacionDB).delete(); db.commit()
+    with trabajos.reemplazo_horario:
+        versiones.guardar_version(db, "Respaldo antes de borrar horarios", "historico", solo_si_cambio=True)
+        db.query(AsignacionDB).delete(); db.commit()
     return {"mensaje": "Horarios eliminados."}
 
 @app.post("/api/admin/reset-password/{username}")
-def reset_password_admin(username: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    user = db.query(UsuarioDB).filter(UsuarioDB.username == username).first()
+async def reset_password_admin(username: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    user = await run_in_threadpool(lambda: db.query(UsuarioDB).filter(UsuarioDB.username == username).first())
     if not user: raise HTTPException(404, "Usuario no encontrado")
-    user.hashed_password = seguridad.hashear_password("1234")
+    user.hashed_password = await seguridad.hashear_password_async("1234")
     user.force_change_password = True
-    db.commit()
+    await run_in_threadpool(db.commit)
     return {"mensaje": f"Clave de '{username}' restablecida a '1234'"}
 
 @app.post("/api/profesores/buscar-suplentes")
 def buscar_suplentes(req: BusquedaSuplente, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    hora_rango = calcular_hora_rango(req.hora_inicio)
-    if not hora_rango: raise HTTPException(400, "Hora inválida")
-    slot_buscado = f"{req.dia}-{req.hora_inicio}"
-    profesores = db.query(ProfesorDB).all()
-    ocupados = db.query(AsignacionDB.profesor_id).filter(AsignacionDB.dia == req.dia, AsignacionDB.hora_rango == hora_rango).all()
-    ids_ocupados = {ocup.profesor_id for ocup in ocupados}
-    disponibles = []
-    for p in profesores:
-        try: disp_set = set(json.loads(p.disponibilidad_json or '[]'))
-        except: disp_set = set()
-        if slot_buscado in disp_set and p.id not in ids_ocupados:
-            disponibles.append({"id": p.id, "nombre": p.nombre})
-    return disponibles
+    slot = slot_index(req.dia, req.hora_inicio)
+    if slot is None: raise HTTPException(400, "Día u hora inválidos")
+    # Índice slot -> profes libres, rearmado solo cuando cambian profes o asignaciones
+    return suplencias.obtener_indice(db).candidatos(slot)
+
+@app.post("/api/profesores/buscar-suplentes/dia")
+def buscar_suplentes_dia(req: AusenciasDia, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # Todas las clases de los ausentes ese día, cada una con sus candidatos
+    if indice_dia(req.dia) is None: raise HTTPException(400, "Día inválido")
+    return suplencias.suplentes_del_dia(db, req.dia, req.profesor_ids)
 
 @app.post("/api/horarios/mover")
 def mover_asignacion(mov: MovimientoHorario, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
@@ -620,30 +766,28 @@ def mover_asignacion(mov: MovimientoHorario, db: Session = Depends(get_db), u=De
     nuevo_dia = mov.nuevo_dia
     nueva_hora = mov.nueva_hora
     curso_actual_id = viajero.curso_id
+    dia_idx, hora_idx = indice_dia(nuevo_dia), indice_hora(nueva_hora)
+    if dia_idx is None or hora_idx is None:
+        raise HTTPException(400, "Día u hora inválidos")
 
     # --- 🛡️ REGLA 1: VALIDAR DISPONIBILIDAD DEL DOCENTE ---
     if viajero.profesor_id:
-        profesor = db.query(ProfesorDB).filter(ProfesorDB.id == viajero.profesor_id).first()
-        if profesor and profesor.disponibilidad_json:
-            try:
-                dispo = json.loads(profesor.disponibilidad_json)
-                slot_destino = f"{nuevo_dia}-{nueva_hora}"
-                # Si la lista de disponibilidad NO está vacía y el slot NO está en ella...
-                if dispo and (slot_destino not in dispo):
-                    raise HTTPException(
-                        status_code=409, 
-                        detail=f"El profesor {profesor.nombre} NO tiene disponibilidad el {nuevo_dia} a las {nueva_hora}."
-                    )
-            except json.JSONDecodeError:
-                pass # Si falla el JSON, ignoramos esta regla por seguridad
+        profesor = db.query(ProfesorDB.nombre, ProfesorDB.disponibilidad_bits).filter(ProfesorDB.id == viajero.profesor_id).first()
+        mascara = mascara_desde_bytes(profesor.disponibilidad_bits) if profesor else 0
+        # Si cargó disponibilidad (máscara no vacía) y el slot destino NO está en ella...
+        if mascara and not mascara >> (dia_idx * N_HORAS + hora_idx) & 1:
+            raise HTTPException(
+                status_code=409, 
+                detail=f"El profesor {profesor.nombre} NO tiene disponibilidad el {nuevo_dia} a las {nueva_hora}."
+            )
 
     # --- 🛡️ REGLA 2: VALIDAR QUE EL DOCENTE NO ESTÉ EN OTRO CURSO ---
     if viajero.profesor_id:
         # Buscamos si existe ALGUNA asignación de este profe, en ese día y hora, PERO en otro ID (para no contarse a sí mismo)
         ocupado = db.query(AsignacionDB).options(joinedload(AsignacionDB.curso)).filter(
             AsignacionDB.profesor_id == viajero.profesor_id,
-            AsignacionDB.dia == nuevo_dia,
-            AsignacionDB.hora_rango == nueva_hora,
+            AsignacionDB.dia_idx == dia_idx,
+            AsignacionDB.hora_idx == hora_idx,
             AsignacionDB.id != viajero.id # Importante: que no sea él mismo
         ).first()
 
@@ -660,8 +804,8 @@ def mover_asignacion(mov: MovimientoHorario, db: Session = Depends(get_db), u=De
     # Verificamos quién está en el destino (el "Inquilino") para hacer enroque
     inquilino = db.query(AsignacionDB).filter(
         AsignacionDB.curso_id == viajero.curso_id,
-        AsignacionDB.dia == nuevo_dia,
-        AsignacionDB.hora_rango == nueva_hora
+        AsignacionDB.dia_idx == dia_idx,
+        AsignacionDB.hora_idx == hora_idx
     ).first()
 
     mensaje = "Horario movido exitosamente"
@@ -670,154 +814,211 @@ def mover_asignacion(mov: MovimientoHorario, db: Session = Depends(get_db), u=De
     dia_origen = viajero.dia
     hora_origen = viajero.hora_rango
 
-    if inquilino:
-        # CASO SWAP: Hay alguien. Lo mandamos al origen del viajero.
-        # ¡OJO! Deberíamos validar si el "Inquilino" puede ir al origen, pero por ahora lo permitimos para facilitar el uso.
-        inquilino.dia = dia_origen
-        inquilino.hora_rango = hora_origen
-        mensaje = "Horarios intercambiados (Swap)"
+    try:
+        if inquilino and inquilino.id != viajero.id:
+            # CASO SWAP: Hay alguien. Lo mandamos al origen del viajero.
+            # ¡OJO! Deberíamos validar si el "Inquilino" puede ir al origen, pero por ahora lo permitimos para facilitar el uso.
+            # Los índices únicos por slot no admiten dos módulos del curso en el mismo lugar ni
+            # por un instante: primero sacamos al viajero de la grilla y después enrocamos.
+            viajero.dia_idx = viajero.hora_idx = None
+            db.flush()
+            inquilino.dia = dia_origen
+            inquilino.hora_rango = hora_origen
+            db.flush()
+            mensaje = "Horarios intercambiados (Swap)"
+
+        # Movemos al viajero
+        viajero.dia = nuevo_dia
+        viajero.hora_rango = nueva_hora
 
-    # Movemos al viajero
-    viajero.dia = nuevo_dia
-    viajero.hora_rango = nueva_hora
-    
-    db.commit()
+        db.commit()
+    except IntegrityError:
+        # La base rechazó un doble uso del slot (típicamente el aula ya está ocupada a esa hora)
+        db.rollback()
+        raise HTTPException(409, "CONFLICTO: el aula o el profesor ya están ocupados en ese horario.")
     return {"mensaje": mensaje}
 
+@app.post("/api/horarios/mover-lote")
+def mover_lote(movs: List[MovimientoLote], db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # Se simula todo en memoria; se guarda todo junto o nada
+    plan = movimientos.planificar(db, [
+        movimientos.movimiento_desde(m.asignacion_id, m.nuevo_dia, m.nueva_hora, m.intercambiar_con) for m in movs
+    ])
+    if plan.errores:
+        return JSONResponse(status_code=409, content={"mensaje": "No se aplicó ningún movimiento", "errores": plan.errores})
+    try:
+        cambiadas = movimientos.guardar(db, plan)
+    except IntegrityError:
+        raise HTTPException(409, "CONFLICTO: el horario cambió mientras se validaba, intente nuevamente.")
+    return {"mensaje": f"{len(cambiadas)} módulos reubicados", "asignaciones": cambiadas}
+
+@app.post("/api/horarios/reparar")
+def reparar_horario(cambio: ReparacionIncremental, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # En vez de regenerar todo, reubica solo los módulos del requisito/profesor/aula que cambió
+    if not (cambio.requisito_id or cambio.profesor_id or cambio.aula_id):
+        raise HTTPException(400, "Indicá requisito_id, profesor_id o aula_id")
+    if cambio.tiempo_limite <= 0:
+        raise HTTPException(400, "El tiempo límite debe ser positivo")
+    clave = cambio.clave_borrada
+    try:
+        # Leer + reparar + aplicar de a uno con los demás que reemplazan el horario
+        with trabajos.reemplazo_horario:
+            return motor.reparar_incremental(
+                db, cambio.requisito_id, cambio.profesor_id, cambio.aula_id, cambio.tiempo_limite,
+                (clave.curso_id, clave.materia_id, clave.profesor_id) if clave else None
+            )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.post("/api/horarios/limpiar-sobrantes")
+def limpiar_sobrantes(db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
+    # Borra las asignaciones que ya no corresponden a ningún requisito (o que exceden sus horas)
+    with trabajos.reemplazo_horario:
+        quitadas = motor.limpiar_sobrantes(db)
+    return {"mensaje": f"{quitadas} asignaciones sobrantes eliminadas", "quitadas": quitadas}
+
 @app.get("/api/horarios/profesor/me")
-def obtener_mis_horarios(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    nombre_profe = current_user["username"]
-    profe_db = db.query(ProfesorDB).filter(ProfesorDB.nombre == nombre_profe).first()
-    
-    if not profe_db:
-        # En tu DB vieja no hay 'profesor_nombre', pero podemos buscar por relación si existiera.
-        # En tu caso, los profesores tienen el mismo nombre de usuario que el nombre en ProfesorDB.
+async def obtener_mis_horarios(db: AsyncSession = Depends(get_db_async), current_user: dict = Depends(get_current_user)):
+    # El id viene en el token (o del mapa usuario -> profesor en memoria)
+    profesor_id = await db.run_sync(identidad.profesor_id_de, current_user)
+    if not profesor_id:
+        # Los profesores tienen el mismo nombre de usuario que el nombre en ProfesorDB.
         # Si no se encuentra el profesor en DB, no hay mucho que hacer, devolvemos vacío.
         return {}
     
-    asignaciones = db.query(AsignacionDB).filter(AsignacionDB.profesor_id == profe_db.id).all()
-    
-    grilla = {}
-    for a in asignaciones:
-        if a.hora_rango not in grilla: grilla[a.hora_rango] = {}
-        grilla[a.hora_rango][a.dia] = {
-            "materia": a.materia.nombre if a.materia else "??",
-            "curso": f"{a.curso.anio} \"{a.curso.division}\"" if a.curso else "?",
-            "aula": a.aula.nombre if a.aula else "Sin Aula",
-            "color": a.materia.color_hex if a.materia else "#0d9488"
-        }
-    return grilla
-
-# Modelo para recibir la configuración
-class ConfiguracionInstitucional(BaseModel):
-    nombre: str
-    direccion: Optional[str] = ""
-    logo_base64: Optional[str] = None 
+    # Grillas de todos los profes precalculadas hasta que cambie el horario
+    return await db.run_sync(vistas.grilla_profesor, profesor_id)
 
 # ==========================================
-# 6. CONFIGURACIÓN INSTITUCIONAL (DEBUG MODE)
+# 6. CONFIGURACIÓN INSTITUCIONAL
 # ==========================================
 
 # Modelo para recibir la configuración
 class ConfiguracionInstitucional(BaseModel):
     nombre: str
     direccion: Optional[str] = ""
-    logo_base64: Optional[str] = None 
+    logo_base64: Optional[str] = None  # data URL; se guarda como asset, no en configuraciones
 
 @app.post("/api/config/institucion")
 def guardar_config_institucion(config: ConfiguracionInstitucional, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    print("--- 🟢 INICIANDO GUARDADO DE CONFIGURACIÓN ---")
-    print(f"Recibido Nombre: {config.nombre}")
-    print(f"Recibido Dirección: {config.direccion}")
-    if config.logo_base64:
-        print(f"Recibido Logo (Tamaño): {len(config.logo_base64)} caracteres")
-    else:
-        print("Recibido Logo: None")
-
     try:
-        # 1. Guardar Nombre
-        conf_nombre = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "institucion_nombre").first()
-        if not conf_nombre:
-            print("-> Creando registro 'institucion_nombre'...")
-            conf_nombre = ConfiguracionDB(key="institucion_nombre")
-            db.add(conf_nombre)
-        conf_nombre.value_json = json.dumps(config.nombre)
-
-        # 2. Guardar Direccion
-        conf_dir = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "institucion_direccion").first()
-        if not conf_dir:
-            print("-> Creando registro 'institucion_direccion'...")
-            conf_dir = ConfiguracionDB(key="institucion_direccion")
-            db.add(conf_dir)
-        conf_dir.value_json = json.dumps(config.direccion)
-
-        # 3. Guardar Logo
+        datos = {"institucion_nombre": config.nombre, "institucion_direccion": config.direccion}
+        # El logo va a la tabla de assets; en la configuración solo queda su hash
         if config.logo_base64:
-            print("-> Procesando guardado de Logo...")
-            conf_logo = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "institucion_logo").first()
-            if not conf_logo:
-                print("-> Creando registro 'institucion_logo'...")
-                conf_logo = ConfiguracionDB(key="institucion_logo")
-                db.add(conf_logo)
-            conf_logo.value_json = json.dumps(config.logo_base64)
-            print("-> Logo asignado a la base de datos.")
-
-        print("-> Ejecutando COMMIT...")
+            contenido, media_type = assets.desde_data_url(config.logo_base64)
+            datos["institucion_logo_hash"] = assets.guardar(db, contenido, media_type)
+        configuracion.escribir(db, **datos)
+
         db.commit()
-        print("--- ✅ GUARDADO EXITOSO ---")
         return {"mensaje": "Configuración institucional guardada"}
 
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"--- ❌ ERROR GRAVE AL GUARDAR: {e} ---")
+        logger.error(f"Error al guardar configuración institucional: {e}")
         db.rollback() # Deshacer cambios si falla
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @app.get("/api/config/institucion")
 def obtener_config_institucion(db: Session = Depends(get_db)):
+    # Se pide en cada carga de página: solo textos y la URL del logo, desde memoria
     try:
-        c_nombre = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "institucion_nombre").first()
-        c_dir = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "institucion_direccion").first()
-        c_logo = db.query(ConfiguracionDB).filter(ConfiguracionDB.key == "institucion_logo").first()
-        
-        # Logs para ver qué estamos recuperando
-        # print(f"GET Nombre encontrado: {c_nombre.value_json if c_nombre else 'No'}")
-
+        config = configuracion.obtener(db)
         return {
-            "nombre": json.loads(c_nombre.value_json) if c_nombre else "",
-            "direccion": json.loads(c_dir.value_json) if c_dir else "",
-            "logo_base64": json.loads(c_logo.value_json) if c_logo else None
+            "nombre": config.institucion_nombre,
+            "direccion": config.institucion_direccion,
+            "logo_url": assets.url_de(config.institucion_logo_hash)
         }
     except Exception as e:
-        print(f"Error al leer configuración: {e}")
-        return {"nombre": "", "direccion": "", "logo_base64": None}
-    
+        logger.error(f"Error al leer configuración: {e}")
+        return {"nombre": "", "direccion": "", "logo_url": None}
+
+@app.get("/api/assets/{hash_asset}")
+def obtener_asset(hash_asset: str, request: Request, db: Session = Depends(get_db)):
+    # El contenido de un hash nunca cambia: el navegador lo guarda por un año sin revalidar
+    headers = {"ETag": assets.etag_de(hash_asset), "Cache-Control": assets.CACHE_CONTROL,
+               "X-Content-Type-Options": "nosniff"}
+    if request.headers.get("if-none-match") == headers["ETag"] and assets.existe(db, hash_asset):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    encontrado = assets.leer(db, hash_asset)
+    if encontrado is None:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    contenido, media_type = encontrado
+    return Response(contenido, media_type=media_type, headers=headers)
+
     # --- AGREGAR EN main.py (Junto a los otros endpoints de horarios) ---
 
 @app.get("/api/horarios/profesor/{pid}")
-def get_horario_profesor_admin(pid: str, db: Session = Depends(get_db), u=Depends(get_current_admin_user)):
-    # Buscamos todas las asignaciones de ESTE profesor
-    asigs = db.query(AsignacionDB).options(
-        joinedload(AsignacionDB.curso), 
-        joinedload(AsignacionDB.materia), 
-        joinedload(AsignacionDB.aula)
-    ).filter(AsignacionDB.profesor_id == pid).all()
-    
-    grilla = {}
-    for a in asigs:
-        # Estructura: grilla[hora][dia] = "Materia (Curso) [Aula]"
-        if a.hora_rango not in grilla: grilla[a.hora_rango] = {}
-        
-        texto_curso = f"{a.curso.anio} {a.curso.division}" if a.curso else "?"
-        texto_materia = a.materia.nombre if a.materia else "?"
-        texto_aula = f" [{a.aula.nombre}]" if a.aula else ""
-        
-        grilla[a.hora_rango][a.dia] = {
-            "texto": f"{texto_materia}\n({texto_curso}){texto_aula}",
-            "materia": texto_materia,
-            "curso": texto_curso,
-            "aula": a.aula.nombre if a.aula else "-"
-        }
-    return grilla
+async def get_horario_profesor_admin(pid: str, db: AsyncSession = Depends(get_db_async), u=Depends(get_current_admin_user)):
+    # Mismas filas precalculadas que usa /api/horarios/profesor/me
+    return await db.run_sync(vistas.grilla_profesor_admin, pid)
+
+# --- CAMBIOS EN VIVO (en vez de recargar la grilla cada tanto) ---
+# El navegador no puede mandar headers en WebSocket/EventSource: el token va en ?token=.
+# Admin: sigue el curso, profesor y/o aula que pida. Profesor: solo su propio horario.
+
+async def _filtros_en_vivo(db: AsyncSession, token: str, curso: Optional[str],
+                           profesor: Optional[str], aula: Optional[str]) -> dict:
+    payload = seguridad.verificar_token(token) if token else None
+    if not payload:
+        raise HTTPException(status_code=401, detail="Token inválido o expirado")
+    usuario = _usuario_desde_payload(payload)
+    if usuario["rol"] == "admin":
+        if not (curso or profesor or aula):
+            raise HTTPException(status_code=400, detail="Indicar curso, profesor o aula")
+        return {"curso": curso, "profesor": profesor, "aula": aula}
+    pid = await db.run_sync(identidad.profesor_id_de, usuario)
+    await db.close()  # la conexión no queda tomada mientras dura la suscripción
+    if not pid:
+        raise HTTPException(status_code=403, detail="El usuario no es un profesor")
+    return {"profesor": pid}
+
+@app.websocket("/ws/horarios")
+async def horarios_en_vivo_ws(websocket: WebSocket, token: str = "", curso: Optional[str] = None,
+                              profesor: Optional[str] = None, aula: Optional[str] = None,
+                              db: AsyncSession = Depends(get_db_async)):
+    try:
+        filtros = await _filtros_en_vivo(db, token, curso, profesor, aula)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    with eventos.suscribir(**filtros) as suscripcion:
+        recibir = asyncio.ensure_future(websocket.receive())
+        try:
+            while True:
+                leer = asyncio.ensure_future(suscripcion.cola.get())
+                hechos, _ = await asyncio.wait({leer, recibir}, return_when=asyncio.FIRST_COMPLETED)
+                if recibir in hechos:
+                    leer.cancel()
+                    if recibir.result()["type"] == "websocket.disconnect": break
+                    recibir = asyncio.ensure_future(websocket.receive())  # lo que mande el cliente se ignora
+                    continue
+                await websocket.send_json(leer.result())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            recibir.cancel()
+
+@app.get("/api/horarios-en-vivo")
+async def horarios_en_vivo_sse(request: Request, token: str = "", curso: Optional[str] = None,
+                               profesor: Optional[str] = None, aula: Optional[str] = None,
+                               db: AsyncSession = Depends(get_db_async)):
+    # Lo mismo por Server-Sent Events (EventSource), para donde no haya WebSocket
+    filtros = await _filtros_en_vivo(db, token, curso, profesor, aula)
+
+    async def emitir():
+        with eventos.suscribir(**filtros) as suscripcion:
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=25)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # mantiene viva la conexión a través de proxies
+                    continue
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento, separators=(',', ':'))}\n\n"
+
+    return StreamingResponse(emitir(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 # --- AGREGAR EN main.py (Sección Profesores) ---
 
@@ -834,6 +1035,7 @@ def actualizar_profesor(pid: str, p: Profesor, db: Session = Depends(get_db), u=
     profe.disponibilidad_json = json.dumps(p.disponibilidad)
     
     db.commit()
+    cache_respuestas.invalidar("profesores")
     return {"mensaje": "Profesor actualizado correctamente"}
 
 # --- AGREGAR EN main.py (Sección Auth) ---
@@ -0,0 +1,257 @@
+# BackEnd/app/migraciones.py
+# Migraciones versionadas del esquema.
+#
+# La tabla `schema_version` guarda qué migraciones ya se aplicaron. Al arrancar, la app
+# solo lee esa tabla y la anotación de índices de respaldo (ver abajo), sin inspeccionar el
+# esquema; el DDL corre únicamente si hay migraciones pendientes.
+#
+# Uso desde BackEnd/:
+#   python -m app.migraciones estado
+#   python -m app.migraciones aplicar
+#   python -m app.migraciones indices   (reintenta los índices únicos por slot, ver abajo)
+#
+# Reglas para agregar una migración:
+#   - Se agrega AL FINAL de MIGRACIONES con el número siguiente. Nunca se renumera.
+#   - Tiene que ser idempotente (bases viejas pueden tener parte del cambio hecho a mano).
+#   - Índices nuevos: usar crear_indice(), que no falla si ya existe.
+
+import argparse
+import json
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, bindparam, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from app.assets import desde_data_url, hash_de
+from app.database import AsignacionDB, AssetDB, Base, ConfiguracionDB, ProfesorDB, engine as engine_app, mascara_desde_json
+from app.grilla import DIAS_SEMANA, HORARIOS_ORDENADOS, mascara_a_bytes
+
+logger = logging.getLogger(__name__)
+
+_meta = MetaData()
+schema_version = Table(
+    "schema_version", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String),
+    Column("aplicada", DateTime, default=datetime.utcnow),
+)
+
+class Migracion(NamedTuple):
+    version: int
+    descripcion: str
+    aplicar: Callable[[Connection], None]
+
+# --- AYUDANTES ---
+
+def columnas_de(conn: Connection, tabla: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(tabla)}
+
+def agregar_columna(conn: Connection, tabla: str, columna: str, ddl: str):
+    if columna not in columnas_de(conn, tabla):
+        conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {ddl}"))
+
+def crear_indice(conn: Connection, indice: Index):
+    existentes = {i["name"] for i in inspect(conn).get_indexes(indice.table.name)}
+    if indice.name not in existentes:
+        indice.create(conn)
+
+# --- ÍNDICES ÚNICOS POR SLOT ---
+# Si la base ya tenía choques cargados (un curso/profe/aula dos veces en el mismo slot) el
+# índice único no se puede crear. En ese caso se deja uno no único "ix_..." para las
+# búsquedas, se listan las filas que chocan y, mientras el respaldo exista, se avisa en cada
+# arranque. Después de resolver los choques: python -m app.migraciones indices
+#
+# Qué índices quedaron con respaldo se anota en ConfiguracionDB (CLAVE_RESPALDO) cada vez
+# que se intenta crearlos, así el arranque lo lee con un SELECT en vez de inspeccionar el esquema.
+
+MAX_CHOQUES_INFORMADOS = 20
+CLAVE_RESPALDO = "indices_slot_con_respaldo"
+
+def _respaldo_de(indice: Index) -> str:
+    return indice.name.replace("ux_", "ix_", 1)
+
+def _indices_por_slot() -> List[Index]:
+    return [i for i in AsignacionDB.__table__.indexes if i.name.startswith("ux_")]
+
+def choques_de(conn: Connection, indice: Index, limite: int = MAX_CHOQUES_INFORMADOS) -> List[dict]:
+    """Grupos de asignaciones que impiden crear el índice único (NULL no choca)."""
+    columnas = list(indice.columns)
+    grupos = conn.execute(
+        select(*columnas).where(*(c.isnot(None) for c in columnas))
+        .group_by(*columnas).having(func.count() > 1).limit(limite)
+    ).all()
+    t = AsignacionDB.__table__
+    return [
+        {**dict(zip((c.name for c in columnas), g)),
+         "ids": list(conn.execute(select(t.c.id).where(*(c == v for c, v in zip(columnas, g)))).scalars())}
+        for g in grupos
+    ]
+
+def crear_indices_unicos(conn: Connection) -> List[str]:
+    """Crea los ux_ que falten (y borra su respaldo ix_). Devuelve los que no se pudieron."""
+    existentes = {i["name"] for i in inspect(conn).get_indexes("horarios_generados")}
+    fallidos = []
+    for indice in _indices_por_slot():
+        respaldo = _respaldo_de(indice)
+        if indice.name not in existentes:
+            try:
+                with conn.begin_nested():
+                    indice.create(conn)
+            except (IntegrityError, OperationalError, ProgrammingError):
+                for choque in choques_de(conn, indice):
+                    logger.warning("%s: asignaciones en el mismo slot: %s", indice.name, choque)
+                logger.warning("No se pudo crear %s; queda el índice no único %s", indice.name, respaldo)
+                columnas = ", ".join(c.name for c in indice.columns)
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {respaldo} ON horarios_generados ({columnas})"))
+                fallidos.append(indice.name)
+                continue
+        if respaldo in existentes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {respaldo}"))
+    _anotar_respaldos(conn, fallidos)
+    return fallidos
+
+def _anotar_respaldos(conn: Connection, fallidos: List[str]):
+    conf = ConfiguracionDB.__table__
+    conn.execute(conf.delete().where(conf.c.key == CLAVE_RESPALDO))
+    conn.execute(conf.insert().values(key=CLAVE_RESPALDO, value_json=json.dumps(fallidos)))
+
+def indices_de_respaldo(engine: Engine = engine_app) -> List[str]:
+    """Índices únicos por slot que hoy están reemplazados por uno no único (según la anotación)."""
+    conf = ConfiguracionDB.__table__
+    with engine.connect() as conn:
+        try: valor = conn.execute(select(conf.c.value_json).where(conf.c.key == CLAVE_RESPALDO)).scalar()
+        except (OperationalError, ProgrammingError): return []  # base sin migrar
+    try: return list(json.loads(valor or "[]"))
+    except (ValueError, TypeError): return []
+
+# --- MIGRACIONES ---
+
+def _001_esquema_inicial(conn: Connection):
+    # En una base vacía crea todo; en una vieja solo agrega las tablas que falten
+    Base.metadata.create_all(bind=conn)
+
+def _002_columnas_nuevas(conn: Connection):
+    # Columnas marcadas como "NUEVO CAMPO" que create_all nunca agregaba a bases existentes
+    agregar_columna(conn, "profesores", "color", "VARCHAR DEFAULT '#0d9488'")
+    agregar_columna(conn, "materias", "color_hex", "VARCHAR DEFAULT '#0d9488'")
+    agregar_columna(conn, "cursos", "turno", "VARCHAR DEFAULT 'Mañana'")
+    agregar_columna(conn, "cursos", "cantidad_alumnos", "INTEGER DEFAULT 30")
+    agregar_columna(conn, "aulas", "capacidad", "INTEGER DEFAULT 30")
+    agregar_columna(conn, "requisitos_curso", "profesor_id", "VARCHAR REFERENCES profesores(id)")
+    agregar_columna(conn, "requisitos_curso", "aula_preferida_id", "VARCHAR REFERENCES aulas(id)")
+    agregar_columna(conn, "usuarios", "force_change_password", "BOOLEAN DEFAULT TRUE")
+
+def _003_slots_asignaciones(conn: Connection):
+    """dia_idx/hora_idx en horarios_generados + índices únicos por slot."""
+    agregar_columna(conn, "horarios_generados", "dia_idx", "INTEGER")
+    agregar_columna(conn, "horarios_generados", "hora_idx", "INTEGER")
+    caso_dia = " ".join(f"WHEN '{d}' THEN {i}" for i, d in enumerate(DIAS_SEMANA))
+    caso_hora = " ".join(f"WHEN '{h}' THEN {i}" for i, h in enumerate(HORARIOS_ORDENADOS))
+    conn.execute(text(
+        f"UPDATE horarios_generados SET dia_idx = CASE dia {caso_dia} END, "
+        f"hora_idx = CASE substr(hora_rango, 1, 5) {caso_hora} END "
+        "WHERE dia_idx IS NULL OR hora_idx IS NULL"
+    ))
+
+    crear_indices_unicos(conn)
+
+def _004_disponibilidad_bits(conn: Connection):
+    """Disponibilidad de los profes como máscara de bits, calculada desde el JSON."""
+    agregar_columna(conn, "profesores", "disponibilidad_bits", "BYTEA" if conn.dialect.name == "postgresql" else "BLOB")
+    t = ProfesorDB.__table__
+    filas = conn.execute(select(t.c.id, t.c.disponibilidad_json).where(t.c.disponibilidad_bits.is_(None))).all()
+    if filas:
+        conn.execute(
+            t.update().where(t.c.id == bindparam("pid")).values(disponibilidad_bits=bindparam("bits")),
+            [{"pid": pid, "bits": mascara_a_bytes(mascara_desde_json(dj))} for pid, dj in filas]
+        )
+
+def _005_assets(conn: Connection):
+    """Tabla de assets; el logo guardado como base64 en configuraciones pasa a ella."""
+    AssetDB.__table__.create(bind=conn, checkfirst=True)
+    conf, assets = ConfiguracionDB.__table__, AssetDB.__table__
+    valor = conn.execute(select(conf.c.value_json).where(conf.c.key == "institucion_logo")).scalar()
+    if valor is None: return
+    try:
+        datos, media_type = desde_data_url(json.loads(valor) or "")
+    except ValueError:
+        logger.warning("El logo guardado no es una imagen válida; se descarta")
+    else:
+        h = hash_de(datos)
+        if conn.execute(select(assets.c.hash).where(assets.c.hash == h)).first() is None:
+            conn.execute(assets.insert().values(hash=h, media_type=media_type, tamanio=len(datos), contenido=datos, creado=datetime.utcnow()))
+        conn.execute(conf.delete().where(conf.c.key == "institucion_logo_hash"))
+        conn.execute(conf.insert().values(key="institucion_logo_hash", value_json=json.dumps(h)))
+    conn.execute(conf.delete().where(conf.c.key == "institucion_logo"))
+
+def _006_reintentar_indices_unicos(conn: Connection):
+    """Bases donde la 003 dejó índices no únicos: se reintentan los únicos."""
+    crear_indices_unicos(conn)
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "Esquema inicial", _001_esquema_inicial),
+    Migracion(2, "Columnas agregadas después del esquema inicial", _002_columnas_nuevas),
+    Migracion(3, "Slots normalizados e índices únicos en horarios_generados", _003_slots_asignaciones),
+    Migracion(4, "Disponibilidad de profesores como máscara de bits", _004_disponibilidad_bits),
+    Migracion(5, "Assets binarios (logo) fuera de configuraciones", _005_assets),
+    Migracion(6, "Reintento de índices únicos por slot en horarios_generados", _006_reintentar_indices_unicos),
+]
+
+# --- API ---
+
+def version_actual(engine: Engine = engine_app) -> int:
+    with engine.connect() as conn:
+        try:
+            v = conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).first()
+        except (OperationalError, ProgrammingError):
+            return 0  # la tabla todavía no existe
+    return v[0] if v else 0
+
+def pendientes(engine: Engine = engine_app) -> List[Migracion]:
+    actual = version_actual(engine)
+    return [m for m in MIGRACIONES if m.version > actual]
+
+def aplicar_migraciones(engine: Engine = engine_app) -> List[Migracion]:
+    """Aplica en orden las migraciones pendientes, cada una en su propia transacción."""
+    _meta.create_all(bind=engine)
+    aplicadas = []
+    for m in pendientes(engine):
+        logger.info("Aplicando migración %03d: %s", m.version, m.descripcion)
+        try:
+            with engine.begin() as conn:
+                m.aplicar(conn)
+                conn.execute(schema_version.insert().values(
+                    version=m.version, descripcion=m.descripcion, aplicada=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Otro proceso la aplicó en paralelo
+            logger.info("La migración %03d ya había sido aplicada", m.version)
+            continue
+        aplicadas.append(m)
+    return aplicadas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de horarios")
+    parser.add_argument("accion", choices=["estado", "aplicar", "indices"])
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.accion == "estado":
+        print(f"Versión actual: {version_actual()}")
+        for m in pendientes():
+            print(f"  pendiente {m.version:03d}: {m.descripcion}")
+        for nombre in indices_de_respaldo():
+            print(f"  sin índice único: {nombre}")
+    elif args.accion == "indices":
+        with engine_app.begin() as conn:
+            fallidos = crear_indices_unicos(conn)
+        print(f"Índices únicos que siguen sin poder crearse: {', '.join(fallidos)}" if fallidos else "Índices únicos creados.")
+    else:
+        aplicadas = aplicar_migraciones()
+        print(f"Migraciones aplicadas: {len(aplicadas)}. Versión actual: {version_actual()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,649 @@
+# BackEnd/app/motor.py
+# Motor de generación de horarios.
+# Carga todo una sola vez en memoria, resuelve con máscaras de bits (un bit por slot
+# de la semana) y escribe el resultado final en una única transacción.
+
+import logging
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import app.configuracion as configuracion
+from app.database import AsignacionDB, ProfesorDB, RequisitoDB, columnas_slot
+from app.grilla import (
+    MASCARA_SEMANA, N_DIAS, N_HORAS, huecos, iterar_slots, mascara_de_horas, mascara_desde_bytes, slot_de, slot_index
+)
+
+logger = logging.getLogger(__name__)
+
+# --- ESTRUCTURAS EN MEMORIA ---
+
+# Callback de avance: (requisitos_procesados, horas_ubicadas, conflictos).
+# Puede lanzar GeneracionCancelada para cortar la generación.
+Progreso = Callable[[int, int, int], None]
+
+class GeneracionCancelada(Exception):
+    pass
+
+class Requisito(NamedTuple):
+    """Copia plana de un RequisitoDB (no depende de la sesión de SQLAlchemy)."""
+    id: str
+    curso_id: str
+    materia_id: str
+    profesor_id: Optional[str]
+    aula_preferida_id: Optional[str]
+    horas_semanales: int
+
+class Modulo(NamedTuple):
+    """Un módulo ubicado en la grilla."""
+    slot: int
+    requisito_id: str
+    curso_id: str
+    materia_id: str
+    profesor_id: Optional[str]
+    aula_id: Optional[str]
+
+@dataclass
+class DatosGeneracion:
+    requisitos: List[Requisito]
+    # profesor_id -> máscara de slots donde PUEDE dar clase.
+    # Si el profe no cargó disponibilidad, no se guarda (= sin restricciones).
+    disponibilidad: Dict[str, int] = field(default_factory=dict)
+    mascara_almuerzo: int = 0
+
+    def disponibilidad_de(self, profesor_id: Optional[str]) -> int:
+        if not profesor_id: return MASCARA_SEMANA
+        return self.disponibilidad.get(profesor_id, MASCARA_SEMANA)
+
+@dataclass
+class ResultadoGeneracion:
+    modulos: List[Modulo] = field(default_factory=list)
+    # requisito_id -> horas que no se pudieron ubicar
+    faltantes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def horas_faltantes(self) -> int:
+        return sum(self.faltantes.values())
+
+class Ocupacion:
+    """Ocupación de la semana por curso, profesor y aula (un entero de 115 bits cada uno)."""
+
+    def __init__(self, datos: DatosGeneracion):
+        self.datos = datos
+        self.curso: Dict[str, int] = {}
+        self.profesor: Dict[str, int] = {}
+        self.aula: Dict[str, int] = {}
+
+    def libres(self, req: Requisito) -> int:
+        """Máscara de slots donde el requisito se puede ubicar ahora mismo."""
+        m = MASCARA_SEMANA & ~self.datos.mascara_almuerzo & ~self.curso.get(req.curso_id, 0)
+        if req.profesor_id:
+            m &= self.datos.disponibilidad_de(req.profesor_id) & ~self.profesor.get(req.profesor_id, 0)
+        if req.aula_preferida_id:
+            m &= ~self.aula.get(req.aula_preferida_id, 0)
+        return m
+
+    def ocupar(self, mod: Modulo):
+        bit = 1 << mod.slot
+        self.curso[mod.curso_id] = self.curso.get(mod.curso_id, 0) | bit
+        if mod.profesor_id:
+            self.profesor[mod.profesor_id] = self.profesor.get(mod.profesor_id, 0) | bit
+        if mod.aula_id:
+            self.aula[mod.aula_id] = self.aula.get(mod.aula_id, 0) | bit
+
+    def liberar(self, mod: Modulo):
+        bit = ~(1 << mod.slot)
+        self.curso[mod.curso_id] = self.curso.get(mod.curso_id, 0) & bit
+        if mod.profesor_id:
+            self.profesor[mod.profesor_id] = self.profesor.get(mod.profesor_id, 0) & bit
+        if mod.aula_id:
+            self.aula[mod.aula_id] = self.aula.get(mod.aula_id, 0) & bit
+
+def modulo_para(req: Requisito, slot: int) -> Modulo:
+    return Modulo(slot, req.id, req.curso_id, req.materia_id, req.profesor_id, req.aula_preferida_id)
+
+# --- CARGA DESDE LA BASE ---
+
+def leer_almuerzo_slots(db: Session) -> List[str]:
+    return list(configuracion.obtener(db).almuerzo_slots)
+
+def cargar_datos(db: Session) -> DatosGeneracion:
+    """Lee requisitos, disponibilidades y preferencias con una consulta por tabla."""
+    requisitos = [
+        Requisito(r.id, r.curso_id, r.materia_id, r.profesor_id, r.aula_preferida_id, r.horas_semanales or 0)
+        for r in db.query(
+            RequisitoDB.id, RequisitoDB.curso_id, RequisitoDB.materia_id,
+            RequisitoDB.profesor_id, RequisitoDB.aula_preferida_id, RequisitoDB.horas_semanales
+        ).all()
+    ]
+
+    # Si el profe marcó horas permitidas, SOLO puede en esas. Si no cargó nada, está libre.
+    disponibilidad = {}
+    for pid, bits in db.query(ProfesorDB.id, ProfesorDB.disponibilidad_bits).all():
+        mascara = mascara_desde_bytes(bits)
+        if mascara:
+            disponibilidad[pid] = mascara
+
+    return DatosGeneracion(
+        requisitos=requisitos,
+        disponibilidad=disponibilidad,
+        mascara_almuerzo=mascara_de_horas(leer_almuerzo_slots(db)),
+    )
+
+# --- ALGORITMO GREEDY ---
+
+def orden_greedy(requisitos: List[Requisito]) -> List[Requisito]:
+    # Primero los que tienen Aula Fija (más difícil), luego por cantidad de horas (de mayor a menor)
+    return sorted(requisitos, key=lambda r: (1 if r.aula_preferida_id else 0, r.horas_semanales), reverse=True)
+
+def generar_greedy(
+    datos: DatosGeneracion, orden: Optional[List[Requisito]] = None, progreso: Optional[Progreso] = None
+) -> ResultadoGeneracion:
+    """Ubica cada requisito en el primer slot libre de la semana (Lunes 07:40 en adelante)."""
+    ocupacion = Ocupacion(datos)
+    resultado = ResultadoGeneracion()
+
+    for i, req in enumerate(orden if orden is not None else orden_greedy(datos.requisitos)):
+        if progreso: progreso(i, len(resultado.modulos), len(resultado.faltantes))
+        pendientes = req.horas_semanales
+        if pendientes <= 0: continue
+
+        for slot in iterar_slots(ocupacion.libres(req)):
+            mod = modulo_para(req, slot)
+            ocupacion.ocupar(mod)
+            resultado.modulos.append(mod)
+            pendientes -= 1
+            if pendientes <= 0: break
+
+        if pendientes > 0:
+            resultado.faltantes[req.id] = pendientes
+
+    if progreso: progreso(len(datos.requisitos), len(resultado.modulos), len(resultado.faltantes))
+    return resultado
+
+# --- MODO CSP (BACKTRACKING + REPARACIÓN LOCAL) ---
+
+class _Estado:
+    """Estado mutable de la búsqueda CSP: ocupación, módulos puestos y horas pendientes."""
+
+    def __init__(self, datos: DatosGeneracion):
+        self.ocupacion = Ocupacion(datos)
+        self.modulos: List[Modulo] = []
+        self.pendientes = {r.id: r.horas_semanales for r in datos.requisitos if r.horas_semanales > 0}
+        # (recurso, id, slot) -> módulo que lo ocupa, para saber a quién desplazar en la reparación
+        self.en_slot: Dict[tuple, Modulo] = {}
+        # Callejones sin salida encontrados (forward checking fallido o retroceso)
+        self.conflictos = 0
+
+    def avisar(self, progreso: Optional[Progreso]):
+        if not progreso: return
+        completos = sum(1 for p in self.pendientes.values() if p <= 0)
+        progreso(completos, len(self.modulos), self.conflictos)
+
+    def poner(self, mod: Modulo):
+        self.ocupacion.ocupar(mod)
+        self.modulos.append(mod)
+        self.pendientes[mod.requisito_id] = self.pendientes.get(mod.requisito_id, 0) - 1
+        for clave in _claves_modulo(mod):
+            self.en_slot[clave] = mod
+
+    def sacar(self, mod: Modulo):
+        self.ocupacion.liberar(mod)
+        if self.modulos and self.modulos[-1] == mod: self.modulos.pop()
+        else: self.modulos.remove(mod)
+        self.pendientes[mod.requisito_id] = self.pendientes.get(mod.requisito_id, 0) + 1
+        for clave in _claves_modulo(mod):
+            self.en_slot.pop(clave, None)
+
+def _claves_modulo(mod: Modulo):
+    claves = [("curso", mod.curso_id, mod.slot)]
+    if mod.profesor_id: claves.append(("profesor", mod.profesor_id, mod.slot))
+    if mod.aula_id: claves.append(("aula", mod.aula_id, mod.slot))
+    return claves
+
+def _vecinos(requisitos: List[Requisito]) -> Dict[str, List[Requisito]]:
+    """Para cada requisito, los requisitos que comparten curso, profesor o aula (incluido él)."""
+    por_recurso: Dict[tuple, List[Requisito]] = {}
+    for r in requisitos:
+        por_recurso.setdefault(("curso", r.curso_id), []).append(r)
+        if r.profesor_id: por_recurso.setdefault(("profesor", r.profesor_id), []).append(r)
+        if r.aula_preferida_id: por_recurso.setdefault(("aula", r.aula_preferida_id), []).append(r)
+    vecinos = {}
+    for r in requisitos:
+        vistos = {}
+        for clave in (("curso", r.curso_id), ("profesor", r.profesor_id), ("aula", r.aula_preferida_id)):
+            for v in por_recurso.get(clave, []):
+                vistos[v.id] = v
+        vecinos[r.id] = list(vistos.values())
+    return vecinos
+
+def _elegir_variable(estado: _Estado, reqs: Dict[str, Requisito]) -> Optional[Requisito]:
+    """Variable más restringida: el requisito con menos slots libres de sobra."""
+    mejor, holgura_min = None, None
+    for rid, pend in estado.pendientes.items():
+        if pend <= 0: continue
+        req = reqs[rid]
+        holgura = estado.ocupacion.libres(req).bit_count() - pend
+        if holgura_min is None or holgura < holgura_min:
+            mejor, holgura_min = req, holgura
+            if holgura < 0: break  # ya no hay forma de completarlo
+    return mejor
+
+def _candidatos(estado: _Estado, req: Requisito) -> List[int]:
+    """Slots libres ordenados: primero los días donde el requisito tiene menos horas."""
+    por_dia = [0] * N_DIAS
+    for mod in estado.modulos:
+        if mod.requisito_id == req.id: por_dia[mod.slot // N_HORAS] += 1
+    slots = list(iterar_slots(estado.ocupacion.libres(req)))
+    slots.sort(key=lambda s: (por_dia[s // N_HORAS], s))
+    return slots
+
+def _holguras(estado: _Estado, vecinos: List[Requisito]) -> List[int]:
+    return [estado.ocupacion.libres(v).bit_count() - estado.pendientes.get(v.id, 0) for v in vecinos]
+
+def _chequeo_adelante(estado: _Estado, vecinos: List[Requisito], antes: List[int]) -> bool:
+    """Forward checking: ningún requisito vecino que era resoluble puede quedar con
+    menos slots libres que horas pendientes. (Los que ya eran imposibles no bloquean.)"""
+    for v, holgura_antes in zip(vecinos, antes):
+        pend = estado.pendientes.get(v.id, 0)
+        if pend > 0 and holgura_antes >= 0 and estado.ocupacion.libres(v).bit_count() < pend:
+            return False
+    return True
+
+def _reparar(estado: _Estado, datos: DatosGeneracion, reqs: Dict[str, Requisito], limite: float,
+             progreso: Optional[Progreso] = None, solo: Optional[Set[str]] = None):
+    """Reparación local: para cada hora sin ubicar, busca un slot cuyos ocupantes
+    puedan mudarse a otro slot libre, y hace el enroque. Con `solo` se limita a esos requisitos."""
+    mejoro = True
+    while mejoro and time.monotonic() < limite:
+        estado.avisar(progreso)
+        mejoro = False
+        for rid, pend in list(estado.pendientes.items()):
+            if pend <= 0 or (solo is not None and rid not in solo): continue
+            req = reqs[rid]
+            permitido = MASCARA_SEMANA & ~datos.mascara_almuerzo & datos.disponibilidad_de(req.profesor_id)
+            for slot in iterar_slots(permitido):
+                if time.monotonic() >= limite: return
+                nuevo = modulo_para(req, slot)
+                bloqueantes = {estado.en_slot[c] for c in _claves_modulo(nuevo) if c in estado.en_slot}
+                if not bloqueantes or any(b.requisito_id == rid for b in bloqueantes): continue
+
+                for b in bloqueantes: estado.sacar(b)
+                estado.poner(nuevo)
+                mudados = []
+                for b in bloqueantes:
+                    destino = next(iterar_slots(estado.ocupacion.libres(reqs[b.requisito_id]) & ~(1 << b.slot)), None)
+                    if destino is None: break
+                    mudado = modulo_para(reqs[b.requisito_id], destino)
+                    estado.poner(mudado)
+                    mudados.append(mudado)
+
+                if len(mudados) == len(bloqueantes):
+                    mejoro = True
+                    break
+                # No se pudo: deshacemos todo
+                for m in mudados: estado.sacar(m)
+                estado.sacar(nuevo)
+                for b in bloqueantes: estado.poner(b)
+
+def generar_csp(
+    datos: DatosGeneracion, tiempo_limite: float = 10.0, progreso: Optional[Progreso] = None
+) -> ResultadoGeneracion:
+    """Backtracking con variable más restringida y forward checking, acotado por tiempo.
+    Si no llega a ubicar todo, se queda con la mejor solución parcial y la repara localmente."""
+    inicio = time.monotonic()
+    limite = inicio + tiempo_limite
+    # El backtracking usa el 70% del tiempo; el resto queda para la reparación local
+    limite_busqueda = inicio + tiempo_limite * 0.7
+    reqs = {r.id: r for r in datos.requisitos}
+    vecinos = _vecinos(datos.requisitos)
+    estado = _Estado(datos)
+
+    mejor: List[Modulo] = []
+    # Cada marco de la pila: [requisito, candidatos, índice del próximo candidato, módulo puesto]
+    pila: List[list] = []
+    completo = False
+
+    pasos = 0
+    while time.monotonic() < limite_busqueda:
+        pasos += 1
+        if pasos % 50 == 0: estado.avisar(progreso)
+        req = _elegir_variable(estado, reqs)
+        if req is None:
+            completo = True
+            break
+        pila.append([req, _candidatos(estado, req), 0, None])
+
+        # Avanzamos/retrocedemos hasta lograr poner un valor consistente
+        while pila and time.monotonic() < limite_busqueda:
+            marco = pila[-1]
+            if marco[3] is not None:
+                estado.sacar(marco[3]); marco[3] = None
+            req, candidatos, i = marco[0], marco[1], marco[2]
+            puesto = False
+            while i < len(candidatos):
+                mod = modulo_para(req, candidatos[i]); i += 1
+                antes = _holguras(estado, vecinos[req.id])
+                estado.poner(mod)
+                if _chequeo_adelante(estado, vecinos[req.id], antes):
+                    marco[2], marco[3] = i, mod
+                    puesto = True
+                    break
+                estado.sacar(mod)
+                estado.conflictos += 1
+            if puesto: break
+            # Sin valores: guardamos lo mejor visto y volvemos atrás
+            if len(estado.modulos) > len(mejor): mejor = list(estado.modulos)
+            pila.pop()
+        if not pila:
+            break  # se agotó el árbol: no existe solución completa
+
+    if not completo:
+        if len(estado.modulos) > len(mejor): mejor = list(estado.modulos)
+        conflictos = estado.conflictos
+        estado = _Estado(datos)
+        estado.conflictos = conflictos
+        for mod in mejor: estado.poner(mod)
+        # Lo que quedó sin lugar se intenta ubicar de forma greedy y luego con reparación
+        for rid, pend in list(estado.pendientes.items()):
+            for slot in iterar_slots(estado.ocupacion.libres(reqs[rid])):
+                if estado.pendientes[rid] <= 0: break
+                estado.poner(modulo_para(reqs[rid], slot))
+        _reparar(estado, datos, reqs, limite, progreso)
+
+    estado.avisar(progreso)
+    return ResultadoGeneracion(
+        modulos=list(estado.modulos),
+        faltantes={rid: p for rid, p in estado.pendientes.items() if p > 0},
+    )
+
+# --- MODO MULTI-ARRANQUE (VARIAS CORRIDAS GREEDY EN PARALELO) ---
+
+def puntaje_secundario(resultado: ResultadoGeneracion) -> int:
+    """Calidad del horario (menor es mejor): horas libres ("huecos") de los profesores
+    entre su primer y último módulo del día + materias con más de 2 horas el mismo día."""
+    por_profe: Dict[str, int] = {}
+    por_req_dia: Dict[tuple, int] = {}
+    for m in resultado.modulos:
+        if m.profesor_id:
+            por_profe[m.profesor_id] = por_profe.get(m.profesor_id, 0) | (1 << m.slot)
+        clave = (m.requisito_id, m.slot // N_HORAS)
+        por_req_dia[clave] = por_req_dia.get(clave, 0) + 1
+
+    amontonadas = sum(n - 2 for n in por_req_dia.values() if n > 2)
+    return sum(huecos(m) for m in por_profe.values()) + amontonadas
+
+def _clave_calidad(resultado: ResultadoGeneracion) -> tuple:
+    return (resultado.horas_faltantes, puntaje_secundario(resultado))
+
+def orden_aleatorio(requisitos: List[Requisito], rng: random.Random) -> List[Requisito]:
+    """Igual que orden_greedy (aula fija primero, más horas primero) pero con ruido,
+    para que cada corrida explore un orden distinto."""
+    return sorted(
+        requisitos,
+        key=lambda r: (1 if r.aula_preferida_id else 0, r.horas_semanales + rng.random() * 3),
+        reverse=True,
+    )
+
+def _corridas_worker(datos: DatosGeneracion, semillas: List[int], tiempo_limite: float) -> tuple:
+    """Se ejecuta en otro proceso: prueba varias semillas y devuelve (clave, resultado) de la mejor."""
+    limite = time.monotonic() + tiempo_limite
+    mejor, mejor_clave = None, None
+    for semilla in semillas:
+        if mejor is not None and time.monotonic() >= limite: break
+        orden = orden_greedy(datos.requisitos) if semilla == 0 else orden_aleatorio(datos.requisitos, random.Random(semilla))
+        resultado = generar_greedy(datos, orden)
+        clave = _clave_calidad(resultado)
+        if mejor_clave is None or clave < mejor_clave:
+            mejor, mejor_clave = resultado, clave
+            if clave == (0, 0): break
+    return mejor_clave, mejor
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    # Se crea una sola vez (un proceso por núcleo) y se reutiliza entre pedidos
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _pool
+
+def _descartar_pool():
+    # Un pool roto (se murió un proceso) no acepta más trabajos: el próximo pedido crea otro
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def generar_multiarranque(
+    datos: DatosGeneracion, tiempo_limite: float = 10.0, reinicios: int = 64, progreso: Optional[Progreso] = None
+) -> ResultadoGeneracion:
+    """Corre `reinicios` greedy con órdenes aleatorios repartidos entre los núcleos y se
+    queda con el de menos horas sin asignar (y, a igualdad, mejor puntaje secundario).
+    La semilla 0 es el orden clásico, así que nunca es peor que el modo greedy."""
+    reinicios = max(1, reinicios)
+    n_workers = min(os.cpu_count() or 1, reinicios)
+    lotes = [list(range(i, reinicios, n_workers)) for i in range(n_workers)]
+
+    pool = _obtener_pool()
+    futuros = [pool.submit(_corridas_worker, datos, lote, tiempo_limite) for lote in lotes]
+    # Margen para arrancar los procesos y devolver resultados
+    limite = time.monotonic() + tiempo_limite + 5
+    pendientes = set(futuros)
+    candidatos = []
+    try:
+        while pendientes and time.monotonic() < limite:
+            hechos, pendientes = wait(pendientes, timeout=min(0.25, max(0, limite - time.monotonic())))
+            for f in hechos:
+                error = f.exception()
+                if error is None:
+                    candidatos.append(f.result())
+                    continue
+                logger.error("Falló un worker del modo multiarranque", exc_info=error)
+                if isinstance(error, BrokenProcessPool): _descartar_pool()
+            if progreso:
+                mejor = min(candidatos, key=lambda c: c[0])[1] if candidatos else ResultadoGeneracion()
+                progreso(len(datos.requisitos) if candidatos else 0, len(mejor.modulos), len(mejor.faltantes))
+    finally:
+        for f in pendientes: f.cancel()
+
+    if not candidatos:
+        logger.warning("Ningún worker del multiarranque devolvió resultado; se usa el greedy en este proceso")
+        return generar_greedy(datos, progreso=progreso)
+    return min(candidatos, key=lambda c: c[0])[1]
+
+MODOS = {
+    "greedy": lambda datos, tiempo_limite, reinicios, progreso=None: generar_greedy(datos, progreso=progreso),
+    "csp": lambda datos, tiempo_limite, reinicios, progreso=None: generar_csp(datos, tiempo_limite, progreso),
+    "multiarranque": generar_multiarranque,
+}
+
+def resumen(datos: DatosGeneracion, resultado: ResultadoGeneracion) -> dict:
+    """Respuesta del generador: mensaje legible para el frontend + conteos estructurados."""
+    reqs = {r.id: r for r in datos.requisitos}
+    faltantes = [
+        {"requisito_id": rid, "materia_id": reqs[rid].materia_id, "curso_id": reqs[rid].curso_id, "horas": horas}
+        for rid, horas in resultado.faltantes.items()
+    ]
+    mensaje = f"¡Proceso finalizado! 🚀\nSe generaron {len(resultado.modulos)} módulos."
+    if faltantes:
+        mensaje += "\n\n⚠️ Conflictos:\n" + "\n".join(
+            f"Materia {f['materia_id']} (Curso {f['curso_id']}): Faltaron asignar {f['horas']} hs." for f in faltantes
+        )
+    return {
+        "mensaje": mensaje,
+        "modulos_generados": len(resultado.modulos),
+        "horas_sin_asignar": resultado.horas_faltantes,
+        "faltantes": faltantes,
+    }
+
+# --- REPARACIÓN INCREMENTAL ---
+# Cuando cambia un solo requisito, profesor o aula no hace falta regenerar todo:
+# se sacan solo los módulos afectados que quedaron inválidos, se vuelven a ubicar,
+# y si no hay lugar se desplaza lo mínimo (un enroque) al resto del horario.
+
+def requisitos_afectados(datos: DatosGeneracion, requisito_id: Optional[str] = None,
+                         profesor_id: Optional[str] = None, aula_id: Optional[str] = None) -> Set[str]:
+    afectados = set()
+    for r in datos.requisitos:
+        if r.id == requisito_id or (profesor_id and r.profesor_id == profesor_id) \
+                or (aula_id and r.aula_preferida_id == aula_id):
+            afectados.add(r.id)
+    return afectados
+
+def reparar_modulos(datos: DatosGeneracion, actuales: List[Modulo], afectados: Set[str],
+                    tiempo_limite: float = 1.0) -> ResultadoGeneracion:
+    """Devuelve el horario reparado. Los módulos de requisitos no afectados se conservan
+    tal cual, salvo que haga falta correrlos para hacerle lugar a uno afectado."""
+    limite = time.monotonic() + tiempo_limite
+    reqs = {r.id: r for r in datos.requisitos}
+    estado = _Estado(datos)
+
+    # 1. Primero fijamos lo que no se toca, después validamos lo afectado contra eso
+    fijos = [m for m in actuales if m.requisito_id not in afectados]
+    revisar = [m for m in actuales if m.requisito_id in afectados]
+    for mod in fijos: estado.poner(mod)
+    for mod in sorted(revisar, key=lambda m: m.slot):
+        req = reqs[mod.requisito_id]
+        sigue_valido = (
+            estado.pendientes.get(req.id, 0) > 0
+            and mod.aula_id == req.aula_preferida_id
+            and mod.profesor_id == req.profesor_id
+            and (estado.ocupacion.libres(req) >> mod.slot) & 1
+        )
+        if sigue_valido: estado.poner(mod)
+
+    # 2. Reubicamos las horas que faltan de los afectados (repartidas por día)
+    for rid in sorted(afectados):
+        req = reqs[rid]
+        while estado.pendientes.get(rid, 0) > 0:
+            candidatos = _candidatos(estado, req)
+            if not candidatos: break
+            estado.poner(modulo_para(req, candidatos[0]))
+
+    # 3. Si todavía falta, enroques con el resto del horario
+    _reparar(estado, datos, reqs, limite, solo=afectados)
+
+    return ResultadoGeneracion(
+        modulos=list(estado.modulos),
+        faltantes={rid: p for rid, p in estado.pendientes.items() if p > 0 and rid in afectados},
+    )
+
+# --- PERSISTENCIA ---
+
+def filas_asignacion(modulos: List[Modulo]) -> List[dict]:
+    filas = []
+    for m in modulos:
+        dia, hora = slot_de(m.slot)
+        filas.append({
+            "id": f"asig-{uuid.uuid4()}", **columnas_slot(dia, hora),
+            "curso_id": m.curso_id, "materia_id": m.materia_id,
+            "profesor_id": m.profesor_id, "aula_id": m.aula_id,
+        })
+    return filas
+
+ClaveRequisito = Tuple[str, str, Optional[str]]  # (curso_id, materia_id, profesor_id)
+
+def clave_de_requisito(r) -> ClaveRequisito:
+    return (r.curso_id, r.materia_id, r.profesor_id)
+
+def cargar_modulos_actuales(db: Session, datos: DatosGeneracion) -> Tuple[Dict[Modulo, str], Dict[str, ClaveRequisito]]:
+    """Lee horarios_generados como módulos. Cada asignación se asocia a un requisito por
+    (curso, materia, profesor); si varios requisitos comparten esa clave (ej: bloques
+    separados) se llena cada uno hasta sus horas_semanales antes de pasar al siguiente.
+    Devuelve {módulo: id} y {id: clave} de las asignaciones sobrantes (sin requisito,
+    de más o duplicadas en el mismo slot)."""
+    por_clave: Dict[ClaveRequisito, List[Requisito]] = {}
+    for r in datos.requisitos:
+        por_clave.setdefault(clave_de_requisito(r), []).append(r)
+
+    modulos: Dict[Modulo, str] = {}
+    sobrantes: Dict[str, ClaveRequisito] = {}
+    usadas: Dict[str, int] = {}
+    ocupados: Set[Tuple[ClaveRequisito, int]] = set()
+    filas = db.query(
+        AsignacionDB.id, AsignacionDB.dia, AsignacionDB.hora_rango,
+        AsignacionDB.curso_id, AsignacionDB.materia_id, AsignacionDB.profesor_id, AsignacionDB.aula_id
+    ).all()
+    # Orden estable (slot, id): el reparto entre requisitos con la misma clave no cambia entre llamadas
+    con_slot = sorted(((slot_index(a.dia, a.hora_rango), a) for a in filas),
+                      key=lambda x: (x[0] is None, x[0] or 0, x[1].id))
+    for slot, a in con_slot:
+        clave = clave_de_requisito(a)
+        req = next((r for r in por_clave.get(clave, ()) if usadas.get(r.id, 0) < r.horas_semanales), None)
+        if req is None or slot is None or (clave, slot) in ocupados:
+            sobrantes[a.id] = clave
+            continue
+        ocupados.add((clave, slot))
+        usadas[req.id] = usadas.get(req.id, 0) + 1
+        modulos[Modulo(slot, req.id, a.curso_id, a.materia_id, a.profesor_id, a.aula_id)] = a.id
+    return modulos, sobrantes
+
+def aplicar_cambios(db: Session, quitar_ids: List[str], agregar: List[Modulo]):
+    """Borra e inserta solo lo que cambió, en una sola transacción."""
+    try:
+        if quitar_ids:
+            db.query(AsignacionDB).filter(AsignacionDB.id.in_(quitar_ids)).delete(synchronize_session=False)
+        filas = filas_asignacion(agregar)
+        if filas:
+            db.execute(insert(AsignacionDB), filas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def reparar_incremental(db: Session, requisito_id: Optional[str] = None, profesor_id: Optional[str] = None,
+                        aula_id: Optional[str] = None, tiempo_limite: float = 1.0,
+                        clave_borrada: Optional[ClaveRequisito] = None) -> dict:
+    """Si `requisito_id` ya no existe (se borró) hace falta `clave_borrada`, la
+    (curso, materia, profesor) que tenía: se quitan solo las asignaciones sobrantes de esa
+    clave. Las sobrantes de otros requisitos no se tocan (ver limpiar_sobrantes)."""
+    datos = cargar_datos(db)
+    actuales, sobrantes = cargar_modulos_actuales(db, datos)
+    afectados = requisitos_afectados(datos, requisito_id, profesor_id, aula_id)
+
+    borrado = requisito_id is not None and requisito_id not in {r.id for r in datos.requisitos}
+    if borrado and clave_borrada is None:
+        raise ValueError("El requisito ya no existe: indicá la clave (curso, materia, profesor) que tenía")
+
+    resultado = reparar_modulos(datos, list(actuales), afectados, tiempo_limite)
+    finales = set(resultado.modulos)
+    quitar = [aid for mod, aid in actuales.items() if mod not in finales]
+    if borrado: quitar += [aid for aid, clave in sobrantes.items() if clave == tuple(clave_borrada)]
+    agregar = [m for m in resultado.modulos if m not in actuales]
+    aplicar_cambios(db, quitar, agregar)
+
+    resumen_dict = resumen(datos, resultado)
+    resumen_dict.update({
+        "mensaje": f"Reparación incremental: {len(quitar)} módulos quitados, {len(agregar)} ubicados.",
+        "requisitos_afectados": len(afectados),
+        "quitados": len(quitar),
+        "agregados": len(agregar),
+    })
+    return resumen_dict
+
+def limpiar_sobrantes(db: Session) -> int:
+    """Borra TODAS las asignaciones sin requisito, de más o duplicadas. Acción explícita."""
+    _, sobrantes = cargar_modulos_actuales(db, cargar_datos(db))
+    aplicar_cambios(db, list(sobrantes), [])
+    return len(sobrantes)
+
+def guardar_resultado(db: Session, resultado: ResultadoGeneracion):
+    """Reemplaza todo horarios_generados por el resultado, en una sola transacción."""
+    try:
+        db.query(AsignacionDB).delete()
+        filas = filas_asignacion(resultado.modulos)
+        if filas:
+            db.execute(insert(AsignacionDB), filas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
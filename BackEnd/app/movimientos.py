@@ -0,0 +1,166 @@
+# BackEnd/app/movimientos.py
+# Movimientos en lote sobre la grilla (varios arrastres/enroques de una vez).
+#
+# Se cargan TODAS las asignaciones (solo id, curso, profe, aula y slot) con una consulta y
+# los movimientos se aplican en orden sobre esa copia en memoria, igual que uno por uno en
+# /api/horarios/mover: si el destino ya tiene un módulo del mismo curso, ese módulo
+# ("inquilino") pasa al origen del que se mueve. Recién con el resultado final se valida
+# cada módulo que cambió de lugar (incluidos los inquilinos):
+#   - disponibilidad del profesor en el slot nuevo
+#   - el profesor, el curso o el aula no pueden quedar dos veces en el mismo slot
+# Si algo falla no se guarda nada y se devuelve el motivo por movimiento; si no, todo se
+# escribe en una sola transacción.
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.database import AsignacionDB, AulaDB, CursoDB, ProfesorDB
+from app.grilla import N_HORAS, mascara_desde_bytes, slot_de, slot_index
+
+class Movimiento(NamedTuple):
+    asignacion_id: str
+    destino: Optional[int] = None           # slot al que se arrastra
+    intercambiar_con: Optional[str] = None  # o enroque explícito con otra asignación
+
+class Modulo(NamedTuple):
+    curso_id: Optional[str]
+    profesor_id: Optional[str]
+    aula_id: Optional[str]
+
+@dataclass
+class Plan:
+    modulos: Dict[str, Modulo]
+    slots: Dict[str, Optional[int]]                  # id -> slot (con los movimientos aplicados)
+    originales: Dict[str, Optional[int]]
+    por_curso: Dict[Tuple[str, int], str]            # (curso, slot) -> id, para encontrar al inquilino
+    responsable: Dict[str, int] = field(default_factory=dict)  # id -> último movimiento que lo movió
+    errores: List[dict] = field(default_factory=list)
+
+    def error(self, indice: int, asignacion_id: str, motivo: str):
+        self.errores.append({"indice": indice, "asignacion_id": asignacion_id, "motivo": motivo})
+
+    def poner(self, asignacion_id: str, slot: Optional[int], indice: int):
+        anterior = self.slots[asignacion_id]
+        curso = self.modulos[asignacion_id].curso_id
+        if anterior is not None and self.por_curso.get((curso, anterior)) == asignacion_id:
+            del self.por_curso[(curso, anterior)]
+        self.slots[asignacion_id] = slot
+        if slot is not None: self.por_curso[(curso, slot)] = asignacion_id
+        self.responsable[asignacion_id] = indice
+
+    def cambiados(self) -> Dict[str, int]:
+        return {a: s for a, s in self.slots.items() if s != self.originales[a] and s is not None}
+
+def cargar_plan(db: Session) -> Plan:
+    modulos, slots, por_curso = {}, {}, {}
+    for f in db.query(AsignacionDB.id, AsignacionDB.curso_id, AsignacionDB.profesor_id,
+                      AsignacionDB.aula_id, AsignacionDB.dia_idx, AsignacionDB.hora_idx).all():
+        modulos[f.id] = Modulo(f.curso_id, f.profesor_id, f.aula_id)
+        slot = f.dia_idx * N_HORAS + f.hora_idx if f.dia_idx is not None and f.hora_idx is not None else None
+        slots[f.id] = slot
+        if slot is not None: por_curso.setdefault((f.curso_id, slot), f.id)
+    return Plan(modulos, slots, dict(slots), por_curso)
+
+# --- SIMULACIÓN ---
+
+def _aplicar(plan: Plan, i: int, mov: Movimiento):
+    aid = mov.asignacion_id
+    if aid not in plan.modulos: return plan.error(i, aid, "Asignación no encontrada")
+    origen = plan.slots[aid]
+
+    if mov.intercambiar_con is not None:
+        otro = mov.intercambiar_con
+        if otro not in plan.modulos: return plan.error(i, otro, "Asignación no encontrada")
+        destino = plan.slots[otro]
+        if origen is None or destino is None: return plan.error(i, aid, "Alguna de las asignaciones no tiene un horario válido")
+        if otro == aid: return
+        plan.poner(aid, None, i)
+        plan.poner(otro, origen, i)
+        plan.poner(aid, destino, i)
+        return
+
+    if mov.destino is None: return plan.error(i, aid, "Día u hora inválidos")
+    inquilino = plan.por_curso.get((plan.modulos[aid].curso_id, mov.destino))
+    if inquilino and inquilino != aid:
+        if origen is None: return plan.error(i, aid, "No tiene un horario válido para enrocar")
+        plan.poner(aid, None, i)
+        plan.poner(inquilino, origen, i)
+    plan.poner(aid, mov.destino, i)
+
+def _validar(db: Session, plan: Plan):
+    cambiados = plan.cambiados()
+    if not cambiados: return
+
+    # Ocupación final de cursos, profes y aulas
+    por_curso, por_profesor, por_aula = defaultdict(list), defaultdict(list), defaultdict(list)
+    for aid, slot in plan.slots.items():
+        if slot is None: continue
+        m = plan.modulos[aid]
+        por_curso[(m.curso_id, slot)].append(aid)
+        if m.profesor_id: por_profesor[(m.profesor_id, slot)].append(aid)
+        if m.aula_id: por_aula[(m.aula_id, slot)].append(aid)
+
+    ids_prof = {plan.modulos[a].profesor_id for a in cambiados} - {None}
+    ids_aula = {plan.modulos[a].aula_id for a in cambiados} - {None}
+    profesores = {p.id: p for p in db.query(ProfesorDB.id, ProfesorDB.nombre, ProfesorDB.disponibilidad_bits)
+                  .filter(ProfesorDB.id.in_(ids_prof)).all()} if ids_prof else {}
+    aulas = dict(db.query(AulaDB.id, AulaDB.nombre).filter(AulaDB.id.in_(ids_aula)).all()) if ids_aula else {}
+    cursos = {c.id: f"{c.anio} {c.division}" for c in db.query(CursoDB.id, CursoDB.anio, CursoDB.division).all()}
+
+    for aid, slot in sorted(cambiados.items(), key=lambda x: plan.responsable[x[0]]):
+        i, m = plan.responsable[aid], plan.modulos[aid]
+        dia, hora = slot_de(slot)
+        if m.profesor_id:
+            p = profesores.get(m.profesor_id)
+            mascara = mascara_desde_bytes(p.disponibilidad_bits) if p else 0
+            nombre = p.nombre if p else m.profesor_id
+            if mascara and not mascara >> slot & 1:
+                plan.error(i, aid, f"El profesor {nombre} NO tiene disponibilidad el {dia} a las {hora}.")
+            otros = [o for o in por_profesor[(m.profesor_id, slot)] if o != aid]
+            if otros:
+                choque = cursos.get(plan.modulos[otros[0]].curso_id, "otro curso")
+                plan.error(i, aid, f"CONFLICTO: El profesor {nombre} ya está asignado en {choque} el {dia} a las {hora}.")
+        if m.aula_id and len(por_aula[(m.aula_id, slot)]) > 1:
+            plan.error(i, aid, f"CONFLICTO: El aula {aulas.get(m.aula_id, m.aula_id)} ya está ocupada el {dia} a las {hora}.")
+        if len(por_curso[(m.curso_id, slot)]) > 1:
+            plan.error(i, aid, f"CONFLICTO: El curso {cursos.get(m.curso_id, '?')} ya tiene clase el {dia} a las {hora}.")
+
+def planificar(db: Session, movimientos: List[Movimiento]) -> Plan:
+    """Simula todos los movimientos en memoria y valida el resultado (no escribe nada)."""
+    plan = cargar_plan(db)
+    for i, mov in enumerate(movimientos):
+        _aplicar(plan, i, mov)
+    if not plan.errores:
+        _validar(db, plan)
+    return plan
+
+# --- ESCRITURA ---
+
+def guardar(db: Session, plan: Plan) -> List[dict]:
+    """Escribe los cambios del plan en una sola transacción."""
+    cambiados = plan.cambiados()
+    if not cambiados: return []
+    filas = []
+    for aid, slot in cambiados.items():
+        dia, hora = slot_de(slot)
+        filas.append({"id": aid, "dia": dia, "hora_rango": hora, "dia_idx": slot // N_HORAS, "hora_idx": slot % N_HORAS})
+    try:
+        # Los índices únicos por slot no admiten dos módulos en el mismo lugar ni por un
+        # instante: primero se sacan todos de la grilla y después se ubican
+        db.execute(update(AsignacionDB).where(AsignacionDB.id.in_(list(cambiados)))
+                   .values(dia_idx=None, hora_idx=None).execution_options(synchronize_session=False))
+        db.execute(update(AsignacionDB), filas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return [{"id": f["id"], "dia": f["dia"], "hora": f["hora_rango"]} for f in filas]
+
+def movimiento_desde(asignacion_id: str, dia: Optional[str], hora: Optional[str],
+                     intercambiar_con: Optional[str]) -> Movimiento:
+    if intercambiar_con: return Movimiento(asignacion_id, intercambiar_con=intercambiar_con)
+    return Movimiento(asignacion_id, destino=slot_index(dia, hora) if dia and hora else None)
@@ -1,5 +1,11 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
@@ -8,19 +14,32 @@ from passlib.context import CryptContext
 SECRET_KEY = "MI_PALABRA_SECRETA_SUPER_SEGURA_CRONOS_2025" 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 Horas
+MAX_TOKENS_EN_CACHE = 4096  # tokens ya validados que se recuerdan (LRU)
 
 # Contexto para hashear contraseñas (usamos bcrypt que es estándar)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # --- FUNCIONES DE CONTRASEÑA ---
+# bcrypt tarda ~250 ms de CPU a propósito. Todo hash/verificación pasa por un pool acotado
+# (bcrypt suelta el GIL, así que corren en paralelo de verdad) para que una ráfaga de logins
+# o altas no ocupe todos los hilos del servidor.
 
-def verificar_password(plain_password, hashed_password):
-    """Compara una contraseña plana con una hasheada."""
-    return pwd_context.verify(plain_password, hashed_password)
+HILOS_BCRYPT = int(os.getenv("HORARIOS_HILOS_BCRYPT", str(os.cpu_count() or 2)))
+_pool_bcrypt = ThreadPoolExecutor(max_workers=HILOS_BCRYPT, thread_name_prefix="bcrypt")
 
-def hashear_password(password):
-    """Convierte una contraseña plana en un hash seguro."""
-    return pwd_context.hash(password)
+def hashear_passwords(passwords: List[str]) -> List[str]:
+    """Varias a la vez (altas masivas), en paralelo dentro del pool."""
+    return list(_pool_bcrypt.map(pwd_context.hash, passwords))
+
+async def verificar_password_async(plain_password, hashed_password) -> bool:
+    """Para endpoints async: espera sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool_bcrypt, pwd_context.verify, plain_password, hashed_password)
+
+async def hashear_password_async(password) -> str:
+    """Para endpoints async: espera sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool_bcrypt, pwd_context.hash, password)
 
 # --- FUNCIONES DE TOKEN (JWT) ---
 
@@ -39,12 +58,32 @@ def crear_token_acceso(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Tokens ya validados: token -> payload. Un token es inmutable, así que solo hay que
+# volver a mirar el vencimiento (exp), no la firma.
+_tokens_validados: "OrderedDict[str, Dict]" = OrderedDict()
+_lock_tokens = threading.Lock()
+
 def verificar_token(token: str) -> Optional[Dict]:
     """
     Decodifica y valida el token. Devuelve los datos (payload) o None si falló.
     """
+    with _lock_tokens:
+        payload = _tokens_validados.get(token)
+        if payload is not None:
+            exp = payload.get("exp")
+            if exp is None or exp > time.time():
+                _tokens_validados.move_to_end(token)
+                return payload
+            del _tokens_validados[token]
+            return None
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+    with _lock_tokens:
+        _tokens_validados[token] = payload
+        if len(_tokens_validados) > MAX_TOKENS_EN_CACHE:
+            _tokens_validados.popitem(last=False)
+    return payload
\ No newline at end of file
@@ -0,0 +1,99 @@
+# BackEnd/app/suplencias.py
+# Índice de disponibilidad para buscar suplentes.
+# Se arma una vez por revisión del horario (ver app.cambios) con dos consultas proyectadas;
+# después "quién está libre el Lunes a las 07:40" es leer un set ya calculado.
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+import app.cambios as cambios
+from app.database import AsignacionDB, CursoDB, MateriaDB, ProfesorDB
+from app.grilla import N_HORAS, N_SLOTS, indice_dia, iterar_slots, mascara_desde_bytes, slot_de
+
+@dataclass
+class IndiceDisponibilidad:
+    revision: str
+    nombres: Dict[str, str]
+    libres: List[Set[str]]         # slot -> profes que declararon ese slot y no dan clase en él
+    carga: Dict[str, int]          # profe -> horas asignadas en la semana
+    dias_presentes: Dict[str, int] # profe -> bit por día en el que ya tiene alguna clase
+
+    def presente(self, profesor_id: str, dia_idx: int) -> bool:
+        return bool(self.dias_presentes.get(profesor_id, 0) >> dia_idx & 1)
+
+    def candidatos(self, slot: int, excluir: Iterable[str] = ()) -> List[dict]:
+        """Libres en el slot, primero los que ya están en la escuela ese día y con menos carga."""
+        dia_idx = slot // N_HORAS
+        ids = self.libres[slot].difference(excluir)
+        orden = sorted(ids, key=lambda pid: (
+            not self.presente(pid, dia_idx), self.carga.get(pid, 0), self.nombres.get(pid, "")
+        ))
+        return [{
+            "id": pid, "nombre": self.nombres.get(pid),
+            "horas_asignadas": self.carga.get(pid, 0),
+            "presente_ese_dia": self.presente(pid, dia_idx),
+        } for pid in orden]
+
+def construir(db: Session, revision: str) -> IndiceDisponibilidad:
+    nombres, disponibles = {}, {}
+    for pid, nombre, bits in db.query(ProfesorDB.id, ProfesorDB.nombre, ProfesorDB.disponibilidad_bits).all():
+        nombres[pid] = nombre
+        disponibles[pid] = mascara_desde_bytes(bits)
+
+    ocupado: Dict[str, int] = {}
+    carga: Dict[str, int] = {}
+    dias: Dict[str, int] = {}
+    for pid, d, h in db.query(AsignacionDB.profesor_id, AsignacionDB.dia_idx, AsignacionDB.hora_idx)\
+                       .filter(AsignacionDB.profesor_id.isnot(None)).all():
+        if d is None or h is None: continue
+        ocupado[pid] = ocupado.get(pid, 0) | 1 << (d * N_HORAS + h)
+        carga[pid] = carga.get(pid, 0) + 1
+        dias[pid] = dias.get(pid, 0) | 1 << d
+
+    libres: List[Set[str]] = [set() for _ in range(N_SLOTS)]
+    for pid, mascara in disponibles.items():
+        for s in iterar_slots(mascara & ~ocupado.get(pid, 0)):
+            libres[s].add(pid)
+    return IndiceDisponibilidad(revision, nombres, libres, carga, dias)
+
+_indice: Optional[IndiceDisponibilidad] = None
+_lock = threading.Lock()
+
+def obtener_indice(db: Session) -> IndiceDisponibilidad:
+    """El índice vigente; se rearma solo si cambió la revisión (profes o asignaciones)."""
+    global _indice
+    revision = cambios.revision_actual(db)
+    actual = _indice
+    if actual is not None and actual.revision == revision: return actual
+    with _lock:
+        if _indice is None or _indice.revision != revision:
+            _indice = construir(db, revision)
+        return _indice
+
+def suplentes_del_dia(db: Session, dia: str, ausentes: List[str]) -> List[dict]:
+    """Para cada clase de los profes ausentes ese día, los candidatos ordenados."""
+    d = indice_dia(dia)
+    indice = obtener_indice(db)
+    clases = db.query(
+        AsignacionDB.id, AsignacionDB.profesor_id, AsignacionDB.hora_idx,
+        CursoDB.anio, CursoDB.division, MateriaDB.nombre
+    ).outerjoin(CursoDB, CursoDB.id == AsignacionDB.curso_id)\
+     .outerjoin(MateriaDB, MateriaDB.id == AsignacionDB.materia_id)\
+     .filter(AsignacionDB.profesor_id.in_(ausentes), AsignacionDB.dia_idx == d)\
+     .order_by(AsignacionDB.hora_idx).all()
+
+    resultado = []
+    for c in clases:
+        slot = d * N_HORAS + c.hora_idx
+        resultado.append({
+            "asignacion_id": c.id, "profesor_id": c.profesor_id,
+            "profesor_nombre": indice.nombres.get(c.profesor_id),
+            "dia": dia, "hora": slot_de(slot)[1],
+            "curso": f"{c.anio} {c.division}" if c.anio is not None else "?",
+            "materia": c.nombre or "?",
+            "suplentes": indice.candidatos(slot, excluir=ausentes),
+        })
+    return resultado
@@ -0,0 +1,135 @@
+# BackEnd/app/trabajos.py
+# Trabajos en segundo plano para la generación de horarios.
+# El pedido HTTP solo encola el trabajo y devuelve su id; la generación corre en un
+# pool de hilos y el horario viejo se reemplaza (en una sola transacción) recién al terminar bien.
+#
+# Los trabajos viven en la memoria del proceso: solo funcionan con UN worker (uvicorn sin
+# --workers / gunicorn -w 1). Con varios, el GET/DELETE /api/jobs/{id} puede caer en un
+# worker que no conoce el trabajo, y reemplazo_horario no ordena a los de otros procesos.
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import app.motor as motor
+import app.versiones as versiones
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+MAX_TRABAJOS_SIMULTANEOS = 2
+MAX_TRABAJOS_GUARDADOS = 50  # los terminados más viejos se descartan
+
+@dataclass
+class Trabajo:
+    id: str
+    modo: str
+    tiempo_limite: float
+    reinicios: int
+    estado: str = "pendiente"  # pendiente | ejecutando | completado | error | cancelado
+    creado: float = field(default_factory=time.time)
+    finalizado: Optional[float] = None
+    requisitos_totales: int = 0
+    requisitos_procesados: int = 0
+    horas_ubicadas: int = 0
+    conflictos: int = 0
+    resultado: Optional[dict] = None
+    error: Optional[str] = None
+    cancelacion: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in ("completado", "error", "cancelado")
+
+    def a_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "modo": self.modo,
+            "estado": self.estado,
+            "progreso": {
+                "requisitos_procesados": self.requisitos_procesados,
+                "requisitos_totales": self.requisitos_totales,
+                "horas_ubicadas": self.horas_ubicadas,
+                "conflictos": self.conflictos,
+            },
+            "creado": self.creado,
+            "finalizado": self.finalizado,
+            "resultado": self.resultado,
+            "error": self.error,
+        }
+
+_trabajos: Dict[str, Trabajo] = {}
+_lock = threading.Lock()
+# Respaldo + reemplazo de horarios_generados de a uno: lo comparten los trabajos y los
+# endpoints que reemplazan o reparan el horario (generar, restaurar, borrar, reparar)
+reemplazo_horario = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=MAX_TRABAJOS_SIMULTANEOS, thread_name_prefix="generador")
+
+def enviar(modo: str, tiempo_limite: float, reinicios: int) -> Trabajo:
+    trabajo = Trabajo(id=f"job-{uuid.uuid4()}", modo=modo, tiempo_limite=tiempo_limite, reinicios=reinicios)
+    with _lock:
+        _purgar()
+        _trabajos[trabajo.id] = trabajo
+    _pool.submit(_ejecutar, trabajo)
+    return trabajo
+
+def obtener(job_id: str) -> Optional[Trabajo]:
+    with _lock:
+        return _trabajos.get(job_id)
+
+def cancelar(job_id: str) -> Optional[Trabajo]:
+    trabajo = obtener(job_id)
+    if trabajo and not trabajo.terminado:
+        trabajo.cancelacion.set()
+        if trabajo.estado == "pendiente":
+            _finalizar(trabajo, "cancelado")
+    return trabajo
+
+def _purgar():
+    terminados = sorted((t for t in _trabajos.values() if t.terminado), key=lambda t: t.creado)
+    for t in terminados[:max(0, len(_trabajos) - MAX_TRABAJOS_GUARDADOS + 1)]:
+        del _trabajos[t.id]
+
+def _finalizar(trabajo: Trabajo, estado: str):
+    trabajo.estado = estado
+    trabajo.finalizado = time.time()
+
+def _ejecutar(trabajo: Trabajo):
+    if trabajo.cancelacion.is_set():
+        if not trabajo.terminado: _finalizar(trabajo, "cancelado")
+        return
+    trabajo.estado = "ejecutando"
+
+    def progreso(procesados: int, horas: int, conflictos: int):
+        if trabajo.cancelacion.is_set():
+            raise motor.GeneracionCancelada()
+        trabajo.requisitos_procesados = procesados
+        trabajo.horas_ubicadas = horas
+        trabajo.conflictos = conflictos
+
+    db = SessionLocal()
+    try:
+        datos = motor.cargar_datos(db)
+        trabajo.requisitos_totales = len(datos.requisitos)
+
+        resultado = motor.MODOS[trabajo.modo](datos, trabajo.tiempo_limite, trabajo.reinicios, progreso)
+        progreso(len(datos.requisitos), len(resultado.modulos), len(resultado.faltantes))
+
+        # Recién acá se toca horarios_generados: respaldo + borrar + insertar en una sola transacción
+        with reemplazo_horario:
+            versiones.guardar_version(db, f"Respaldo antes de generar ({trabajo.modo})", "historico", solo_si_cambio=True)
+            motor.guardar_resultado(db, resultado)
+        trabajo.resultado = motor.resumen(datos, resultado)
+        _finalizar(trabajo, "completado")
+    except motor.GeneracionCancelada:
+        _finalizar(trabajo, "cancelado")
+    except Exception as e:
+        logger.exception("Falló el trabajo de generación %s", trabajo.id)
+        trabajo.error = str(e)
+        _finalizar(trabajo, "error")
+    finally:
+        db.close()
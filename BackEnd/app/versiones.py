@@ -0,0 +1,185 @@
+# BackEnd/app/versiones.py
+# Versiones guardadas del horario (borrador / publicado / histórico).
+# Cada versión guarda solo las diferencias con la anterior (copy-on-write);
+# cada tanto se guarda una copia completa para que reconstruir no sea una cadena eterna.
+
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import app.configuracion as configuracion
+from app.database import AsignacionDB, ModuloVersionDB, VersionHorarioDB, columnas_slot
+from app.grilla import slot_index
+
+ESTADOS = ("borrador", "publicado", "historico")
+MAX_PROFUNDIDAD = 20  # a partir de acá se guarda una copia completa
+
+# (dia, hora_rango, curso_id, materia_id, profesor_id, aula_id)
+ClaveModulo = Tuple[str, str, str, str, Optional[str], Optional[str]]
+
+class VersionNoEncontrada(Exception):
+    pass
+
+# --- LECTURA ---
+
+def modulos_actuales(db: Session) -> Set[ClaveModulo]:
+    return set(db.query(
+        AsignacionDB.dia, AsignacionDB.hora_rango, AsignacionDB.curso_id,
+        AsignacionDB.materia_id, AsignacionDB.profesor_id, AsignacionDB.aula_id
+    ).all())
+
+def _cadena(db: Session, version_id: str) -> List[VersionHorarioDB]:
+    """La versión y sus bases, desde la copia completa hasta ella."""
+    cadena = []
+    actual = db.query(VersionHorarioDB).filter(VersionHorarioDB.id == version_id).first()
+    if not actual: raise VersionNoEncontrada(version_id)
+    while actual:
+        cadena.append(actual)
+        actual = db.query(VersionHorarioDB).filter(VersionHorarioDB.id == actual.base_id).first() if actual.base_id else None
+    return list(reversed(cadena))
+
+def modulos_de_version(db: Session, version_id: str) -> Set[ClaveModulo]:
+    cadena = _cadena(db, version_id)
+    ids = [v.id for v in cadena]
+    filas = db.query(
+        ModuloVersionDB.version_id, ModuloVersionDB.accion,
+        ModuloVersionDB.dia, ModuloVersionDB.hora_rango, ModuloVersionDB.curso_id,
+        ModuloVersionDB.materia_id, ModuloVersionDB.profesor_id, ModuloVersionDB.aula_id
+    ).filter(ModuloVersionDB.version_id.in_(ids)).all()
+
+    por_version: Dict[str, List] = {}
+    for f in filas:
+        por_version.setdefault(f.version_id, []).append(f)
+
+    modulos: Set[ClaveModulo] = set()
+    for vid in ids:  # aplicamos los deltas en orden
+        for f in por_version.get(vid, []):
+            clave = tuple(f[2:])
+            if f.accion == "+": modulos.add(clave)
+            else: modulos.discard(clave)
+    return modulos
+
+def modulos_de(db: Session, ref: str) -> Set[ClaveModulo]:
+    """`ref` es el id de una versión o 'actual' (lo que está en horarios_generados)."""
+    if ref == "actual": return modulos_actuales(db)
+    return modulos_de_version(db, ref)
+
+def ultima_version(db: Session) -> Optional[VersionHorarioDB]:
+    return db.query(VersionHorarioDB).order_by(VersionHorarioDB.creado.desc()).first()
+
+def version_a_dict(v: VersionHorarioDB) -> dict:
+    return {
+        "id": v.id, "nombre": v.nombre, "estado": v.estado,
+        "creado": v.creado.isoformat() if v.creado else None,
+        "cantidad_modulos": v.cantidad_modulos, "base_id": v.base_id,
+    }
+
+# --- ESCRITURA ---
+
+def guardar_version(db: Session, nombre: str, estado: str = "borrador",
+                    solo_si_cambio: bool = False) -> Optional[VersionHorarioDB]:
+    """Guarda el horario actual como una versión nueva (delta contra la última versión).
+    Con solo_si_cambio=True no crea nada si es idéntico a la última (para respaldos automáticos).
+    Solo hace flush: el commit lo hace el llamador, así el respaldo y el reemplazo que le sigue
+    van en la misma transacción."""
+    actuales = modulos_actuales(db)
+    base = ultima_version(db)
+
+    if base and (base.profundidad or 0) < MAX_PROFUNDIDAD:
+        previos = modulos_de_version(db, base.id)
+        agregados, quitados = actuales - previos, previos - actuales
+        if solo_si_cambio and not agregados and not quitados: return None
+        base_id, profundidad = base.id, (base.profundidad or 0) + 1
+    else:
+        if solo_si_cambio and base and modulos_de_version(db, base.id) == actuales: return None
+        if solo_si_cambio and not base and not actuales: return None
+        agregados, quitados = actuales, set()
+        base_id, profundidad = None, 0
+
+    version = VersionHorarioDB(
+        id=f"ver-{uuid.uuid4()}", nombre=nombre, estado=estado,
+        cantidad_modulos=len(actuales), base_id=base_id, profundidad=profundidad,
+    )
+    db.add(version)
+    db.flush()
+    filas = [_fila(version.id, "+", m) for m in agregados] + [_fila(version.id, "-", m) for m in quitados]
+    if filas:
+        db.execute(insert(ModuloVersionDB), filas)
+    if estado == "publicado":
+        _marcar_publicada(db, version)
+    db.flush()
+    return version
+
+def _fila(version_id: str, accion: str, m: ClaveModulo) -> dict:
+    dia, hora, curso_id, materia_id, profesor_id, aula_id = m
+    return {
+        "version_id": version_id, "accion": accion, "dia": dia, "hora_rango": hora,
+        "curso_id": curso_id, "materia_id": materia_id, "profesor_id": profesor_id, "aula_id": aula_id,
+    }
+
+def _marcar_publicada(db: Session, version: VersionHorarioDB):
+    # Solo hay una publicada: la anterior pasa a histórico
+    db.query(VersionHorarioDB).filter(
+        VersionHorarioDB.estado == "publicado", VersionHorarioDB.id != version.id
+    ).update({"estado": "historico"}, synchronize_session=False)
+    version.estado = "publicado"
+    configuracion.escribir(db, horarios_publicados=True)
+
+def restaurar_version(db: Session, version_id: str, publicar: bool = False) -> VersionHorarioDB:
+    """Reemplaza horarios_generados por el contenido de la versión, en una sola transacción."""
+    modulos = modulos_de_version(db, version_id)
+    version = db.query(VersionHorarioDB).filter(VersionHorarioDB.id == version_id).first()
+    try:
+        db.query(AsignacionDB).delete()
+        filas = [
+            {"id": f"asig-{uuid.uuid4()}", **columnas_slot(dia, hora), "curso_id": c,
+             "materia_id": m, "profesor_id": p, "aula_id": a}
+            for dia, hora, c, m, p, a in modulos
+        ]
+        if filas:
+            db.execute(insert(AsignacionDB), filas)
+        if publicar:
+            _marcar_publicada(db, version)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return version
+
+# --- DIFF ---
+
+def _orden(m: ClaveModulo):
+    return slot_index(m[0], m[1]) or 0, tuple(x or "" for x in m)
+
+def diferencias(desde: Set[ClaveModulo], hasta: Set[ClaveModulo]) -> dict:
+    """Solo lo que cambió. Un módulo quitado y otro agregado del mismo curso, materia
+    y profesor se informan como un movimiento."""
+    quitados = sorted(desde - hasta, key=_orden)
+    agregados = sorted(hasta - desde, key=_orden)
+
+    libres: Dict[tuple, List[ClaveModulo]] = {}
+    for m in agregados:
+        libres.setdefault((m[2], m[3], m[4]), []).append(m)
+
+    movidos, solo_quitados = [], []
+    for m in quitados:
+        destino = libres.get((m[2], m[3], m[4]))
+        if destino:
+            d = destino.pop(0)
+            movidos.append({
+                "curso_id": m[2], "materia_id": m[3], "profesor_id": m[4],
+                "desde": {"dia": m[0], "hora": m[1], "aula_id": m[5]},
+                "hacia": {"dia": d[0], "hora": d[1], "aula_id": d[5]},
+            })
+        else:
+            solo_quitados.append(_a_dict(m))
+    solo_agregados = [_a_dict(m) for lista in libres.values() for m in lista]
+
+    return {"movidos": movidos, "agregados": solo_agregados, "quitados": solo_quitados}
+
+def _a_dict(m: ClaveModulo) -> dict:
+    dia, hora, curso_id, materia_id, profesor_id, aula_id = m
+    return {"dia": dia, "hora": hora, "curso_id": curso_id, "materia_id": materia_id,
+            "profesor_id": profesor_id, "aula_id": aula_id}
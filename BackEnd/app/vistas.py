@@ -0,0 +1,84 @@
+# BackEnd/app/vistas.py
+# Grillas de horario para pantalla (por curso y por profesor).
+# Cada grilla sale de UNA consulta proyectada (solo las columnas que se muestran, con los
+# nombres ya resueltos por JOIN), sin cargar objetos ORM ni relaciones fila por fila.
+#
+# Las filas de TODOS los profesores se arman juntas y quedan en memoria hasta que cambia
+# el horario (revisión de app.cambios): a primera hora todos los profes piden la suya.
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import app.cambios as cambios
+from app.database import AsignacionDB, AulaDB, CursoDB, MateriaDB, ProfesorDB
+
+COLOR_POR_DEFECTO = "#0d9488"
+
+def _consulta(db: Session):
+    return db.query(
+        AsignacionDB.id, AsignacionDB.dia, AsignacionDB.hora_rango, AsignacionDB.profesor_id,
+        MateriaDB.nombre.label("materia"), MateriaDB.color_hex.label("color"),
+        CursoDB.anio.label("anio"), CursoDB.division.label("division"),
+        ProfesorDB.nombre.label("profesor"), AulaDB.nombre.label("aula"),
+    ).outerjoin(MateriaDB, MateriaDB.id == AsignacionDB.materia_id)\
+     .outerjoin(CursoDB, CursoDB.id == AsignacionDB.curso_id)\
+     .outerjoin(ProfesorDB, ProfesorDB.id == AsignacionDB.profesor_id)\
+     .outerjoin(AulaDB, AulaDB.id == AsignacionDB.aula_id)
+
+def grilla_curso(db: Session, curso_id: str) -> dict:
+    vista = {}
+    for f in _consulta(db).filter(AsignacionDB.curso_id == curso_id).all():
+        vista.setdefault(f.hora_rango, {})[f.dia] = {
+            "text": f"{f.materia or '??'}",
+            "profesor_nombre": f.profesor or "Sin Profe",
+            "materia_nombre": f.materia or "??",
+            "color_materia": f.color or COLOR_POR_DEFECTO,
+            "id": f.id, "aula_nombre": f.aula or "Sin Aula"
+        }
+    return vista
+
+# --- PROFESORES (cacheado por revisión) ---
+
+# Se reemplaza entera (una tupla) así nunca se ve a medio armar. Sin lock a propósito:
+# también corre desde endpoints async (AsyncSession.run_sync) y un lock tomado durante la
+# consulta trabaría el event loop. En el peor caso dos pedidos la arman a la vez.
+_cache_profesores: Tuple[Optional[str], Dict[str, List]] = (None, {})
+
+def _filas_profesor(db: Session, profesor_id: str) -> List:
+    global _cache_profesores
+    revision = cambios.revision_actual(db)
+    vigente, filas = _cache_profesores
+    if vigente != revision:
+        filas = {}
+        for f in _consulta(db).filter(AsignacionDB.profesor_id.isnot(None)).all():
+            filas.setdefault(f.profesor_id, []).append(f)
+        _cache_profesores = (revision, filas)
+    return filas.get(profesor_id, [])
+
+def grilla_profesor(db: Session, profesor_id: str) -> dict:
+    """La grilla que ve el propio profesor (/api/horarios/profesor/me)."""
+    grilla = {}
+    for f in _filas_profesor(db, profesor_id):
+        grilla.setdefault(f.hora_rango, {})[f.dia] = {
+            "materia": f.materia or "??",
+            "curso": f"{f.anio} \"{f.division}\"" if f.anio is not None else "?",
+            "aula": f.aula or "Sin Aula",
+            "color": f.color or COLOR_POR_DEFECTO
+        }
+    return grilla
+
+def grilla_profesor_admin(db: Session, profesor_id: str) -> dict:
+    """Estructura: grilla[hora][dia] = "Materia (Curso) [Aula]"."""
+    grilla = {}
+    for f in _filas_profesor(db, profesor_id):
+        texto_curso = f"{f.anio} {f.division}" if f.anio is not None else "?"
+        texto_materia = f.materia or "?"
+        texto_aula = f" [{f.aula}]" if f.aula else ""
+        grilla.setdefault(f.hora_rango, {})[f.dia] = {
+            "texto": f"{texto_materia}\n({texto_curso}){texto_aula}",
+            "materia": texto_materia,
+            "curso": texto_curso,
+            "aula": f.aula or "-"
+        }
+    return grilla
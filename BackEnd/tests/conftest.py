@@ -0,0 +1,54 @@
+# BackEnd/tests/conftest.py
+# Base SQLite en memoria con el esquema completo (índices únicos por slot incluidos).
+
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.configuracion as configuracion
+from app.database import AulaDB, Base, CursoDB, MateriaDB, ProfesorDB, RequisitoDB, crear_engine
+from app.grilla import DIAS_SEMANA, HORARIOS_ORDENADOS
+
+@pytest.fixture
+def engine():
+    # La configuración en memoria es del proceso: que no pase de una base a otra
+    configuracion._estado = (None, None, 0.0)
+    engine = crear_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    try: yield engine
+    finally: engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    sesion = sessionmaker(bind=engine)()
+    try: yield sesion
+    finally: sesion.close()
+
+@pytest.fixture
+def escuela(db):
+    """3 cursos, 3 profesores compartidos y 2 aulas: suficiente para que haya choques posibles.
+    p2 solo puede los lunes y martes a la mañana."""
+    db.add_all([CursoDB(id=f"c{i}", anio=f"{i}°", division="A") for i in range(1, 4)])
+    db.add_all([MateriaDB(id=f"m{i}", nombre=f"Materia {i}") for i in range(1, 5)])
+    db.add_all([AulaDB(id="a1", nombre="Aula 1"), AulaDB(id="a2", nombre="Laboratorio")])
+    mananas = [f"{d}-{h}" for d in DIAS_SEMANA[:2] for h in HORARIOS_ORDENADOS[:6]]
+    db.add_all([
+        ProfesorDB(id="p1", nombre="Ana", disponibilidad_json="[]"),
+        ProfesorDB(id="p2", nombre="Beto", disponibilidad_json=json.dumps(mananas)),
+        ProfesorDB(id="p3", nombre="Caro", disponibilidad_json="[]"),
+    ])
+    reqs = []
+    for c in ("c1", "c2", "c3"):
+        reqs += [
+            RequisitoDB(id=f"{c}-m1", curso_id=c, materia_id="m1", profesor_id="p1", aula_preferida_id="a1", horas_semanales=5),
+            RequisitoDB(id=f"{c}-m2", curso_id=c, materia_id="m2", profesor_id="p2", aula_preferida_id=None, horas_semanales=3),
+            RequisitoDB(id=f"{c}-m3", curso_id=c, materia_id="m3", profesor_id="p3", aula_preferida_id="a2", horas_semanales=4),
+            RequisitoDB(id=f"{c}-m4", curso_id=c, materia_id="m4", profesor_id=None, aula_preferida_id=None, horas_semanales=2),
+        ]
+    db.add_all(reqs)
+    db.commit()
+    return db
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: necesita HORARIOS_TEST_PG_URL (ver tests/test_postgres.py)")
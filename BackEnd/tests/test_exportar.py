@@ -0,0 +1,19 @@
+# BackEnd/tests/test_exportar.py
+# Nombres de hoja de Excel armados desde nombres libres (profesores, aulas).
+
+import openpyxl
+
+import app.exportar as exportar
+
+def test_nombres_con_caracteres_invalidos_se_pueden_exportar():
+    archivo = exportar.escribir_excel([("Prof. A/B", {}), ("Aula [1]: *?\\", {})])
+    libro = openpyxl.load_workbook(archivo)
+    assert libro.sheetnames == ["Prof. A-B", "Aula -1-- ---"]
+
+def test_nombres_repetidos_o_largos_no_chocan():
+    largo = "Profesora " + "x" * 40
+    usados = set()
+    titulos = [exportar.titulo_de_hoja(t, usados) for t in (largo, largo + "otra", "Ana", "ANA", "")]
+    assert all(len(t) <= exportar.MAX_TITULO_HOJA for t in titulos)
+    assert len({t.lower() for t in titulos}) == len(titulos)
+    assert titulos[1].endswith(" (2)") and titulos[3] == "ANA (2)" and titulos[4] == "Hoja"
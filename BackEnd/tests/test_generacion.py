@@ -0,0 +1,79 @@
+# BackEnd/tests/test_generacion.py
+# Invariantes de los horarios generados: nadie en dos lugares a la vez, disponibilidad y
+# almuerzo respetados, y que se puedan guardar (índices únicos por slot).
+
+from collections import Counter
+from concurrent.futures import Future
+
+from sqlalchemy import func
+
+import app.configuracion as configuracion
+import app.motor as motor
+from app.database import AsignacionDB
+from app.grilla import mascara_de_horas
+
+def verificar(db, resultado: motor.ResultadoGeneracion, datos: motor.DatosGeneracion):
+    modulos = resultado.modulos
+    for campo in ("curso_id", "profesor_id", "aula_id"):
+        ocupados = Counter((getattr(m, campo), m.slot) for m in modulos if getattr(m, campo))
+        assert not [k for k, n in ocupados.items() if n > 1], f"{campo} en dos lugares a la vez"
+    for m in modulos:
+        assert datos.disponibilidad_de(m.profesor_id) >> m.slot & 1, "fuera de la disponibilidad"
+        assert not datos.mascara_almuerzo >> m.slot & 1, "en horario de almuerzo"
+    # Lo ubicado + lo que faltó = lo pedido
+    por_req = Counter(m.requisito_id for m in modulos)
+    for r in datos.requisitos:
+        assert por_req[r.id] + resultado.faltantes.get(r.id, 0) == r.horas_semanales
+
+    motor.guardar_resultado(db, resultado)
+    for columna in (AsignacionDB.curso_id, AsignacionDB.profesor_id, AsignacionDB.aula_id):
+        repetidos = db.query(columna, AsignacionDB.dia_idx, AsignacionDB.hora_idx).filter(columna.isnot(None)) \
+            .group_by(columna, AsignacionDB.dia_idx, AsignacionDB.hora_idx).having(func.count() > 1).all()
+        assert repetidos == []
+    assert db.query(AsignacionDB).count() == len(modulos)
+
+def _datos(db):
+    configuracion.escribir(db, almuerzo_slots=("12:20",))
+    db.commit()
+    datos = motor.cargar_datos(db)
+    assert datos.mascara_almuerzo == mascara_de_horas(["12:20"])
+    return datos
+
+def test_greedy_sin_choques(escuela):
+    datos = _datos(escuela)
+    resultado = motor.generar_greedy(datos)
+    verificar(escuela, resultado, datos)
+    assert resultado.horas_faltantes == 0
+
+def test_csp_sin_choques(escuela):
+    datos = _datos(escuela)
+    resultado = motor.generar_csp(datos, tiempo_limite=2.0)
+    verificar(escuela, resultado, datos)
+    assert resultado.horas_faltantes == 0
+
+def test_csp_con_mas_horas_que_disponibilidad(escuela):
+    # p2 puede 12 horas por semana y le piden 3 cursos x 6 = 18: faltan 6, sin choques
+    datos = _datos(escuela)
+    datos.requisitos = [r._replace(horas_semanales=6) if r.profesor_id == "p2" else r for r in datos.requisitos]
+    resultado = motor.generar_csp(datos, tiempo_limite=1.0)
+    verificar(escuela, resultado, datos)
+    assert sum(h for rid, h in resultado.faltantes.items() if rid.endswith("-m2")) == 6
+
+def test_multiarranque_sin_choques_y_no_peor_que_greedy(escuela):
+    datos = _datos(escuela)
+    resultado = motor.generar_multiarranque(datos, tiempo_limite=2.0, reinicios=4)
+    verificar(escuela, resultado, datos)
+    assert resultado.horas_faltantes <= motor.generar_greedy(datos).horas_faltantes
+
+def test_multiarranque_sin_workers_usa_greedy(escuela, monkeypatch, caplog):
+    # Si todos los workers fallan se avisa y se genera igual en este proceso
+    class PoolRoto:
+        def submit(self, *args):
+            futuro = Future()
+            futuro.set_exception(RuntimeError("worker roto"))
+            return futuro
+    monkeypatch.setattr(motor, "_obtener_pool", lambda: PoolRoto())
+    datos = _datos(escuela)
+    resultado = motor.generar_multiarranque(datos, tiempo_limite=1.0, reinicios=2)
+    verificar(escuela, resultado, datos)
+    assert "worker roto" in caplog.text and "se usa el greedy" in caplog.text
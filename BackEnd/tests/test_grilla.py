@@ -0,0 +1,33 @@
+# BackEnd/tests/test_grilla.py
+# Conversiones de slots y máscaras de bits de la semana.
+
+from app.grilla import (
+    MASCARA_SEMANA, N_HORAS, N_SLOTS, claves_desde_mascara, clave_de, huecos, iterar_slots, mascara_a_bytes,
+    mascara_de_horas, mascara_del_dia, mascara_desde_bytes, mascara_desde_claves, slot_de, slot_desde_clave, slot_index,
+)
+
+def test_slot_ida_y_vuelta():
+    assert N_SLOTS == 115
+    for slot in range(N_SLOTS):
+        assert slot_index(*slot_de(slot)) == slot
+        assert slot_desde_clave(clave_de(slot)) == slot
+    assert slot_index("Martes", "08:20 a 09:00") == N_HORAS + 1
+    assert slot_index("Sábado", "08:20") is None and slot_index("Lunes", "06:00") is None
+
+def test_mascaras():
+    claves = ["Lunes-07:40", "Viernes-22:20", "Domingo-07:40"]
+    m = mascara_desde_claves(claves)
+    assert list(iterar_slots(m)) == [0, N_SLOTS - 1]
+    assert claves_desde_mascara(m) == claves[:2]
+    assert mascara_desde_bytes(mascara_a_bytes(MASCARA_SEMANA)) == MASCARA_SEMANA
+    assert mascara_desde_bytes(None) == 0
+    almuerzo = mascara_de_horas(["12:20", "99:99"])
+    assert almuerzo.bit_count() == 5 and all(mascara_del_dia(almuerzo, d) == 1 << 7 for d in range(5))
+
+def test_huecos():
+    assert huecos(0) == 0
+    assert huecos(0b111) == 0                  # tres horas seguidas
+    assert huecos(0b10001) == 3                # primera y quinta hora del lunes
+    martes = 0b101 << N_HORAS                  # un hueco el martes
+    assert huecos(0b1001 | martes) == 2 + 1    # se suma por día, sin contar de un día al otro
+    assert huecos(1 | 1 << (N_HORAS * 2)) == 0 # un módulo por día no deja huecos
@@ -0,0 +1,23 @@
+# BackEnd/tests/test_importar.py
+# Validación de columnas numéricas al importar catálogos.
+
+import pytest
+
+import app.importar as importar
+from app.database import AulaDB
+
+def _importar_aulas(db, capacidades):
+    filas = [(i + 2, {"nombre": f"Aula {i}", "capacidad": c}) for i, c in enumerate(capacidades)]
+    return importar.importar(db, [("aulas", iter(filas))])
+
+def test_enteros_validos(db):
+    resultado = _importar_aulas(db, ["25", "30.0", " 12 ", ""])
+    assert resultado["errores"] == []
+    assert sorted(c for (c,) in db.query(AulaDB.capacidad)) == [12, 25, 30, 30]  # vacío = 30 por defecto
+
+@pytest.mark.parametrize("valor", ["2.7", "1e3", "inf", "nan", "-3", "tres"])
+def test_no_enteros_son_error_de_fila(db, valor):
+    resultado = _importar_aulas(db, ["20", valor])
+    assert resultado["creados"] == {} and db.query(AulaDB).count() == 0
+    assert [(e["fila"], e["hoja"]) for e in resultado["errores"]] == [(3, "aulas")]
+    assert "capacidad" in resultado["errores"][0]["error"]
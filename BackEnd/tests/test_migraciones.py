@@ -0,0 +1,53 @@
+# BackEnd/tests/test_migraciones.py
+# Migraciones sobre bases con y sin choques ya cargados en horarios_generados.
+
+from sqlalchemy import inspect, text
+
+import app.migraciones as migraciones
+
+UNICOS = {"ux_asignacion_curso_slot", "ux_asignacion_profesor_slot", "ux_asignacion_aula_slot"}
+
+def _indices(engine) -> set:
+    with engine.connect() as conn:
+        return {i["name"] for i in inspect(conn).get_indexes("horarios_generados")}
+
+def _asignacion(conn, aid: str, curso: str, profe: str):
+    conn.execute(text(
+        "INSERT INTO horarios_generados (id, dia, hora_rango, dia_idx, hora_idx, curso_id, materia_id, profesor_id) "
+        "VALUES (:id, 'Lunes', '07:40', 0, 0, :curso, 'm1', :profe)"
+    ), {"id": aid, "curso": curso, "profe": profe})
+
+def _base_con_choque(engine):
+    # Una base vieja: sin el índice único de cursos y con un curso dos veces en el mismo slot
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ux_asignacion_curso_slot"))
+        _asignacion(conn, "a1", "c1", "p1")
+        _asignacion(conn, "a2", "c1", "p2")
+
+def test_base_limpia_queda_con_indices_unicos(engine):
+    migraciones.aplicar_migraciones(engine)
+    assert migraciones.version_actual(engine) == migraciones.MIGRACIONES[-1].version
+    indices = _indices(engine)
+    assert UNICOS <= indices and not any(i.startswith("ix_asignacion") for i in indices)
+    assert migraciones.indices_de_respaldo(engine) == []
+
+def test_choques_dejan_indice_no_unico_y_se_informan(engine, caplog):
+    _base_con_choque(engine)
+    migraciones.aplicar_migraciones(engine)
+
+    indices = _indices(engine)
+    assert "ix_asignacion_curso_slot" in indices and "ux_asignacion_curso_slot" not in indices
+    assert {"ux_asignacion_profesor_slot", "ux_asignacion_aula_slot"} <= indices
+    assert migraciones.version_actual(engine) == migraciones.MIGRACIONES[-1].version
+    assert "'ids': ['a1', 'a2']" in caplog.text
+    assert migraciones.indices_de_respaldo(engine) == ["ux_asignacion_curso_slot"]  # lo que lee el arranque
+
+def test_reintento_despues_de_limpiar(engine):
+    _base_con_choque(engine)
+    migraciones.aplicar_migraciones(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM horarios_generados WHERE id = 'a2'"))
+        assert migraciones.crear_indices_unicos(conn) == []
+    indices = _indices(engine)
+    assert UNICOS <= indices and "ix_asignacion_curso_slot" not in indices
+    assert migraciones.indices_de_respaldo(engine) == []
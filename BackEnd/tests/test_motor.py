@@ -0,0 +1,55 @@
+# BackEnd/tests/test_motor.py
+# Reparto de las asignaciones guardadas entre requisitos con la misma clave.
+# Correr desde BackEnd/:  python -m pytest -q
+
+import pytest
+
+import app.motor as motor
+from app.database import AsignacionDB
+from app.grilla import N_HORAS, slot_de
+
+CURSO, MATERIA, PROFE = "c1", "m1", "p1"
+
+def _asignacion(db, aid: str, slot: int, curso=CURSO, materia=MATERIA, profe=PROFE):
+    dia, hora = slot_de(slot)
+    db.add(AsignacionDB(id=aid, dia=dia, hora_rango=hora, dia_idx=slot // N_HORAS, hora_idx=slot % N_HORAS,
+                        curso_id=curso, materia_id=materia, profesor_id=profe))
+
+def test_requisitos_con_la_misma_clave_se_reparten_por_horas(db):
+    for i in range(5): _asignacion(db, f"a{i}", i)
+    db.commit()
+    datos = motor.DatosGeneracion([
+        motor.Requisito("r1", CURSO, MATERIA, PROFE, None, 2),
+        motor.Requisito("r2", CURSO, MATERIA, PROFE, None, 3),
+    ])
+
+    modulos, sobrantes = motor.cargar_modulos_actuales(db, datos)
+
+    por_requisito = {}
+    for m in modulos: por_requisito[m.requisito_id] = por_requisito.get(m.requisito_id, 0) + 1
+    assert por_requisito == {"r1": 2, "r2": 3}
+    assert sobrantes == {}
+
+def test_horas_de_mas_quedan_como_sobrantes_con_su_clave(db):
+    for i in range(4): _asignacion(db, f"a{i}", i)
+    _asignacion(db, "otra", 10, materia="m2")
+    db.commit()
+    datos = motor.DatosGeneracion([motor.Requisito("r1", CURSO, MATERIA, PROFE, None, 3)])
+
+    modulos, sobrantes = motor.cargar_modulos_actuales(db, datos)
+
+    assert len(modulos) == 3
+    assert sobrantes == {"a3": (CURSO, MATERIA, PROFE), "otra": (CURSO, "m2", PROFE)}
+
+def test_requisito_borrado_quita_solo_las_asignaciones_de_su_clave(db):
+    # No hay requisitos en la base: todas son sobrantes, pero solo se borran las de la clave dada
+    _asignacion(db, "borrada", 0)
+    _asignacion(db, "ajena", 1, materia="m2")
+    db.commit()
+
+    with pytest.raises(ValueError):
+        motor.reparar_incremental(db, requisito_id="r1")
+    resumen = motor.reparar_incremental(db, requisito_id="r1", clave_borrada=(CURSO, MATERIA, PROFE))
+
+    assert resumen["quitados"] == 1
+    assert [a.id for a in db.query(AsignacionDB.id).all()] == ["ajena"]
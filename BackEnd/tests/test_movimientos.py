@@ -0,0 +1,64 @@
+# BackEnd/tests/test_movimientos.py
+# Movimientos en lote: todo o nada, con el error atribuido al movimiento que lo causó.
+
+import pytest
+
+import app.movimientos as movimientos
+from app.database import AsignacionDB
+from app.grilla import slot_index
+
+def _grilla(db) -> dict:
+    return {a.id: (a.dia_idx, a.hora_idx) for a in db.query(AsignacionDB.id, AsignacionDB.dia_idx, AsignacionDB.hora_idx)}
+
+@pytest.fixture
+def horario(escuela):
+    """Unos módulos ubicados a mano; el id dice curso y materia."""
+    modulos = {
+        "c1-m1": ("c1", "m1", "p1", "a1", "Lunes", "07:40"),
+        "c1-m3": ("c1", "m3", "p3", "a2", "Lunes", "08:20"),
+        "c1-m2": ("c1", "m2", "p2", None, "Lunes", "09:00"),
+        "c2-m1": ("c2", "m1", "p1", "a1", "Martes", "07:40"),
+    }
+    for aid, (curso, materia, profe, aula, dia, hora) in modulos.items():
+        escuela.add(AsignacionDB(id=aid, curso_id=curso, materia_id=materia, profesor_id=profe, aula_id=aula,
+                                 dia=dia, hora_rango=hora))
+    escuela.commit()
+
+def test_un_movimiento_invalido_no_aplica_ninguno(escuela, horario):
+    antes = _grilla(escuela)
+    plan = movimientos.planificar(escuela, [
+        movimientos.Movimiento("c1-m1", intercambiar_con="c1-m3"),                # válido
+        movimientos.Movimiento("c1-m2", destino=slot_index("Viernes", "17:00")),  # Beto no puede los viernes
+    ])
+
+    assert len(plan.errores) == 1
+    error = plan.errores[0]
+    assert error["indice"] == 1 and error["asignacion_id"] == "c1-m2" and "disponibilidad" in error["motivo"]
+    assert _grilla(escuela) == antes  # planificar no escribe
+
+def test_asignacion_inexistente(escuela, horario):
+    plan = movimientos.planificar(escuela, [
+        movimientos.Movimiento("c1-m1", intercambiar_con="c1-m3"),
+        movimientos.Movimiento("no-existe", destino=0),
+    ])
+    assert [(e["indice"], e["asignacion_id"]) for e in plan.errores] == [(1, "no-existe")]
+
+def test_choque_de_profesor_y_aula_se_informa(escuela, horario):
+    # Ana (p1) y el aula 1 ya están en 2° A el martes a primera hora
+    plan = movimientos.planificar(escuela, [movimientos.Movimiento("c1-m1", destino=slot_index("Martes", "07:40"))])
+    motivos = [e["motivo"] for e in plan.errores if e["indice"] == 0]
+    assert any("profesor Ana" in m for m in motivos) and any("aula Aula 1" in m for m in motivos)
+
+def test_lote_valido_se_guarda_entero(escuela, horario):
+    antes = _grilla(escuela)
+    plan = movimientos.planificar(escuela, [
+        movimientos.Movimiento("c1-m1", intercambiar_con="c1-m3"),
+        movimientos.Movimiento("c1-m2", destino=slot_index("Martes", "09:00")),
+    ])
+    assert plan.errores == []
+    cambiadas = movimientos.guardar(escuela, plan)
+
+    despues = _grilla(escuela)
+    assert {c["id"] for c in cambiadas} == {"c1-m1", "c1-m3", "c1-m2"}
+    assert despues["c1-m1"] == antes["c1-m3"] and despues["c1-m3"] == antes["c1-m1"]
+    assert despues["c1-m2"] == (1, 2) and despues["c2-m1"] == antes["c2-m1"]
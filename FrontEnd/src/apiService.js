@@ -53,4 +53,23 @@ export async function apiFetch(endpoint, options = {}) {
     console.error("API Error:", error);
     throw error;
   }
-}
\ No newline at end of file
+}
+
+// URL absoluta de un asset del backend (ej: logo_url de /api/config/institucion)
+export function urlAsset(ruta) {
+  return ruta ? `${API_URL}${ruta}` : null;
+}
+
+// Descarga un asset y lo devuelve como data URL (jsPDF necesita la imagen embebida)
+export async function assetComoDataUrl(ruta) {
+  if (!ruta) return null;
+  const response = await fetch(urlAsset(ruta));
+  if (!response.ok) throw new Error(`Error ${response.status}`);
+  const blob = await response.blob();
+  return await new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onloadend = () => resolve(reader.result);
+    reader.onerror = reject;
+    reader.readAsDataURL(blob);
+  });
+}
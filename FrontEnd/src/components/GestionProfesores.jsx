@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { toast } from 'react-toastify';
-import { apiFetch } from '../apiService';
+import { apiFetch, assetComoDataUrl } from '../apiService';
 import jsPDF from 'jspdf';
 import autoTable from 'jspdf-autotable';
 
@@ -130,7 +130,7 @@ function GestionProfesores({ refreshKey, onDatosCambiados }) {
         let institucion = { nombre: "Cronos", logo: null };
         try {
             const config = await apiFetch('/api/config/institucion');
-            if(config) { institucion.nombre = config.nombre || "Cronos"; institucion.logo = config.logo_base64; }
+            if(config) { institucion.nombre = config.nombre || "Cronos"; institucion.logo = await assetComoDataUrl(config.logo_url); }
         } catch(e){}
 
         const doc = new jsPDF();
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { apiFetch } from '../apiService';
+import { apiFetch, assetComoDataUrl } from '../apiService';
 import html2canvas from 'html2canvas';
 import { toast } from 'react-toastify';
 
@@ -102,7 +102,7 @@ function GrillaHorarios({ refreshKey }) {
         const data = await apiFetch('/api/config/institucion');
         if (data) {
             institucion.nombre = data.nombre || "Cronos";
-            institucion.logo = data.logo_base64;
+            institucion.logo = await assetComoDataUrl(data.logo_url);
         }
     } catch (e) { console.error("No se pudo cargar identidad", e); }
 
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { apiFetch } from '../apiService';
+import { apiFetch, urlAsset } from '../apiService';
 import { toast } from 'react-toastify';
 
 // Sub-componentes
@@ -25,7 +25,7 @@ function Herramientas() {
       if (data) {
         setNombre(data.nombre || "");
         setDireccion(data.direccion || "");
-        if (data.logo_base64) setLogoPreview(data.logo_base64);
+        if (data.logo_url) setLogoPreview(urlAsset(data.logo_url));
       }
     } catch (error) { console.error(error); }
   };
@@ -99,7 +99,7 @@ function Herramientas() {
                                 </div>
                                 <label className="btn btn-sm btn-outline-secondary mt-2 w-100" style={{fontSize: '0.8rem'}}>
                                     <i className="fa-solid fa-camera me-1"></i> Cambiar
-                                    <input type="file" hidden accept="image/*" onChange={handleLogoChange} />
+                                    <input type="file" hidden accept="image/png,image/jpeg,image/gif,image/webp" onChange={handleLogoChange} />
                                 </label>
                             </div>
 
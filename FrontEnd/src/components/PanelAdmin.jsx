@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useTheme } from '../context/ThemeContext';
 import { Sun, Moon } from 'lucide-react';
-import { apiFetch } from '../apiService'; 
+import { apiFetch, urlAsset } from '../apiService'; 
 
 import GestionProfesores from './GestionProfesores';
 import GestionMaterias from './GestionMaterias';
@@ -51,7 +51,7 @@ function PanelAdmin({ onLogout }) {
         if (data) {
             setInstitucion({
                 nombre: data.nombre || "Cronos",
-                logo: data.logo_base64 || null
+                logo: urlAsset(data.logo_url)
             });
         }
     } catch (error) { console.error("Error cargando identidad:", error); }